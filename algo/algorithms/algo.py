@@ -1,27 +1,76 @@
-from typing import Union
+from typing import Iterator, Union
+from contextlib import contextmanager
+import copy
+from concurrent.futures import Future
+import concurrent.futures
+from enum import Enum
 import heapq
+import itertools
 import math
+import threading
+import time
 import numpy as np
-from python_tsp.heuristics import solve_tsp_lin_kernighan
 from algo.entities.entity import CellState, Obstacle, Grid
 from algo.entities.robot import Robot
+from algo.algorithms.cache import PathStore
+from algo.algorithms.lattice import TransitionTable, get_path_poses
+from algo.algorithms.parallel import (
+    get_pool, get_layout, search_paths, combination_search, search_combinations, evaluate_combinations, LocalIncumbent
+)
+from algo.algorithms.tsp import solve_generalized_tsp, get_path_lower_bound
 from algo.tools.consts import (
-    TURN_FACTOR,
     ITERATIONS,
-    SAFE_COST,
-    TURN_DISPLACEMENT,
-    REVERSE_FACTOR,
-    PADDING,
+    COMBINATION_CHUNK_SIZE,
+    MIN_PARALLEL_SWEEPS,
+    MAX_EXACT_TSP_OBSTACLES,
+    CELL_SIZE,
     ARENA_WIDTH,
     ARENA_HEIGHT,
+    VIEW_STATE_CANDIDATES,
 )
+from algo.tools.profiler import SamplingProfiler
 from algo.tools.movement import (
     Direction,
-    MOVE_DIRECTION,
     Motion
 )
 
 
+# phases of a solve that are timed, in the order they run. See MazeSolver.get_metrics()
+SOLVER_PHASES = (
+    "view_states",  # generating the view states of the obstacles
+    "transition_table",  # building the state lattice of the obstacle layout
+    "path_search",  # searching for the paths between the start and view states
+    "combinations",  # enumerating the combinations of view states and bounding their paths
+    "tsp",  # solving the tour over the view states
+    "path_reconstruction",  # joining the paths of the tour into the optimal path
+    "motion_decoding",  # converting the optimal path into motions
+)
+# work done in a solve
+SOLVER_COUNTERS = (
+    "searches",  # path searches run
+    "nodes_expanded",  # states expanded by the searches
+    "heap_pushes",  # states pushed onto the heaps of the searches
+    "heap_pops",  # states popped off the heaps of the searches
+    "path_table_hits",  # paths that were already in the path table and not searched again
+    "path_store_hits",  # paths loaded from the path store instead of searched
+    "distance_table_hits",  # paths that followed the distance table of the empty arena instead of searched
+    "collision_checks",  # moves checked for collisions with the obstacles
+    "tsp_calls",  # TSPs solved
+)
+
+
+class SearchMode(Enum):
+    """
+    Search used to find the paths between the view states.
+    SWEEP is the default and the fastest. The pairwise modes find the same paths, but cannot share the work of a sweep
+    between its targets: over 34 benchmark layouts they took about 5x as long, and BIDIRECTIONAL was slower than ASTAR
+    on 14 of them. They are kept to compare the sweeps against, and BIDIRECTIONAL is not recommended over ASTAR
+    """
+    SWEEP = "sweep"  # a uniform-cost search from each state to all the view states
+    ASTAR = "astar"  # an A* search between each pair of states
+    BIDIRECTIONAL = "bidirectional"  # a bidirectional A* search between each pair of states
+
+
 class MazeSolver:
     """
     A class that is used to find the shortest path given a grid, robot and obstacles
@@ -35,8 +84,12 @@ class MazeSolver:
             robot_x: int = 1,
             robot_y: int = 1,
             robot_direction: Direction = Direction.NORTH,
+            path_store: Union[PathStore, None] = None,
+            search_mode: SearchMode = SearchMode.SWEEP,
+            num_workers: int = 1,
+            cell_size: int = CELL_SIZE,
+            view_candidates: tuple[tuple[int, int, int], ...] = VIEW_STATE_CANDIDATES,
     ) -> None:
-        self.neighbor_cache = {}  # Store precomputed neighbors
         """
         Args:
             size_x: size of the grid in x direction. Default is 20
@@ -45,15 +98,48 @@ class MazeSolver:
             robot_x: x coordinate of the robot. Default is 1
             robot_y: y coordinate of the robot. Default is 1
             robot_direction: direction the robot is facing. Default is NORTH
+            path_store: store of paths found with previous obstacle layouts to reuse. Default is no store
+            search_mode: search used to find the paths between the view states. Default is SearchMode.SWEEP
+            num_workers: no. of worker processes to run the sweeps of SearchMode.SWEEP and the view state combinations of
+                more than MAX_EXACT_TSP_OBSTACLES obstacles in. Default is 1 (no worker processes), as used by the API.
+                Workers only pay off with spare cores, check with benchmark.py --num-workers before raising it
+            cell_size: size of a grid cell in cm. Positions and sizes are in cells of this size. Default is CELL_SIZE
+            view_candidates: candidate view states of each obstacle, eg. EXTENDED_VIEW_STATE_CANDIDATES. Default is VIEW_STATE_CANDIDATES
         """
-        self.grid = Grid(size_x, size_y)
+        self.grid = Grid(size_x, size_y, cell_size, view_candidates)
 
         self.robot = robot if robot else Robot(
             robot_x, robot_y, robot_direction)
 
+        # paths and costs between every pair of (x, y, direction) poses that have been searched.
+        # Each path is kept as its motions from the start pose in an int8 array of Motion values (see get_path_poses()),
+        # so that a tour is decoded into motions by joining the arrays
         self.path_table = dict()
         self.cost_table = dict()
-        self.motion_table = dict()
+        # pose pairs whose paths were reused from the path store and may not be the cheapest, see _has_path(),
+        # and whether the last solve used the cost of any of them
+        self.approximate_paths: set[tuple] = set()
+        self.has_approximate_costs: bool = False
+        self.path_store = path_store
+        self.search_mode = SearchMode(search_mode)
+        self.num_workers = num_workers
+
+        # state lattice of the current obstacle layout, built on the first search
+        self.transition_table: Union[TransitionTable, None] = None
+
+        # whether the last path found is proven optimal, and the background search that improves on it
+        self.is_optimal: bool = False
+        self.improved_path: Union[Future, None] = None
+
+        # profile of the last solve, if it was profiled
+        self.profiler: Union[SamplingProfiler, None] = None
+
+        # work done and time spent in each phase to find the last path. See get_metrics()
+        self.stats: dict[str, int] = dict.fromkeys(SOLVER_COUNTERS, 0)
+        self.phase_ms: dict[str, float] = dict.fromkeys(SOLVER_PHASES, 0.0)
+        self._collision_checks_start = 0
+        # phases being timed in each thread, innermost last. See _measure()
+        self._phase_stack = threading.local()
 
     def add_obstacle(
             self, x: int, y: int, direction: Direction, obstacle_id: int
@@ -68,613 +154,915 @@ class MazeSolver:
         obstacle_id: id of the obstacle
         """
         self.grid.add_obstacle(Obstacle(x, y, direction, obstacle_id))
+        self.transition_table = None
 
     def clear_obstacles(self) -> None:
         """
         Removes all obstacles from the grid
         """
         self.grid.reset_obstacles()
+        self.transition_table = None
 
-    def get_optimal_path(self) -> tuple[list[CellState], float]:
+    def get_optimal_path(
+            self, deadline_ms: Union[int, None] = None, keep_improving: bool = False, profile: bool = False
+    ) -> tuple[list[CellState], float]:
         """
         Get the optimal path between all possible view states for all obstacles using A* search and solving TSP problem
 
+        Anytime planning: if a deadline is given, a greedy tour is found first and the best tour found by the deadline is returned.
+        The deadline only bounds the search after the greedy tour. The transition table, the sweep from the robot start state
+        and the greedy tour are always completed, so a solve takes at least as long as them whatever the deadline
+        (eg. about 35 ms for 8 obstacles on the 20x20 grid, and over 100 ms on the 40x40 grid).
+        self.is_optimal records whether the returned path is proven optimal.
+        If keep_improving is set and the deadline cuts the search short, the search carries on in a background thread
+        and its (path, cost, is_optimal) result is set on the self.improved_path future.
+        If profile is set, the solve is sampled by a SamplingProfiler which is kept in self.profiler.
+
+        Args:
+            deadline_ms: time budget of the search in milliseconds. Default is no time limit
+            keep_improving: whether to carry on the search in the background after the deadline. Default is False
+            profile: whether to profile the solve. Default is False
+
         Returns: 
             tuple[list[CellState], float]: an optimal path which is a list of all the CellStates involved, and cost of the path
         """
-        min_dist = 1e9
-        optimal_path = []
+        self._reset_metrics()
+        self.profiler = SamplingProfiler() if profile else None
+        if self.profiler is not None:
+            self.profiler.start()
+        try:
+            # get all grid positions that can view the obstacle images
+            with self._measure("view_states"):
+                views = self.grid.get_view_obstacle_positions()
+            return self._find_optimal_path(self.robot.get_start_state(), views, deadline_ms, keep_improving)
+        finally:
+            if self.profiler is not None:
+                self.profiler.stop()
+
+    def replan_path(
+            self,
+            robot_x: int,
+            robot_y: int,
+            robot_direction: Direction,
+            scanned_obstacle_ids: list[int],
+            deadline_ms: Union[int, None] = None,
+    ) -> tuple[list[CellState], float]:
+        """
+        Get the optimal path from the robot's current position to the obstacles that have not been scanned yet,
+        for when the robot needs a new path mid-run.
 
-        # get all grid positions that can view the obstacle images
-        views = self.grid.get_view_obstacle_positions()
-        num_views = len(views)
+        The obstacle layout is unchanged, so the paths between view states found by earlier searches are all reused.
+        Only the paths from the current position are searched for, in a single sweep, and none if the robot is at a view state.
 
-        for bin_pos in self._get_visit_options(num_views):
-            visit_states = [self.robot.get_start_state()]
-            cur_view_positions = []
+        Args:
+            robot_x: current x coordinate of the robot
+            robot_y: current y coordinate of the robot
+            robot_direction: direction the robot is currently facing
+            scanned_obstacle_ids: ids of the obstacles that have been scanned, which are left out of the path
+            deadline_ms: time budget of the search in milliseconds. Default is no time limit
+
+        Returns:
+            tuple[list[CellState], float]: the remaining path which is a list of all the CellStates involved, and cost of the path
+        """
+        self._reset_metrics()
+        scanned_obstacle_ids = set(scanned_obstacle_ids)
+        with self._measure("view_states"):
+            views = [
+                view_pos for view_pos in self.grid.get_view_obstacle_positions()
+                if view_pos and view_pos[0].screenshot_id not in scanned_obstacle_ids
+            ]
+        return self._find_optimal_path(CellState(robot_x, robot_y, robot_direction), views, deadline_ms)
+
+    def _find_optimal_path(
+            self,
+            start_state: CellState,
+            views: list[list[CellState]],
+            deadline_ms: Union[int, None] = None,
+            keep_improving: bool = False,
+    ) -> tuple[list[CellState], float]:
+        """
+        Get the optimal path from the start state that visits one view state of every obstacle. See get_optimal_path()
 
-            for i in range(num_views):
-                # if the i-th bit is 1, then the robot will visit the view position at obstacle i
-                if bin_pos[i] == "1":
-                    # add the view position to the current view positions
-                    cur_view_positions.append(views[i])
-                    # add the view position to flattened list of all view states
-                    visit_states.extend(views[i])
+        Args:
+            start_state: state the robot starts from
+            views: view states of each obstacle to visit
+        """
+        deadline = None if deadline_ms is None else time.perf_counter() + deadline_ms / 1000
+        self.is_optimal = False
+        self.improved_path = None
+        self.has_approximate_costs = False
+
+        with self._measure("transition_table"):
+            self._get_transition_table()
+
+        # drop view states that the robot cannot reach, and obstacles that have no reachable view states,
+        # so that the best tour over the remaining obstacles can be found in a single pass
+        with self._measure("path_search"):
+            self._dijkstra_search(
+                start_state, [view_state for view_pos in views for view_state in view_pos])
+        cur_view_positions = []
+        for view_pos in views:
+            reachable_view_pos = [
+                view_state for view_state in view_pos if self._get_travel_cost(start_state, view_state) is not None]
+            if reachable_view_pos:
+                cur_view_positions.append(reachable_view_pos)
+
+        # flattened list of the robot start state and all view states
+        visit_states = [start_state]
+        for view_pos in cur_view_positions:
+            visit_states.extend(view_pos)
+
+        tour, distance = [0], 1e9
+        if deadline is not None:
+            # initial tour to fall back on if the deadline is reached
+            with self._measure("path_search"):
+                tour, distance = self._solve_greedy_tour(
+                    visit_states, cur_view_positions)
+
+        # for each visit state, generate path to all other visit states and cost of the paths
+        with self._measure("path_search"):
+            paths_generated = self._generate_paths(visit_states, deadline)
+        if paths_generated:
+            new_tour, new_distance, self.is_optimal = self._solve_tour(
+                visit_states, cur_view_positions, deadline)
+            # the exact tour always visits the most obstacles, otherwise keep the tour that visits more obstacles at a lower cost
+            if self.is_optimal or (
+                new_distance < 1e9 and (len(new_tour), -new_distance) > (len(tour), -distance)
+            ):
+                tour, distance = new_tour, new_distance
+
+        # once all the paths are found the exact tour cannot be improved on, even if it is not proven optimal
+        # because of an approximate cost (see _has_path())
+        search_finished = paths_generated and len(cur_view_positions) <= MAX_EXACT_TSP_OBSTACLES
+        if keep_improving and not self.is_optimal and not search_finished:
+            self.improved_path = Future()
+            # the search is carried on by a copy of the solver with its own metrics and optimality,
+            # so that they are not changed while the path of this solve is in use
+            improver = copy.copy(self)
+            improver._reset_metrics()
+            threading.Thread(
+                target=improver._improve_in_background, args=(visit_states, cur_view_positions), daemon=True
+            ).start()
+
+        return self._get_path_result(visit_states, tour, distance)
+
+    def _solve_tour(
+            self,
+            visit_states: list[CellState],
+            cur_view_positions: list[list[CellState]],
+            deadline: Union[float, None] = None,
+    ) -> tuple[list[int], float, bool]:
+        """
+        Find the order to visit the obstacles and the view state to visit for each obstacle
 
-            # for each visit state, generate path to all other visit states and cost of the paths using A* search
-            self._generate_paths(visit_states)
+        Returns:
+            tuple[list[int], float, bool]: indices in visit_states of the states to visit starting from the robot start state,
+            cost of the path, and whether the tour is proven optimal
+        """
+        with self._measure("tsp"):
+            if len(cur_view_positions) <= MAX_EXACT_TSP_OBSTACLES:
+                tour, distance = self._solve_exact_tour(
+                    visit_states, cur_view_positions)
+                # the tour is only optimal if the cost of every path it was chosen from is exact
+                return tour, distance, not self.has_approximate_costs
+
+            tour, distance = self._solve_combination_tours(
+                visit_states, cur_view_positions, deadline)
+            return tour, distance, False
+
+    def _improve_in_background(
+            self, visit_states: list[CellState], cur_view_positions: list[list[CellState]]
+    ) -> None:
+        """
+        Finishes the search that was cut short by the deadline and sets the (path, cost, is_optimal) result on the
+        self.improved_path future. Run on a copy of the solver, see _find_optimal_path()
+        """
+        try:
+            with self._measure("path_search"):
+                self._generate_paths(visit_states)
+            tour, distance, is_optimal = self._solve_tour(
+                visit_states, cur_view_positions)
+            self.improved_path.set_result(
+                (*self._get_path_result(visit_states, tour, distance), is_optimal))
+        except Exception as error:
+            self.improved_path.set_exception(error)
+
+    def _get_path_result(
+            self, visit_states: list[CellState], tour: list[int], distance: float
+    ) -> tuple[list[CellState], float]:
+        """
+        Returns the optimal path of the tour and its cost, or an empty path if no tour was found
+        """
+        if distance < 1e9:
+            with self._measure("path_reconstruction"):
+                return self._build_optimal_path(visit_states, tour), distance
+        return [], 1e9
 
-            # generate all possible combinations of the view positions
-            combinations = MazeSolver._generate_combinations(
-                cur_view_positions, 0, [], [], ITERATIONS
-            )
+    def get_metrics(self) -> dict[str, dict]:
+        """
+        Returns the time spent in each phase of the last solve and the work done in it.
+        Each phase is timed exclusive of the phases nested in it, so the phase times add up to the time of the solve.
+        Motion decoding is included once optimal_path_to_motion_path() has been called.
 
-            # iterate over all the combinations and find the optimal path
-            for combination in combinations:
-                visited = [0]
-
-                current_idx = 1  # idx 0 of visit_states: robot start state
-                cost = 0
-
-                # iterate over the views for each obstacle and calculate the cost of the path
-                for idx, view_pos in enumerate(cur_view_positions):
-                    # global index of selected view state in visit_states (flattened list of all view states)
-                    visited.append(current_idx + combination[idx])
-                    cost += view_pos[combination[idx]].penalty
-                    # move starting idx to next obstacle
-                    current_idx += len(view_pos)
-
-                # initialize the cost matrix to travel between each obstacle
-                cost_matrix = np.zeros((len(visited), len(visited)))
-
-                for start_idx in range(len(visited) - 1):
-                    for end_idx in range(start_idx + 1, len(visited)):
-                        start_state = visit_states[visited[start_idx]]
-                        end_state = visit_states[visited[end_idx]]
-
-                        # check if the cost has already been calculated
-                        if (start_state, end_state) in self.cost_table:
-                            cost_matrix[start_idx, end_idx] = self.cost_table[
-                                (start_state, end_state)
-                            ]
-                        else:
-                            # initialize the cost matrix with a large value since the cost has not been calculated
-                            cost_matrix[start_idx, end_idx] = 1e9
-
-                    # add the cost for the reverse path
-                        cost_matrix[end_idx, start_idx] = cost_matrix[
-                            start_idx, end_idx
-                        ]
-
-                # set the cost of travelling from each state to itself to 0
-                cost_matrix[:, 0] = 0
-
-                # find Hamiltonian path with least cost for the selected combination of view states
-                # solve_tsp_lin_kernighan is used instead of solve_tsp_dynamic_programming since it was the empirically fastest solver
-                permutation, distance = solve_tsp_lin_kernighan(cost_matrix)
-
-                # if the distance is more than the minimum distance, the path is irrelevant
-                if distance + cost >= min_dist:
-                    continue
+        Returns:
+            dict[str, dict]: 'phases_ms' with the time in ms of each phase in SOLVER_PHASES,
+            and 'counters' with the count of each counter in SOLVER_COUNTERS
+        """
+        counters = dict(self.stats)
+        counters["collision_checks"] = self.grid.collision_checks - self._collision_checks_start
+        return {
+            "phases_ms": {phase: round(ms, 3) for phase, ms in self.phase_ms.items()},
+            "counters": counters,
+        }
+
+    def _reset_metrics(self) -> None:
+        """
+        Starts the metrics of a new solve. See get_metrics()
+        """
+        self.stats = dict.fromkeys(SOLVER_COUNTERS, 0)
+        self.phase_ms = dict.fromkeys(SOLVER_PHASES, 0.0)
+        self._collision_checks_start = self.grid.collision_checks
 
-                # update the minimum distance
-                min_dist = distance + cost
-
-                # update the optimal path
-                optimal_path = [visit_states[0]]
-                for idx in range(len(permutation) - 1):
-                    from_state = visit_states[visited[permutation[idx]]]
-                    to_state = visit_states[visited[permutation[idx + 1]]]
-
-                    current_path = self.path_table[(from_state, to_state)]
-
-                    # add each state from the current path to the optimal path
-                    for idx2 in range(1, len(current_path)):
-                        optimal_path.append(
-                            CellState(
-                                current_path[idx2][0],
-                                current_path[idx2][1],
-                                current_path[idx2][2],
-                            )
-                        )
-
-                    # check position of to_state wrt to obstacle to snap screenshot from center/left/right.
-                    obs = self.grid.find_obstacle_by_id(to_state.screenshot_id)
-                    if obs:
-                        pos = MazeSolver._get_capture_relative_position(
-                            optimal_path[-1], obs
-                        )
-                        formatted = f"{to_state.screenshot_id}_{pos}"
-
-                        optimal_path[-1].set_screenshot(formatted)
-                    else:
-                        raise ValueError(
-                            f"Obstacle with id {to_state.screenshot_id} not found"
-                        )
-
-            # if the optimal path has been found, break the view positions loop
-            if optimal_path:
+    @contextmanager
+    def _measure(self, phase: str) -> Iterator[None]:
+        """
+        Adds the time spent in the block to the phase in self.phase_ms.
+        Time spent in a phase nested in the block is only added to the nested phase.
+        """
+        stack = getattr(self._phase_stack, "phases", None)
+        if stack is None:
+            stack = self._phase_stack.phases = []
+        now = time.perf_counter()
+        if stack:
+            # pause the enclosing phase
+            outer, outer_start = stack[-1]
+            self.phase_ms[outer] += (now - outer_start) * 1000
+        stack.append((phase, now))
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            _, start = stack.pop()
+            self.phase_ms[phase] += (now - start) * 1000
+            if stack:
+                # resume the enclosing phase
+                stack[-1] = (stack[-1][0], now)
+
+    def _solve_greedy_tour(
+            self, visit_states: list[CellState], cur_view_positions: list[list[CellState]]
+    ) -> tuple[list[int], float]:
+        """
+        Builds a tour by repeatedly moving to the cheapest view state of an obstacle that has not been visited.
+        Only needs one search per obstacle, so it is used as the initial tour of anytime planning.
+
+        Returns:
+            tuple[list[int], float]: indices in visit_states of the states to visit starting from the robot start state, and cost of the path
+        """
+        # obstacle of each state in visit_states
+        groups = [None] + [idx for idx, view_pos in enumerate(cur_view_positions) for _ in view_pos]
+        remaining = set(range(len(cur_view_positions)))
+
+        tour, distance = [0], 0
+        while remaining:
+            current = visit_states[tour[-1]]
+            candidates = [idx for idx in range(1, len(visit_states)) if groups[idx] in remaining]
+            self._dijkstra_search(
+                current, [visit_states[idx] for idx in candidates])
+
+            costs = {idx: self._get_travel_cost(current, visit_states[idx]) for idx in candidates}
+            reachable = [idx for idx in candidates if costs[idx] is not None]
+            if not reachable:
                 break
+            best = min(reachable, key=lambda idx: costs[idx] + visit_states[idx].penalty)
+
+            distance += costs[best] + visit_states[best].penalty
+            tour.append(best)
+            remaining.remove(groups[best])
+
+        return tour, distance
+
+    def _get_cost_matrix(self, states: list[CellState]) -> np.ndarray:
+        """
+        Returns the dense matrix of the cost of travelling from every state to every other state,
+        including the screenshot penalty of the end state, np.inf if there is no path between them
+        """
+        poses = [state.get_pose() for state in states]
+        cost_matrix = np.array(
+            [[self.cost_table.get((start, end), np.inf) for end in poses] for start in poses], dtype=float)
+        cost_matrix += np.array([state.penalty for state in states], dtype=float)
+        np.fill_diagonal(cost_matrix, 0)
+        return cost_matrix
+
+    def _get_travel_cost(self, start: CellState, end: CellState) -> Union[int, None]:
+        """
+        Returns the cost of travelling between two states including the screenshot penalty of the end state,
+        None if there is no path between them
+        """
+        cost = self.cost_table.get((start.get_pose(), end.get_pose()))
+        return None if cost is None else cost + end.penalty
+
+    def _solve_exact_tour(
+            self, visit_states: list[CellState], cur_view_positions: list[list[CellState]]
+    ) -> tuple[list[int], float]:
+        """
+        Finds the optimal order to visit the obstacles and view state of each obstacle in a single pass with a Held-Karp DP.
+
+        Returns:
+            tuple[list[int], float]: indices in visit_states of the states to visit starting from the robot start state, and cost of the path
+        """
+        groups = [idx for idx, view_pos in enumerate(cur_view_positions) for _ in view_pos]
+        penalties = [state.penalty for state in visit_states[1:]]
+        self.stats["tsp_calls"] += 1
+        return solve_generalized_tsp(
+            self._get_cost_matrix(visit_states), groups, penalties, len(cur_view_positions))
+
+    def _solve_combination_tours(
+            self,
+            visit_states: list[CellState],
+            cur_view_positions: list[list[CellState]],
+            deadline: Union[float, None] = None,
+    ) -> tuple[list[int], float]:
+        """
+        Finds the order to visit the obstacles by solving a TSP with Lin-Kernighan for each combination of view states.
+        Used when there are too many obstacles for the exact solver. Stops at the deadline if one is given.
+        The combinations are evaluated in self.num_workers worker processes if there is more than one worker,
+        and the same tour is found for any no. of workers.
+
+        Returns:
+            tuple[list[int], float]: indices in visit_states of the states to visit starting from the robot start state, and cost of the path
+        """
+        # cost matrix between all visit states, with a large value for paths that have not been found
+        cost_matrix = self._get_cost_matrix(visit_states)
+        cost_matrix[np.isinf(cost_matrix)] = 1e9
+        penalty_vector = np.array([state.penalty for state in visit_states], dtype=float)
+
+        # lower bound of the path of every combination: each obstacle is entered once, at the cheapest way into any of its view states
+        incoming = cost_matrix.copy()
+        np.fill_diagonal(incoming, np.inf)
+        cheapest_incoming = incoming.min(axis=0)
+        offsets = 1 + np.cumsum([0] + [len(view_pos) for view_pos in cur_view_positions[:-1]])
+        path_lower_bound = sum(
+            cheapest_incoming[offset:offset + len(view_pos)].min() for offset, view_pos in zip(offsets, cur_view_positions))
+
+        # combinations of the view positions, in order of their total penalty
+        combinations = itertools.islice(
+            MazeSolver._generate_combinations(cur_view_positions), ITERATIONS)
+
+        def get_chunks():
+            for start in itertools.count(0, COMBINATION_CHUNK_SIZE):
+                with self._measure("combinations"):
+                    chunk = list(itertools.islice(combinations, COMBINATION_CHUNK_SIZE))
+                    if not chunk:
+                        return
+                    jobs = self._get_combination_jobs(cost_matrix, penalty_vector, offsets, chunk, start)
+                yield jobs
+        chunks = get_chunks()
+
+        # evaluate the combinations in chunks, sharing the cost of the best tour so far to skip hopeless combinations.
+        # the chunks are in order of penalty, so no combination is left that can beat or tie with the best tour
+        # once the penalty of the next chunk and the lower bound of its path add up to more than the best tour
+        def is_hopeless(chunk, incumbent):
+            return chunk[0][2] + path_lower_bound > incumbent.value
+
+        results = []
+        if self.num_workers > 1:
+            with combination_search(self.num_workers) as (executor, incumbent, futures):
+                try:
+                    # keep a few chunks queued for each worker, so that later chunks are checked against a recent best tour
+                    for chunk in chunks:
+                        if is_hopeless(chunk, incumbent):
+                            break
+                        futures.append(executor.submit(search_combinations, cost_matrix, chunk))
+                        if len(futures) < 2 * self.num_workers:
+                            continue
+                        timeout = None if deadline is None else max(deadline - time.perf_counter(), 0)
+                        results.append(futures.pop(0).result(timeout))
+                    while futures:
+                        timeout = None if deadline is None else max(deadline - time.perf_counter(), 0)
+                        results.append(futures[0].result(timeout))
+                        futures.pop(0)
+                except concurrent.futures.TimeoutError:
+                    pass
+        else:
+            incumbent = LocalIncumbent()
+            for chunk in chunks:
+                if is_hopeless(chunk, incumbent) or (deadline is not None and time.perf_counter() > deadline):
+                    break
+                results.append(evaluate_combinations(cost_matrix, chunk, incumbent))
+
+        self.stats["tsp_calls"] += sum(num_solved for _, num_solved in results)
+        # the best tour is the cheapest, then the first among the combinations of the same cost
+        results = [result for result, _ in results if result is not None and result[0] < 1e9]
+        if not results:
+            return [0], 1e9
+        min_dist, _, best_tour = min(results, key=lambda result: result[:2])
+        return best_tour, min_dist
+
+    @staticmethod
+    def _get_combination_jobs(
+            cost_matrix: np.ndarray,
+            penalty_vector: np.ndarray,
+            offsets: np.ndarray,
+            combinations: list[list[int]],
+            start: int,
+    ) -> list[tuple[int, list[int], float, float]]:
+        """
+        Returns the (index, indices of the visit states, penalty, lower bound of the path cost) of each combination to evaluate.
+        See evaluate_combinations()
+
+        Args:
+            cost_matrix: cost of travelling between every pair of visit states
+            penalty_vector: screenshot penalty of each visit state
+            offsets: index in visit_states of the first view state of each obstacle
+            combinations: view state of each obstacle in each combination
+            start: index of the first combination
+        """
+        # indices in visit_states of the states of each combination, starting with the robot start state (idx 0)
+        visited = np.hstack([
+            np.zeros((len(combinations), 1), dtype=np.int64),
+            np.array(combinations, dtype=np.int64).reshape(len(combinations), -1) + offsets,
+        ])
+        penalties = penalty_vector[visited[:, 1:]].sum(axis=1)
+
+        # cost matrices of all the combinations gathered at once, to bound the cost of their paths
+        combination_matrices = cost_matrix[visited[:, :, None], visited[:, None, :]]
+        combination_matrices[:, :, 0] = 0
+        lower_bounds = get_path_lower_bound(combination_matrices)
+
+        return [
+            (start + index, visited[index].tolist(), float(penalties[index]), float(lower_bounds[index]))
+            for index in range(len(combinations))
+        ]
+
+    def _build_optimal_path(self, visit_states: list[CellState], tour: list[int]) -> list[CellState]:
+        """
+        Joins the paths between the states of the tour into the optimal path, and marks the screenshot positions
+
+        Args:
+            visit_states (list[CellState]): robot start state and view states
+            tour (list[int]): indices in visit_states of the states to visit starting from the robot start state
+        """
+        optimal_path = [visit_states[0]]
+        for idx in range(len(tour) - 1):
+            from_state = visit_states[tour[idx]]
+            to_state = visit_states[tour[idx + 1]]
+
+            current_path = get_path_poses(
+                from_state.get_pose(), self.path_table[(from_state.get_pose(), to_state.get_pose())],
+                self.grid.turn_displacement)
+
+            # add each state from the current path to the optimal path
+            for idx2 in range(1, len(current_path)):
+                optimal_path.append(
+                    CellState(
+                        current_path[idx2][0],
+                        current_path[idx2][1],
+                        current_path[idx2][2],
+                    )
+                )
+
+            # check position of to_state wrt to obstacle to snap screenshot from center/left/right.
+            obs = self.grid.find_obstacle_by_id(to_state.screenshot_id)
+            if obs:
+                pos = MazeSolver._get_capture_relative_position(
+                    optimal_path[-1], obs
+                )
+                formatted = f"{to_state.screenshot_id}_{pos}"
+
+                optimal_path[-1] = optimal_path[-1].with_screenshot(formatted)
+            else:
+                raise ValueError(
+                    f"Obstacle with id {to_state.screenshot_id} not found"
+                )
+        return optimal_path
+
+    def _generate_paths(self, states: list[CellState], deadline: Union[float, None] = None) -> bool:
+        """
+        Generate and store the path from every state to every view state.
+        The path back from a view state is searched for separately as it may differ (eg. turns cannot be reversed
+        next to an obstacle, or the safe costs along the way differ), so the cost of each direction is exact.
+        The robot start state is never returned to, so no paths are searched for into it.
+
+        Returns:
+            bool: False if the deadline was reached before all the paths were generated
+        """
+        if self.search_mode == SearchMode.SWEEP and self.num_workers > 1:
+            return self._generate_paths_in_parallel(states, deadline)
+
+        if self.search_mode == SearchMode.SWEEP:
+            # a single uniform-cost sweep from each state reaches all the view states
+            for i in range(len(states)):
+                if deadline is not None and time.perf_counter() > deadline:
+                    return False
+                self._dijkstra_search(states[i], MazeSolver._get_sweep_ends(states, i))
+            return True
+
+        search = self._astar_search if self.search_mode == SearchMode.ASTAR else self._bidirectional_search
+        for i in range(len(states)):
+            for end in MazeSolver._get_sweep_ends(states, i):
+                if deadline is not None and time.perf_counter() > deadline:
+                    return False
+                search(states[i], end)
+        return True
+
+    @staticmethod
+    def _get_sweep_ends(states: list[CellState], start: int) -> list[CellState]:
+        """
+        Returns the states to find the paths to from states[start]: every view state (states after the robot start state)
+        other than itself
+        """
+        return [state for idx, state in enumerate(states) if idx and idx != start]
+
+    def _generate_paths_in_parallel(self, states: list[CellState], deadline: Union[float, None] = None) -> bool:
+        """
+        Same as the sweeps of _generate_paths(), but the sweeps are run in the pool of worker processes of the process
+        (see get_pool()). Each worker builds the transition table of the obstacle layout on its first sweep of it,
+        and sends back only the paths it finds. The paths are stored in the same order as the serial sweeps, so the results are the same.
+        The sweeps are run serially if there are fewer than MIN_PARALLEL_SWEEPS of them, which is faster than
+        building the transition table in the workers.
+
+        Returns:
+            bool: False if the deadline was reached before all the paths were generated
+        """
+        table = self._get_transition_table()
+        jobs = []
+        for i in range(len(states)):
+            targets = self._get_search_targets(states[i], MazeSolver._get_sweep_ends(states, i))
+            if targets:
+                jobs.append((states[i], targets))
+        if len(jobs) < MIN_PARALLEL_SWEEPS:
+            for start, targets in jobs:
+                if deadline is not None and time.perf_counter() > deadline:
+                    return False
+                self._dijkstra_search(start, list(targets.values()))
+            return True
+
+        executor, _ = get_pool(self.num_workers)
+        layout = get_layout(self.grid)
+        futures = [
+            executor.submit(search_paths, layout, table.state_index(start.x, start.y, start.direction), list(targets))
+            for start, targets in jobs
+        ]
+        try:
+            for (start, targets), future in zip(jobs, futures):
+                timeout = None if deadline is None else max(deadline - time.perf_counter(), 0)
+                try:
+                    results, counters = future.result(timeout)
+                except concurrent.futures.TimeoutError:
+                    return False
+                self._add_search_counters(counters)
+
+                for state, cost, path, motions in results:
+                    # an earlier sweep from the same pose may have found the path already
+                    if not self._has_path(start, targets[state]):
+                        self._store_path(start, targets[state], path, motions, cost)
+        finally:
+            for future in futures:
+                future.cancel()
+        return True
+
+    def _dijkstra_search(self, start: CellState, ends: list[CellState]) -> None:
+        """
+        Uniform-cost search to find the shortest paths from one state to many states at once. See TransitionTable.search()
+        """
+        table = self._get_transition_table()
+        targets = self._get_search_targets(start, ends)
+        if not targets:
+            return
+
+        costs, parent_dict, counters = table.search(
+            table.state_index(start.x, start.y, start.direction), set(targets))
+        self._add_search_counters(counters)
+        # record the paths in the order the end states were reached
+        for state, cost in costs.items():
+            self._record_path(start, targets[state], parent_dict, cost)
+
+    def _add_search_counters(self, counters: dict[str, int]) -> None:
+        """
+        Adds the counters of a search (see TransitionTable.search()) to self.stats
+        """
+        self.stats["searches"] += 1
+        for name, count in counters.items():
+            self.stats[name] += count
 
-        return optimal_path, min_dist
+    def _get_search_targets(self, start: CellState, ends: list[CellState]) -> dict[int, CellState]:
+        """
+        Returns the end states to search for by their index in the transition table,
+        skipping end states whose paths have already been calculated or that no obstacle is in the way of.
+        Paths only depend on the pose, so end states with the same pose (eg. view states of different obstacles) share one path.
 
-    def _generate_paths(self, states: list[CellState]) -> None:
+        A single search finds the paths to all the end states at once, so following the distance table only saves time
+        if it skips the search altogether. It is not tried again once an end state is found to need the search.
         """
-        Generate and store the path between all combinations of all view states
+        table = self._get_transition_table()
+        targets = {}
+        for end in ends:
+            if self._has_path(start, end) or (not targets and self._follow_distance_table(start, end)):
+                continue
+            targets[table.state_index(end.x, end.y, end.direction)] = end
+        return targets
+
+    def _follow_distance_table(self, start: CellState, end: CellState) -> bool:
+        """
+        Records the shortest path between two states from the distance table of the empty arena if no obstacle is in its way,
+        which is much faster than searching for it. See TransitionTable.follow_distance_table()
+
+        Returns:
+            bool: whether the path was recorded
         """
-        for i in range(len(states) - 1):
-            for j in range(i + 1, len(states)):
-                self._astar_search(states[i], states[j])
+        table = self._get_transition_table()
+        end_state = table.state_index(end.x, end.y, end.direction)
+        result = table.follow_distance_table(table.state_index(start.x, start.y, start.direction), end_state)
+        if result is None:
+            return False
+
+        cost, parent_dict = result
+        self._record_path(start, end, parent_dict, cost)
+        self.stats["distance_table_hits"] += 1
+        return True
 
     def _astar_search(self, start: CellState, end: CellState) -> None:
         """
         A* search algorithm to find the shortest path between two states
-        Each state is defined by x, y, and direction.
+        Each state is defined by x, y, and direction, and is referred to by its index in the transition table.
 
         Heuristic: distance f = g + h
         g: Actual distance from the start state to the current state
-        h: Estimated distance from the current state to the end state
+        h: Cost from the current state to the end state in an obstacle-free lattice, looked up from the distance table
+           of the empty arena if it has been built, else the heuristic table.
+           This never overestimates the actual cost, so the path found is optimal.
         """
-        # check if the path has already been calculated
-        if (start, end) in self.path_table:
+        # check if the path has already been calculated or no obstacle is in its way
+        if self._has_path(start, end) or self._follow_distance_table(start, end):
             return
 
+        table = self._get_transition_table()
+        heuristic = table.get_heuristic(end.x, end.y, end.direction)
+        start_state = table.state_index(start.x, start.y, start.direction)
+        end_state = table.state_index(end.x, end.y, end.direction)
+
         # initialize the actual distance dict with the start state
-        g_dist = {(start.x, start.y, start.direction): 0}
+        g_dist = {start_state: 0}
 
         visited = set()
+        # parent state and motion taken from the parent state to reach each state
         parent_dict = {}
 
         # initialize min heap with the start state
-        # the heap is a list of tuples (h, x, y, direction) where h is the estimated distance from the current state to the end state
-        heap = [(self._estimate_distance(start, end),
-                 start.x, start.y, start.direction)]
+        # the heap is a list of tuples (f, state) where f is the estimated distance from the start state to the end state
+        # states are numbered in (x, y, direction) order, so ties are broken the same way as comparing (x, y, direction)
+        heap = [(heuristic[start_state], start_state)]
+        pushes = 1
 
         while heap:
             # get the node with the minimum estimated distance
-            _, x, y, direction = heapq.heappop(heap)
+            _, state = heapq.heappop(heap)
 
             # check if the node has already been visited
-            if (x, y, direction) in visited:
+            if state in visited:
                 continue
 
+            # mark the node as visited
+            visited.add(state)
+
             # if the terminal state is reached record the path and return
-            if end.is_eq(x, y, direction):
-                self._record_path(start, end, parent_dict,
-                                  g_dist[(x, y, direction)])
-                return
+            if state == end_state:
+                self._record_path(start, end, parent_dict, g_dist[state])
+                break
 
-            # mark the node as visited
-            visited.add((x, y, direction))
-            dist = g_dist[(x, y, direction)]
+            dist = g_dist[state]
 
             # traverse the neighboring states
-            for (
-                    new_x,
-                    new_y,
-                    new_direction,
-                    safe_cost,
-                    motion,
-            ) in self._get_neighboring_states(x, y, direction):
+            for new_state, motion_cost, motion in table.neighbors[state]:
 
                 # check if the new state has already been visited
-                if (new_x, new_y, new_direction) in visited:
+                if new_state in visited:
                     continue
 
-                if (
-                        x,
-                        y,
-                        direction,
-                        new_x,
-                        new_y,
-                        new_direction,
-                ) not in self.motion_table and (
-                        new_x,
-                        new_y,
-                        new_direction,
-                        x,
-                        y,
-                        direction,
-                ) not in self.motion_table:
-                    # only need to store one of the two directions as the other will be the opposite
-                    self.motion_table[
-                        (x, y, direction, new_x, new_y, new_direction)
-                    ] = motion
-
-                # calculate the cost of robot turning
-                turn_cost = TURN_FACTOR * Direction.turn_cost(
-                    direction, new_direction
-                )
-                # calculate the cost of robot reversing
-                reverse_cost = REVERSE_FACTOR * motion.reverse_cost()
-
-                motion_cost = turn_cost + reverse_cost + safe_cost
-
-                # check if there is a screenshot penalty
-                if end.is_eq(new_x, new_y, new_direction):
-                    screenshot_cost = end.penalty
-                else:
-                    screenshot_cost = 0
-
-                # total cost f = g + h = safe_cost + rot_cost + screenshot_cost + dist + h (estimated distance)
-                total_cost = (
-                    dist
-                    + motion_cost
-                    + screenshot_cost
-                    + self._estimate_distance(
-                        CellState(new_x, new_y, new_direction), end
-                    )
-                )
+                # total cost f = g + h = safe_cost + rot_cost + dist + h (estimated distance)
+                # the screenshot penalty of the end state is added when the travel cost is looked up
+                new_dist = dist + motion_cost
+                total_cost = new_dist + heuristic[new_state]
 
                 # update the g distance if the new state has not been visited or the new cost is less than the previous cost
-                if (new_x, new_y, new_direction) not in g_dist or g_dist[
-                    (new_x, new_y, new_direction)
-                ] > dist + motion_cost + screenshot_cost:
-                    g_dist[(new_x, new_y, new_direction)] = dist + \
-                        motion_cost + screenshot_cost
+                if new_state not in g_dist or g_dist[new_state] > new_dist:
+                    g_dist[new_state] = new_dist
 
                     # add the new state to the heap
-                    heapq.heappush(
-                        heap, (total_cost, new_x, new_y, new_direction))
+                    heapq.heappush(heap, (total_cost, new_state))
+                    pushes += 1
 
                     # update the parent dict
-                    parent_dict[(new_x, new_y, new_direction)] = (
-                        x, y, direction)
-
-    def _get_neighboring_states(
-            self, x: int, y: int, direction: Direction
-    ) -> list[tuple[int, int, Direction, int, Motion]]:
-        """
-        Returns list of possible valid cell states the robot can reach from its current position
-        Neighbors have the following format: (newX, newY, movement direction, safe cost, motion)
-        """
-        # cell state already visited. caching significantly reduces algo runtime
-        if (x, y, direction) in self.neighbor_cache:
-            return self.neighbor_cache[(x, y, direction)]
-        neighbors = []
-
-        for dx, dy, md in MOVE_DIRECTION:
-            if md == direction:  # if the new direction == md means straight-line motion
-                # FORWARD
-                if self.grid.reachable(x + dx, y + dy):  # go forward;
-                    # Get safe cost of destination
-                    safe_cost = self._calculate_safe_cost(x + dx, y + dy)
-                    motion = Motion.FORWARD
-                    neighbors.append((x + dx, y + dy, md, safe_cost, motion))
-
-                # REVERSE
-                if self.grid.reachable(x - dx, y - dy):  # go back;
-                    # Get safe cost of destination
-                    safe_cost = self._calculate_safe_cost(x - dx, y - dy)
-                    motion = Motion.REVERSE
-                    neighbors.append((x - dx, y - dy, md, safe_cost, motion))
-
-            else:  # Turns
-                delta_big = TURN_DISPLACEMENT[0]
-                delta_small = TURN_DISPLACEMENT[1]
-
-                # north -> east
-                if direction == Direction.NORTH and md == Direction.EAST:
-                    # FORWARD_RIGHT_TURN
-                    if self.grid.turn_reachable(
-                        x, y, x + delta_big, y + delta_small, direction
-                    ):
-                        safe_cost = self._calculate_safe_cost(
-                            x + delta_big, y + delta_small
-                        )
-                        motion = Motion.FORWARD_RIGHT_TURN
-                        neighbors.append(
-                            (x + delta_big, y + delta_small,
-                             md, safe_cost, motion)
-                        )
-
-                    # REVERSE_LEFT_TURN
-                    if self.grid.turn_reachable(
-                        x, y, x - delta_small, y - delta_big, direction
-                    ):
-                        safe_cost = self._calculate_safe_cost(
-                            x - delta_small, y - delta_big
-                        )
-                        motion = Motion.REVERSE_LEFT_TURN
-                        neighbors.append(
-                            (x - delta_small, y - delta_big,
-                             md, safe_cost, motion)
-                        )
-
-                # east -> north
-                if direction == Direction.EAST and md == Direction.NORTH:
-                    # FORWARD_LEFT_TURN
-                    if self.grid.turn_reachable(
-                        x, y, x + delta_small, y + delta_big, direction
-                    ):
-                        safe_cost = self._calculate_safe_cost(
-                            x + delta_small, y + delta_big
-                        )
-                        motion = Motion.FORWARD_LEFT_TURN
-                        neighbors.append(
-                            (x + delta_small, y + delta_big,
-                             md, safe_cost, motion)
-                        )
-
-                    # REVERSE_RIGHT_TURN
-                    if self.grid.turn_reachable(
-                        x, y, x - delta_big, y - delta_small, direction
-                    ):
-                        safe_cost = self._calculate_safe_cost(
-                            x - delta_big, y - delta_small
-                        )
-                        motion = Motion.REVERSE_RIGHT_TURN
-                        neighbors.append(
-                            (x - delta_big, y - delta_small,
-                             md, safe_cost, motion)
-                        )
-
-                # east -> south
-                if direction == Direction.EAST and md == Direction.SOUTH:
-                    # FORWARD_RIGHT_TURN
-                    if self.grid.turn_reachable(
-                        x, y, x + delta_small, y - delta_big, direction
-                    ):
-                        safe_cost = self._calculate_safe_cost(
-                            x + delta_small, y - delta_big
-                        )
-                        motion = Motion.FORWARD_RIGHT_TURN
-                        neighbors.append(
-                            (x + delta_small, y - delta_big,
-                             md, safe_cost, motion)
-                        )
-
-                    # REVERSE_LEFT_TURN
-                    if self.grid.turn_reachable(
-                        x, y, x - delta_big, y + delta_small, direction
-                    ):
-                        safe_cost = self._calculate_safe_cost(
-                            x - delta_big, y + delta_small
-                        )
-                        motion = Motion.REVERSE_LEFT_TURN
-                        neighbors.append(
-                            (x - delta_big, y + delta_small,
-                             md, safe_cost, motion)
-                        )
-
-                # south -> east
-                if direction == Direction.SOUTH and md == Direction.EAST:
-                    # FORWARD_LEFT_TURN
-                    if self.grid.turn_reachable(
-                        x, y, x + delta_big, y - delta_small, direction
-                    ):
-                        safe_cost = self._calculate_safe_cost(
-                            x + delta_big, y - delta_small
-                        )
-                        motion = Motion.FORWARD_LEFT_TURN
-                        neighbors.append(
-                            (x + delta_big, y - delta_small,
-                             md, safe_cost, motion)
-                        )
-
-                    # REVERSE_RIGHT_TURN
-                    if self.grid.turn_reachable(
-                        x, y, x - delta_small, y + delta_big, direction
-                    ):
-                        safe_cost = self._calculate_safe_cost(
-                            x - delta_small, y + delta_big
-                        )
-                        motion = Motion.REVERSE_RIGHT_TURN
-                        neighbors.append(
-                            (x - delta_small, y + delta_big,
-                             md, safe_cost, motion)
-                        )
-
-                # south -> west
-                if direction == Direction.SOUTH and md == Direction.WEST:
-                    # FORWARD_RIGHT_TURN
-                    if self.grid.turn_reachable(
-                        x, y, x - delta_big, y - delta_small, direction
-                    ):
-                        safe_cost = self._calculate_safe_cost(
-                            x - delta_big, y - delta_small
-                        )
-                        motion = Motion.FORWARD_RIGHT_TURN
-                        neighbors.append(
-                            (x - delta_big, y - delta_small,
-                             md, safe_cost, motion)
-                        )
-
-                    # REVERSE_LEFT_TURN
-                    if self.grid.turn_reachable(
-                        x, y, x + delta_small, y + delta_big, direction
-                    ):
-                        safe_cost = self._calculate_safe_cost(
-                            x + delta_small, y + delta_big
-                        )
-                        motion = Motion.REVERSE_LEFT_TURN
-                        neighbors.append(
-                            (x + delta_small, y + delta_big,
-                             md, safe_cost, motion)
-                        )
-
-                # west -> south
-                if direction == Direction.WEST and md == Direction.SOUTH:
-                    # FORWARD_LEFT_TURN
-                    if self.grid.turn_reachable(
-                        x, y, x - delta_small, y - delta_big, direction
-                    ):
-                        safe_cost = self._calculate_safe_cost(
-                            x - delta_small, y - delta_big
-                        )
-                        motion = Motion.FORWARD_LEFT_TURN
-                        neighbors.append(
-                            (x - delta_small, y - delta_big,
-                             md, safe_cost, motion)
-                        )
-
-                    # REVERSE_RIGHT_TURN
-                    if self.grid.turn_reachable(
-                        x, y, x + delta_big, y + delta_small, direction
-                    ):
-                        safe_cost = self._calculate_safe_cost(
-                            x + delta_big, y + delta_small
-                        )
-                        motion = Motion.REVERSE_RIGHT_TURN
-                        neighbors.append(
-                            (x + delta_big, y + delta_small,
-                             md, safe_cost, motion)
-                        )
-
-                # west -> north
-                if direction == Direction.WEST and md == Direction.NORTH:
-                    # FORWARD_RIGHT_TURN
-                    if self.grid.turn_reachable(
-                        x, y, x - delta_small, y + delta_big, direction
-                    ):
-                        safe_cost = self._calculate_safe_cost(
-                            x - delta_small, y + delta_big
-                        )
-                        motion = Motion.FORWARD_RIGHT_TURN
-                        neighbors.append(
-                            (x - delta_small, y + delta_big,
-                             md, safe_cost, motion)
-                        )
-
-                    # REVERSE_LEFT_TURN
-                    if self.grid.turn_reachable(
-                        x, y, x + delta_big, y - delta_small, direction
-                    ):
-                        safe_cost = self._calculate_safe_cost(
-                            x + delta_big, y - delta_small
-                        )
-                        motion = Motion.REVERSE_LEFT_TURN
-                        neighbors.append(
-                            (x + delta_big, y - delta_small,
-                             md, safe_cost, motion)
-                        )
-
-                # north <-> west
-                if direction == Direction.NORTH and md == Direction.WEST:
-                    # FORWARD_LEFT_TURN
-                    if self.grid.turn_reachable(
-                        x, y, x - delta_big, y + delta_small, direction
-                    ):
-                        safe_cost = self._calculate_safe_cost(
-                            x - delta_big, y + delta_small
-                        )
-                        motion = Motion.FORWARD_LEFT_TURN
-                        neighbors.append(
-                            (x - delta_big, y + delta_small,
-                             md, safe_cost, motion)
-                        )
-
-                    # REVERSE_RIGHT_TURN
-                    if self.grid.turn_reachable(
-                        x, y, x + delta_small, y - delta_big, direction
-                    ):
-                        safe_cost = self._calculate_safe_cost(
-                            x + delta_small, y - delta_big
-                        )
-                        motion = Motion.REVERSE_RIGHT_TURN
-                        neighbors.append(
-                            (x + delta_small, y - delta_big,
-                             md, safe_cost, motion)
-                        )
-
-        self.neighbor_cache[(x, y, direction)] = neighbors
-        return neighbors
-
-    def _calculate_safe_cost(self, new_x: int, new_y: int) -> int:
-        """
-        calculates the safe cost of moving to a new position, considering obstacles that the robot might touch.
-        Currently, the function checks PADDING units in each direction.
-        """
-        for obj in self.grid.obstacles:
-            if abs(obj.x - new_x) <= PADDING and abs(obj.y - new_y) <= PADDING:
-                return SAFE_COST
-            if abs(obj.y - new_y) <= PADDING and abs(obj.x - new_x) <= PADDING:
-                return SAFE_COST
-        return 0
-
-    def _record_path(self, start: CellState, end: CellState, parent: dict[tuple[int, int, Direction], tuple[int, int, Direction]], cost: int) -> None:
-        """
-        Record the path between two states. Should be called only during the A* search.
-        """
-        # update the cost table for edges (start, end) and (end, start)
-        self.cost_table[(start, end)] = cost
-        self.cost_table[(end, start)] = cost
-
-        # record the path
-        path = []
-        parent_pointer = (end.x, end.y, end.direction)
-        while parent_pointer in parent:
-            path.append(parent_pointer)
-            parent_pointer = parent[parent_pointer]
-        path.append(parent_pointer)
-
-        # reverse the path and store it in the path table
-        self.path_table[(start, end)] = path[::-1]
-        self.path_table[(end, start)] = path
+                    parent_dict[new_state] = (state, motion)
 
-    @staticmethod
-    def _estimate_distance(
-            start: CellState, end: CellState, level: int = 0,
-    ) -> int:
+        self._add_search_counters(
+            {"nodes_expanded": len(visited), "heap_pushes": pushes, "heap_pops": pushes - len(heap)})
+
+    def _bidirectional_search(self, start: CellState, end: CellState) -> None:
         """
-        Estimate the distance between two states.
-        level 0: Manhattan distance
-        level 1: Euclidean distance
+        Bidirectional A* search to find the shortest path between two states.
+        A forward search from the start state and a backward search from the end state (over the moves into each state)
+        are expanded in turns until they meet in the middle, which expands fewer states than a single search on long paths.
+
+        Both searches use the average of the heuristic to the end state and from the start state, so that they share
+        the same reduced move costs and the usual bidirectional stopping condition applies:
+        stop once the best keys of the two searches add up to at least the cost of the best path found.
         """
-        horizontal_distance = start.x - end.x
-        vertical_distance = start.y - end.y
+        # check if the path has already been calculated or no obstacle is in its way
+        if self._has_path(start, end) or self._follow_distance_table(start, end):
+            return
 
-        # Euclidean distance
-        if level == 1:
-            return math.sqrt(horizontal_distance ** 2 + vertical_distance ** 2)
+        table = self._get_transition_table()
+        start_state = table.state_index(start.x, start.y, start.direction)
+        end_state = table.state_index(end.x, end.y, end.direction)
+        to_end = table.get_heuristic(end.x, end.y, end.direction)
+        from_start = table.get_heuristic(start.x, start.y, start.direction, reverse=True)
+
+        # forward search uses potential p, backward search uses potential -p
+        def potential(state): return (to_end[state] - from_start[state]) / 2
+
+        # for each search: actual distance, visited states, parent (forward) or child (backward) state and motion, and heap
+        g_dist = ({start_state: 0}, {end_state: 0})
+        visited = (set(), set())
+        links = ({}, {})
+        heaps = ([(potential(start_state), start_state)], [(-potential(end_state), end_state)])
+        moves = (table.neighbors, table.predecessors)
+        sign = (1, -1)
+
+        best_cost, meeting_state = math.inf, None
+        side = 0
+        pushes = 2
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best_cost:
+                break
 
-        # Manhattan distance
-        return abs(horizontal_distance) + abs(vertical_distance)
+            # expand the search with the smaller frontier
+            side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+            _, state = heapq.heappop(heaps[side])
+            if state in visited[side]:
+                continue
+            visited[side].add(state)
+            dist = g_dist[side][state]
 
-    @staticmethod
-    def _get_visit_options(n: int) -> list[str]:
+            for new_state, motion_cost, motion in moves[side][state]:
+                if new_state in visited[side]:
+                    continue
+
+                new_dist = dist + motion_cost
+                if new_state not in g_dist[side] or g_dist[side][new_state] > new_dist:
+                    g_dist[side][new_state] = new_dist
+                    heapq.heappush(heaps[side], (new_dist + sign[side] * potential(new_state), new_state))
+                    pushes += 1
+                    links[side][new_state] = (state, motion)
+
+                    # check if the new state joins up with the other search
+                    if new_state in g_dist[1 - side] and new_dist + g_dist[1 - side][new_state] < best_cost:
+                        best_cost = new_dist + g_dist[1 - side][new_state]
+                        meeting_state = new_state
+
+        self._add_search_counters({
+            "nodes_expanded": len(visited[0]) + len(visited[1]),
+            "heap_pushes": pushes,
+            "heap_pops": pushes - len(heaps[0]) - len(heaps[1]),
+        })
+        if meeting_state is None:
+            return
+
+        # join the states from the start state to the meeting state and from the meeting state to the end state
+        forward = [meeting_state]
+        while forward[-1] != start_state:
+            forward.append(links[0][forward[-1]][0])
+        parent_dict = {state: links[0][state] for state in forward[:-1]}
+
+        state = meeting_state
+        while state != end_state:
+            child_state, motion = links[1][state]
+            # the two halves may share states if the path has a loop of zero cost, so cut the loop out
+            if child_state in parent_dict or child_state == start_state:
+                loop_state = child_state
+                while state != loop_state:
+                    state = parent_dict.pop(state)[0]
+                state = child_state
+                continue
+            parent_dict[child_state] = (state, motion)
+            state = child_state
+        self._record_path(start, end, parent_dict, best_cost)
+
+    def _has_path(self, start: CellState, end: CellState) -> bool:
+        """
+        Checks if the path between two states has already been calculated.
+        If not, the path is loaded from the path store if a path stored from a previous obstacle layout is still valid.
+        Sets self.has_approximate_costs if the path may not be the cheapest.
+        """
+        start_pose, end_pose = start.get_pose(), end.get_pose()
+        if (start_pose, end_pose) in self.path_table:
+            if (start_pose, end_pose) in self.approximate_paths:
+                self.has_approximate_costs = True
+            self.stats["path_table_hits"] += 1
+            return True
+        if self.path_store is None:
+            return False
+
+        size_x, size_y, cell_size = self.grid.size_x, self.grid.size_y, self.grid.cell_size
+        stored = self.path_store.get(
+            (size_x, size_y, cell_size, start_pose, end_pose), self._get_obstacle_positions(), size_y)
+        if stored is None:
+            return False
+
+        motions, cost, is_shortest = stored
+        self.path_table[(start_pose, end_pose)] = motions
+        self.cost_table[(start_pose, end_pose)] = cost
+        # a cheaper path may have opened up since the path was stored, so the tours found with it are not proven optimal
+        if not is_shortest:
+            self.approximate_paths.add((start_pose, end_pose))
+            self.has_approximate_costs = True
+        self.stats["path_store_hits"] += 1
+        return True
+
+    def _get_obstacle_positions(self) -> frozenset[tuple[int, int]]:
         """
-        Generate all possible visit options for n-digit binary numbers
+        Returns the x, y positions of the obstacles, which are all that the paths depend on
+        """
+        return frozenset((ob.x, ob.y) for ob in self.grid.obstacles)
+
+    def _get_transition_table(self) -> TransitionTable:
+        """
+        Returns the transition table of the current obstacle layout, building it if the obstacles have changed
+        """
+        if self.transition_table is None:
+            self.transition_table = TransitionTable(self.grid)
+        return self.transition_table
+
+    def _record_path(self, start: CellState, end: CellState, parent: dict[int, tuple[int, Motion]], cost: int) -> None:
+        """
+        Record the path between two states and the motions along it. Should be called only during the A* or Dijkstra search.
+        """
+        table = self.transition_table
+        path, motions = table.trace_path(parent, table.state_index(end.x, end.y, end.direction))
+        self._store_path(start, end, path, motions, cost)
+
+    def _store_path(
+            self,
+            start: CellState,
+            end: CellState,
+            path: list[tuple[int, int, Direction]],
+            motions: np.ndarray,
+            cost: int,
+    ) -> None:
+        """
+        Store the path from the start state to the end state, and the motions along it.
+
+        Paths and costs are recorded by pose, and the costs exclude the screenshot penalty of the end state.
+
+        Args:
+            path: (x, y, direction) of the states from end back to start
+            motions: int8 Motion values along the path from start to end
+            cost: cost of the path from start to end
         """
-        max_len = bin(2 ** n - 1).count("1")
-        strings = [bin(i)[2:].zfill(max_len) for i in range(2 ** n)]
-        strings.sort(key=lambda x: x.count("1"), reverse=True)
-        return strings
+        start_pose, end_pose = start.get_pose(), end.get_pose()
+        self.cost_table[(start_pose, end_pose)] = cost
+        self.path_table[(start_pose, end_pose)] = motions
+
+        # keep the path to reuse with other obstacle layouts
+        if self.path_store is not None:
+            grid = self.grid
+            mask = PathStore.get_dependency_mask(
+                path, grid.size_y, max(grid.padding + grid.safe_cost_falloff, grid.turn_padding, grid.mid_turn_padding))
+            self.path_store.put(
+                (grid.size_x, grid.size_y, grid.cell_size, start_pose, end_pose), motions, cost,
+                self._get_obstacle_positions(), mask)
 
     @staticmethod
-    def _generate_combinations(
-            view_positions: list[list[CellState]],
-            index: int,
-            current: list[int],
-            result: list[list[int]],
-            num_iters: int,
-    ) -> list[list[int]]:
-        """
-        Generate all possible combinations of the view positions, where one view state is selected for each obstacle
-
-        :return: A list of lists, where each inner list is a unique combination of selected view states for all obstacles
-        """
-        # if all the view positions have been visited, add the current iteration's combination to the result
-        if index == len(view_positions):
-            result.append(current.copy())
-            return result
-
-        # if the number of iterations is 0, return the result
-        if num_iters == 0:
-            return result
-
-        # update the number of iterations
-        num_iters -= 1
-
-        # iterate over the view positions and generate the combinations for the next view position
-        for i in range(len(view_positions[index])):
-            current.append(i)
-            result = MazeSolver._generate_combinations(
-                view_positions, index + 1, current, result, num_iters
-            )
-            current.pop()
+    def _generate_combinations(view_positions: list[list[CellState]]) -> Iterator[list[int]]:
+        """
+        Lazily generate all possible combinations of the view positions, where one view state is selected for each obstacle,
+        in order of the total penalty of the selected view states.
+
+        Best-first enumeration: the view states of each obstacle are ranked by penalty, and a combination of ranks is followed by
+        the combinations that rank one obstacle's view state one lower. To generate each combination once, only obstacles from
+        the last obstacle whose view state is not its best are moved down.
+
+        :return: An iterator of lists, where each list is a unique combination of selected view states for all obstacles
+        """
+        if not all(view_positions):
+            return
+
+        # view states of each obstacle in order of penalty
+        ranked = [sorted(range(len(view_pos)), key=lambda idx: view_pos[idx].penalty) for view_pos in view_positions]
+        penalties = [[view_pos[idx].penalty for idx in order] for view_pos, order in zip(view_positions, ranked)]
 
-        return result
+        first = (0,) * len(view_positions)
+        heap = [(sum(penalty[0] for penalty in penalties), first)]
+        while heap:
+            penalty, ranks = heapq.heappop(heap)
+            yield [order[rank] for order, rank in zip(ranked, ranks)]
+
+            last_moved = max((idx for idx, rank in enumerate(ranks) if rank), default=0)
+            for idx in range(last_moved, len(ranks)):
+                if ranks[idx] + 1 < len(ranked[idx]):
+                    new_ranks = ranks[:idx] + (ranks[idx] + 1,) + ranks[idx + 1:]
+                    new_penalty = penalty - penalties[idx][ranks[idx]] + penalties[idx][ranks[idx] + 1]
+                    heapq.heappush(heap, (new_penalty, new_ranks))
 
     @staticmethod
     def _get_capture_relative_position(
@@ -725,32 +1113,39 @@ class MazeSolver:
             self, optimal_path: list[CellState]
     ) -> tuple[list[Motion], list[str], list[Obstacle]]:
         """
-        Convert the optimal path to a list of motions that the robot needs to take
+        Convert the optimal path to a list of motions that the robot needs to take.
+
+        The optimal path is split at its screenshot positions into the paths between the states of the tour,
+        and the motions recorded with each of those paths are joined together.
+        """
+        with self._measure("motion_decoding"):
+            return self._decode_motions(optimal_path)
+
+    def _decode_motions(
+            self, optimal_path: list[CellState]
+    ) -> tuple[list[Motion], list[str], list[Obstacle]]:
+        """
+        Joins the motions of the paths between the screenshot positions of the optimal path. See optimal_path_to_motion_path()
         """
         # requires the path table to be filled and the optimal path to be calculated
         motion_path = []
         obstacle_id_with_signals = []
         scanned_obstacles = []
-        for i in range(len(optimal_path) - 1):
-            from_state = optimal_path[i]
-            to_state = optimal_path[i + 1]
-            x, y, d = from_state.x, from_state.y, from_state.direction
-            x_new, y_new, d_new = to_state.x, to_state.y, to_state.direction
-
-            if (x_new, y_new, d_new, x, y, d) in self.motion_table:
-                # if the motion is not found, check the reverse motion and get its opposite
-                motion = self.motion_table[
-                    (x_new, y_new, d_new, x, y, d)
-                ].opposite_motion()
-            elif (x, y, d, x_new, y_new, d_new) in self.motion_table:
-                motion = self.motion_table[(x, y, d, x_new, y_new, d_new)]
-            else:
-                # if the motion is still not found, then the path is invalid
+        leg_start = 0
+        for i in range(1, len(optimal_path)):
+            to_state = optimal_path[i]
+            if to_state.screenshot_id is None and i < len(optimal_path) - 1:
+                continue
+
+            from_state = optimal_path[leg_start]
+            motions = self.path_table.get((from_state.get_pose(), to_state.get_pose()))
+            if motions is None or len(motions) != i - leg_start:
+                # if the path is not found, then the optimal path was not built from the path table
                 raise ValueError(
                     f"Invalid path from {from_state} to {to_state}. This should never happen."
                 )
-
-            motion_path.append(motion)
+            motion_path.extend(map(Motion, motions.tolist()))
+            leg_start = i
 
             # check if the robot is taking a screenshot
             if to_state.screenshot_id != None:
@@ -0,0 +1,219 @@
+from collections import OrderedDict
+from typing import Union
+import threading
+import numpy as np
+from algo.tools import consts
+from algo.tools.consts import (
+    ARENA_WIDTH, ARENA_HEIGHT, CELL_SIZE, PLAN_CACHE_SIZE, PATH_STORE_SIZE, PADDING, TURN_PADDING, MID_TURN_PADDING,
+    SAFE_COST_FALLOFF
+)
+from algo.tools.movement import Direction
+
+# snapshot of the solver constants, so that plans solved with different tuning are never mixed up
+SOLVER_CONSTANTS: tuple = tuple(
+    (name, repr(value)) for name, value in sorted(vars(consts).items()) if name.isupper()
+)
+
+
+class PlanCache:
+    """
+    Thread-safe LRU cache of solved plans, keyed on the canonical obstacle layout, robot start pose, deadline and solver constants.
+    Used to answer repeated path requests (eg. retries from the RPI) without solving them again.
+    """
+
+    def __init__(self, capacity: int = PLAN_CACHE_SIZE) -> None:
+        """
+        Args:
+            capacity (int): max no. of plans to keep. The least recently used plan is evicted first
+        """
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._plans: OrderedDict[tuple, object] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+            obstacles: list[dict],
+            robot_x: int,
+            robot_y: int,
+            robot_direction: int,
+            size_x: int = ARENA_WIDTH,
+            size_y: int = ARENA_HEIGHT,
+            cell_size: int = CELL_SIZE,
+            deadline_ms: Union[int, None] = None,
+    ) -> tuple:
+        """
+        Builds the cache key of a path request. Obstacles are sorted so that the same layout sent in a different order shares a key.
+
+        Args:
+            obstacles (list[dict]): obstacles with keys 'x', 'y', 'd' and 'id'
+            deadline_ms (Union[int, None]): time budget of the request. A plan found under a deadline may not be optimal,
+                so it is only reused by requests with the same deadline
+        """
+        return (
+            PlanCache.make_layout_key(obstacles, size_x, size_y, cell_size), robot_x, robot_y, int(robot_direction), deadline_ms
+        )
+
+    @staticmethod
+    def make_layout_key(
+            obstacles: list[dict], size_x: int = ARENA_WIDTH, size_y: int = ARENA_HEIGHT, cell_size: int = CELL_SIZE
+    ) -> tuple:
+        """
+        Builds the cache key of an obstacle layout, regardless of where the robot starts
+        """
+        layout = tuple(sorted(
+            (ob['x'], ob['y'], int(ob['d']), ob['id']) for ob in obstacles
+        ))
+        return (layout, size_x, size_y, cell_size, SOLVER_CONSTANTS)
+
+    def get(self, key: tuple) -> Union[object, None]:
+        """
+        Returns the plan cached for the key, None if there is none
+        """
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                self.misses += 1
+                return None
+            self._plans.move_to_end(key)
+            self.hits += 1
+            return plan
+
+    def put(self, key: tuple, plan: object) -> None:
+        """
+        Caches the plan for the key, replacing any plan that is already cached for it
+        """
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.capacity:
+                self._plans.popitem(last=False)
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Returns the hit and miss counters, and the no. of cached plans
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._plans),
+                "capacity": self.capacity,
+            }
+
+
+class PathStore:
+    """
+    Thread-safe LRU store of the pairwise paths found by MazeSolver, shared across obstacle layouts.
+
+    Each path is stored with the obstacle positions it was searched with, and a bitmask of the cells that an obstacle
+    must be in to change whether the path is collision-free or its cost (see get_dependency_mask()).
+    A stored path is reused for a new layout if none of the obstacles added or removed since lies in those cells.
+
+    NOTE: A reused path is still collision-free and has the same cost, but only its own cells are checked,
+    so a cheaper path opened up by a removed obstacle further away is not searched for.
+    get() reports whether an obstacle has been removed, so that tours found with the path are not claimed to be optimal.
+    """
+
+    def __init__(self, capacity: int = PATH_STORE_SIZE) -> None:
+        """
+        Args:
+            capacity (int): max no. of paths to keep. The least recently used path is evicted first
+        """
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._paths: OrderedDict[tuple, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_dependency_mask(
+            path: list[tuple[int, int, Direction]], size_y: int,
+            radius: int = max(PADDING + SAFE_COST_FALLOFF, TURN_PADDING, MID_TURN_PADDING)
+    ) -> int:
+        """
+        Returns the bitmask of cells (bit x * size_y + y) that an obstacle must be in to affect the path.
+
+        Every collision check of a move is within the bounding box of its start and end positions, padded by the largest
+        padding. The safe cost of a position depends on the obstacles up to PADDING + SAFE_COST_FALLOFF cells away,
+        so the box is padded by that instead if it is larger. Cells outside the grid are ignored as they never hold an obstacle.
+
+        Args:
+            radius (int): largest padding in cells of the grid of the path, counting the safe cost falloff after PADDING.
+                Default is the largest padding of 10 cm cells
+        """
+        mask = 0
+        for (x, y, _), (new_x, new_y, _) in zip(path, path[1:]):
+            min_y = max(min(y, new_y) - radius, 0)
+            max_y = min(max(y, new_y) + radius, size_y - 1)
+            column = ((1 << (max_y - min_y + 1)) - 1) << min_y
+            for cell_x in range(max(min(x, new_x) - radius, 0), max(x, new_x) + radius + 1):
+                mask |= column << (cell_x * size_y)
+        return mask
+
+    def get(
+            self, key: tuple, obstacle_positions: frozenset[tuple[int, int]], size_y: int
+    ) -> Union[tuple, None]:
+        """
+        Returns the stored path for the key if it is still valid with the given obstacle positions, None otherwise
+
+        Args:
+            key (tuple): (size_x, size_y, cell_size, start pose, end pose) of the path
+            obstacle_positions (frozenset[tuple[int, int]]): x, y positions of the obstacles of the current layout
+            size_y (int): size of the grid in the y direction, to locate cells in the dependency mask
+
+        Returns:
+            Union[tuple, None]: (motions, cost, is_shortest) of the stored path, where motions are int8 Motion values
+                along the path and is_shortest is whether it is still the shortest path, which it is unless an obstacle
+                has been removed since it was stored
+        """
+        with self._lock:
+            entry = self._paths.get(key)
+            if entry is not None:
+                motions, cost, entry_positions, mask = entry
+                changed = 0
+                for x, y in entry_positions ^ obstacle_positions:
+                    changed |= 1 << (x * size_y + y)
+                if changed & mask == 0:
+                    self._paths.move_to_end(key)
+                    self.hits += 1
+                    return motions, cost, entry_positions <= obstacle_positions
+            self.misses += 1
+            return None
+
+    def put(
+            self,
+            key: tuple,
+            motions: np.ndarray,
+            cost: int,
+            obstacle_positions: frozenset[tuple[int, int]],
+            mask: int,
+    ) -> None:
+        """
+        Stores the path for the key, replacing any path that is already stored for it
+
+        Args:
+            key (tuple): (size_x, size_y, cell_size, start pose, end pose) of the path
+            motions (np.ndarray): int8 Motion values along the path from the start pose
+            cost (int): cost of the path
+            obstacle_positions (frozenset[tuple[int, int]]): x, y positions of the obstacles the path was searched with
+            mask (int): cells the path depends on, see get_dependency_mask()
+        """
+        with self._lock:
+            self._paths[key] = (motions, cost, obstacle_positions, mask)
+            self._paths.move_to_end(key)
+            while len(self._paths) > self.capacity:
+                self._paths.popitem(last=False)
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Returns the hit and miss counters, and the no. of stored paths
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._paths),
+                "capacity": self.capacity,
+            }
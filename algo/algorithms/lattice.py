@@ -0,0 +1,509 @@
+from functools import lru_cache
+from typing import Union
+import heapq
+import os
+import numpy as np
+from algo.entities.entity import Grid
+from algo.tools.consts import TURN_DISPLACEMENT, TURN_FACTOR, REVERSE_FACTOR
+from algo.tools.movement import Direction, MOVE_DIRECTION, Motion
+
+# headings that a robot state can have, in the order of their index in the transition table
+HEADINGS: list[Direction] = [Direction.NORTH, Direction.EAST, Direction.SOUTH, Direction.WEST]
+
+# unit vector of each heading
+HEADING_VECTOR: dict[Direction, tuple[int, int]] = {
+    md: (dx, dy) for dx, dy, md in MOVE_DIRECTION
+}
+
+# max no. of moves from a state: forward, reverse and a forward and reverse turn to each side
+MAX_MOVES: int = 6
+
+# turn displacement of 10 cm cells. Grids of other cell sizes scale it, see Grid.turn_displacement
+DEFAULT_TURN_DISPLACEMENT: tuple[int, int] = (TURN_DISPLACEMENT[0], TURN_DISPLACEMENT[1])
+
+# directory of the distance tables written by build_tables.py, see get_distance_table_path()
+DISTANCE_TABLE_DIR: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "tables")
+# distance of a state that cannot reach the end state in a distance table
+UNREACHABLE: int = np.iinfo(np.int32).max
+
+
+def get_motion_templates(
+        direction: Direction, turn_displacement: tuple[int, int] = DEFAULT_TURN_DISPLACEMENT
+) -> list[tuple[Motion, int, int, Direction]]:
+    """
+    Derives the moves the robot can make when facing the given direction from the turn displacement in cells.
+
+    A forward turn moves turn_displacement[0] cells along the new heading and turn_displacement[1] cells along the old heading.
+    A reverse turn moves turn_displacement[0] cells against the old heading and turn_displacement[1] cells against the new heading.
+
+    Returns:
+        list[tuple[Motion, int, int, Direction]]: (motion, dx, dy, new direction) of every move
+    """
+    delta_big, delta_small = turn_displacement[0], turn_displacement[1]
+    old_x, old_y = HEADING_VECTOR[direction]
+
+    templates = []
+    for new_x, new_y, md in MOVE_DIRECTION:
+        if md == direction:
+            templates.append((Motion.FORWARD, new_x, new_y, md))
+            templates.append((Motion.REVERSE, -new_x, -new_y, md))
+            continue
+        # robot cannot turn 180 degrees in a single move
+        if (new_x, new_y) == (-old_x, -old_y):
+            continue
+
+        # clockwise turns are right turns going forward, and left turns when reversing
+        clockwise = (md - direction) % 8 == 2
+        templates.append((
+            Motion.FORWARD_RIGHT_TURN if clockwise else Motion.FORWARD_LEFT_TURN,
+            delta_big * new_x + delta_small * old_x,
+            delta_big * new_y + delta_small * old_y,
+            md,
+        ))
+        templates.append((
+            Motion.REVERSE_LEFT_TURN if clockwise else Motion.REVERSE_RIGHT_TURN,
+            -delta_big * old_x - delta_small * new_x,
+            -delta_big * old_y - delta_small * new_y,
+            md,
+        ))
+    return templates
+
+
+@lru_cache(maxsize=None)
+def get_motion_displacements(
+        turn_displacement: tuple[int, int] = DEFAULT_TURN_DISPLACEMENT
+) -> dict[tuple[int, int], tuple[int, int, Direction]]:
+    """
+    Returns the (dx, dy, new direction) of each move keyed by (direction, motion value). See get_motion_templates()
+    """
+    return {
+        (int(direction), int(motion)): (dx, dy, new_direction)
+        for direction in HEADINGS
+        for motion, dx, dy, new_direction in get_motion_templates(direction, turn_displacement)
+    }
+
+
+def get_path_poses(
+        start: tuple[int, int, Direction],
+        motions: np.ndarray,
+        turn_displacement: tuple[int, int] = DEFAULT_TURN_DISPLACEMENT,
+) -> list[tuple[int, int, Direction]]:
+    """
+    Replays the motions of a path from its start pose
+
+    Args:
+        start (tuple[int, int, Direction]): (x, y, direction) the path starts from
+        motions (np.ndarray): int8 Motion values along the path
+        turn_displacement (tuple[int, int]): turn displacement in cells of the grid of the path
+
+    Returns:
+        list[tuple[int, int, Direction]]: (x, y, direction) of the states along the path, including the start pose
+    """
+    displacements = get_motion_displacements(turn_displacement)
+    x, y, direction = start
+    path = [start]
+    for motion in motions.tolist():
+        dx, dy, direction = displacements[(int(direction), motion)]
+        x, y = x + dx, y + dy
+        path.append((x, y, direction))
+    return path
+
+
+@lru_cache(maxsize=None)
+def get_heuristic_table(
+        size_x: int, size_y: int, turn_displacement: tuple[int, int] = DEFAULT_TURN_DISPLACEMENT
+) -> np.ndarray:
+    """
+    Precomputes the cost of moving between every pair of poses in an obstacle-free lattice of the given size,
+    with the same turn and reverse costs as the transition table. Since obstacles only add safe costs and remove moves,
+    this is an admissible and consistent A* heuristic.
+
+    The lattice is the same everywhere, so the cost only depends on the (dx, dy) offset and the pair of headings.
+    Offsets range from -(size - 1) to size - 1, which covers every position of a path within the grid relative to its end.
+
+    Returns:
+        np.ndarray: (4, 2 * size_x - 1, 2 * size_y - 1, 4) cost from a pose to an end pose, indexed by
+            [end heading index, dx + size_x - 1, dy + size_y - 1, heading index] where dx, dy is the offset from the end pose
+    """
+    width, height = 2 * size_x - 1, 2 * size_y - 1
+
+    # moves that reach each heading, as (dx, dy, heading index before the move, cost)
+    incoming = [[] for _ in HEADINGS]
+    for heading, direction in enumerate(HEADINGS):
+        for motion, dx, dy, new_direction in get_motion_templates(direction, turn_displacement):
+            incoming[HEADINGS.index(new_direction)].append((
+                dx, dy, heading,
+                TURN_FACTOR * Direction.turn_cost(direction, new_direction) + REVERSE_FACTOR * motion.reverse_cost(),
+            ))
+
+    table = np.full((len(HEADINGS), width, height, len(HEADINGS)), np.iinfo(np.int32).max, dtype=np.int32)
+    for end_heading in range(len(HEADINGS)):
+        # uniform-cost search backwards from the end pose over (dx, dy, heading index)
+        dist = table[end_heading]
+        dist[size_x - 1, size_y - 1, end_heading] = 0
+        heap = [(0, size_x - 1, size_y - 1, end_heading)]
+        while heap:
+            cost, x, y, heading = heapq.heappop(heap)
+            if cost > dist[x, y, heading]:
+                continue
+            for dx, dy, prev_heading, move_cost in incoming[heading]:
+                prev_x, prev_y = x - dx, y - dy
+                if not (0 <= prev_x < width and 0 <= prev_y < height):
+                    continue
+                if cost + move_cost < dist[prev_x, prev_y, prev_heading]:
+                    dist[prev_x, prev_y, prev_heading] = cost + move_cost
+                    heapq.heappush(heap, (cost + move_cost, prev_x, prev_y, prev_heading))
+    return table
+
+
+def get_distance_table_path(grid: Grid, table_dir: str = DISTANCE_TABLE_DIR) -> str:
+    """
+    Returns the file of the distance table of an empty grid of the same size and robot geometry as the given grid.
+    The name holds everything the distances depend on, so a table built before a constant was tuned is never loaded.
+    """
+    return os.path.join(table_dir, (
+        f"distances_{grid.size_x}x{grid.size_y}_offset{grid.offset}"
+        f"_turn{grid.turn_displacement[0]}x{grid.turn_displacement[1]}_cost{TURN_FACTOR}x{REVERSE_FACTOR}.npy"
+    ))
+
+
+def load_distance_table(path: str) -> Union[np.ndarray, None]:
+    """
+    Memory-maps a distance table written by build_tables.py, see build_distance_table().
+    Mapping the file takes about a millisecond, and only the parts of the table that are looked up are read from disk.
+    Each process maps the file once and shares its pages with the other processes.
+    A missing table is looked for again on every call, and a rebuilt table is mapped again, so a table built by
+    build_tables.py while the API is running is used from the next solve.
+
+    Returns:
+        Union[np.ndarray, None]: read-only distance table, None if it has not been built
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    return _map_distance_table(path, mtime)
+
+
+@lru_cache(maxsize=8)
+def _map_distance_table(path: str, mtime: int) -> np.ndarray:
+    """
+    Memory-maps the distance table file, once for each time it was modified. See load_distance_table()
+    """
+    return np.load(path, mmap_mode="r")
+
+
+def build_distance_table(size_x: int, size_y: int, cell_size: int) -> np.ndarray:
+    """
+    Computes the distance between every pair of states of an empty grid with a uniform-cost search from each state.
+
+    Unlike get_heuristic_table(), the distances account for the edges of the grid, so they are the exact cost of the
+    paths when no obstacle is in the way. Obstacles only add safe costs and remove moves, so they are never more than
+    the cost with obstacles, and a path that keeps to them is the shortest path (see TransitionTable.follow_distance_table()).
+    This takes seconds for a 20x20 grid, so the table is built offline by build_tables.py and memory-mapped by the solver.
+
+    Returns:
+        np.ndarray: (num_states, num_states) int32 distance from each start state to each state, indexed by [start state, state].
+            Distances are packed as cost << state_bits | no. of moves, the same as the keys of TransitionTable.search(),
+            and are UNREACHABLE if there is no path
+    """
+    table = TransitionTable(Grid(size_x, size_y, cell_size))
+    bits = table.state_bits
+    state_mask = (1 << bits) - 1
+
+    distances = np.full((table.num_states, table.num_states), UNREACHABLE, dtype=np.int32)
+    for start_state in range(table.num_states):
+        dist = [None] * table.num_states
+        dist[start_state] = 0
+        heap = [start_state]
+        while heap:
+            key = heapq.heappop(heap)
+            state = key & state_mask
+            if dist[state] != key >> bits:
+                continue
+            for new_state, move_dist, _ in table._search_moves[state]:
+                new_dist = (key >> bits) + move_dist
+                if dist[new_state] is None or dist[new_state] > new_dist:
+                    dist[new_state] = new_dist
+                    heapq.heappush(heap, new_dist << bits | new_state)
+        distances[start_state] = [UNREACHABLE if d is None else d for d in dist]
+    return distances
+
+
+class TransitionTable:
+    """
+    Precomputed state lattice of every valid move from every (x, y, direction) state in the grid.
+
+    States are numbered (x * size_y + y) * 4 + heading index, so ordering states by index is the same as ordering by (x, y, direction).
+    The table is array-backed and built once per obstacle layout:
+        dest: (num_states, MAX_MOVES) index of the destination state, -1 if the move is not possible
+        motion: (num_states, MAX_MOVES) Motion value of the move
+        safe_cost: (num_states, MAX_MOVES) safe cost of the destination cell
+        cost: (num_states, MAX_MOVES) total cost of the move (turn cost + reverse cost + safe cost)
+    """
+
+    def __init__(self, grid: Grid) -> None:
+        """
+        Args:
+            grid (Grid): grid with the obstacles to check for collisions against and the safe cost of each position
+        """
+        self.size_x = grid.size_x
+        self.size_y = grid.size_y
+        self.turn_displacement = grid.turn_displacement
+        self.num_states = self.size_x * self.size_y * len(HEADINGS)
+
+        safe_cost_map = grid.safe_cost_map()
+
+        shape = (self.size_x, self.size_y, len(HEADINGS), MAX_MOVES)
+        dest = np.full(shape, -1, dtype=np.int32)
+        motion = np.zeros(shape, dtype=np.int8)
+        safe = np.zeros(shape, dtype=np.int32)
+        cost = np.zeros(shape, dtype=np.int32)
+
+        xs, ys = np.meshgrid(np.arange(self.size_x), np.arange(self.size_y), indexing="ij")
+        for heading, direction in enumerate(HEADINGS):
+            for move, (move_motion, dx, dy, new_direction) in enumerate(get_motion_templates(direction, self.turn_displacement)):
+                if new_direction == direction:
+                    mask = grid.reachable_map(dx, dy)
+                else:
+                    mask = grid.turn_reachable_map(dx, dy, direction)
+
+                new_x, new_y = xs[mask] + dx, ys[mask] + dy
+                move_safe_cost = safe_cost_map[new_x, new_y]
+                move_cost = (
+                    TURN_FACTOR * Direction.turn_cost(direction, new_direction)
+                    + REVERSE_FACTOR * move_motion.reverse_cost()
+                )
+
+                dest[mask, heading, move] = self.state_index(new_x, new_y, new_direction)
+                motion[mask, heading, move] = move_motion.value
+                safe[mask, heading, move] = move_safe_cost
+                cost[mask, heading, move] = move_safe_cost + move_cost
+
+        self.dest = dest.reshape(self.num_states, MAX_MOVES)
+        self.motion = motion.reshape(self.num_states, MAX_MOVES)
+        self.safe_cost = safe.reshape(self.num_states, MAX_MOVES)
+        self.cost = cost.reshape(self.num_states, MAX_MOVES)
+
+        # python lists are faster than numpy arrays to index one element at a time in the search loop
+        motion_by_value = {motion.value: motion for motion in Motion}
+        self.neighbors: list[list[tuple[int, int, Motion]]] = [
+            [(d, c, motion_by_value[m]) for d, c, m in zip(dests, costs, motions) if d >= 0]
+            for dests, costs, motions in zip(self.dest.tolist(), self.cost.tolist(), self.motion.tolist())
+        ]
+        # moves into each state as (source state, cost, motion), for searching backwards from an end state
+        self.predecessors: list[list[tuple[int, int, Motion]]] = [[] for _ in range(self.num_states)]
+        for state, moves in enumerate(self.neighbors):
+            for new_state, move_cost, move_motion in moves:
+                self.predecessors[new_state].append((state, move_cost, move_motion))
+        # search keys pack (cost, no. of moves, state) into one int with state_bits bits for the no. of moves and the state,
+        # which orders the same as the tuple and is much faster to push and pop. A path never has more moves than states.
+        self.state_bits = self.num_states.bit_length()
+        # moves from each state as (destination state, packed (cost, 1 move), motion) for search()
+        self._search_moves: list[list[tuple[int, int, Motion]]] = [
+            [(new_state, (move_cost << self.state_bits) + 1, move_motion) for new_state, move_cost, move_motion in moves]
+            for moves in self.neighbors
+        ]
+        # decoded position of each state
+        self.xs: list[int] = [state // (self.size_y * len(HEADINGS)) for state in range(self.num_states)]
+        self.ys: list[int] = [state // len(HEADINGS) % self.size_y for state in range(self.num_states)]
+        self.directions: list[Direction] = [HEADINGS[state % len(HEADINGS)] for state in range(self.num_states)]
+        # heuristic of every state to each end pose that has been searched for
+        self._heuristics: dict[tuple[int, int, int, bool], list[int]] = {}
+        # distance table of the empty grid, which is memory-mapped by each process that uses it. See get_distance_table()
+        self.distance_table_path = get_distance_table_path(grid)
+        # distance from each start state that has been followed to every state, see follow_distance_table()
+        self._distances_from: dict[int, list[int]] = {}
+
+    def state_index(self, x, y, direction):
+        """
+        Index of the (x, y, direction) state in the table. Works on both ints and numpy arrays of x and y.
+        """
+        return (x * self.size_y + y) * len(HEADINGS) + int(direction) // 2
+
+    def get_distance_table(self) -> Union[np.ndarray, None]:
+        """
+        Returns the distance table of the empty grid (see build_distance_table()), None if it has not been built
+        """
+        distances = load_distance_table(self.distance_table_path)
+        if distances is None or distances.shape != (self.num_states, self.num_states):
+            return None
+        return distances
+
+    def get_heuristic(self, x: int, y: int, direction: Direction, reverse: bool = False) -> list[int]:
+        """
+        Looks up the admissible cost from every state to the (x, y, direction) end state.
+        The exact cost in the empty grid is looked up from the distance table if it has been built,
+        otherwise the cost in an obstacle-free lattice is looked up from the heuristic table.
+
+        Args:
+            reverse (bool): look up the cost from the (x, y, direction) start state to every state instead. Default is False
+
+        Returns:
+            list[int]: heuristic of each state, indexed by state
+        """
+        key = (x, y, int(direction), reverse)
+        if key not in self._heuristics:
+            distances = self.get_distance_table()
+            if distances is not None:
+                state = self.state_index(x, y, direction)
+                heuristic = (distances[state] if reverse else distances[:, state]) >> self.state_bits
+            else:
+                table = get_heuristic_table(self.size_x, self.size_y, self.turn_displacement)
+                xs, ys, headings = np.unravel_index(
+                    np.arange(self.num_states), (self.size_x, self.size_y, len(HEADINGS)))
+                if reverse:
+                    heuristic = table[headings, x - xs + self.size_x - 1, y - ys + self.size_y - 1, int(direction) // 2]
+                else:
+                    heuristic = table[int(direction) // 2, xs - x + self.size_x - 1, ys - y + self.size_y - 1, headings]
+            self._heuristics[key] = heuristic.tolist()
+        return self._heuristics[key]
+
+    def follow_distance_table(
+            self, start_state: int, end_state: int
+    ) -> Union[tuple[int, dict[int, tuple[int, Motion]]], None]:
+        """
+        Finds the shortest path between two states without a search, if no obstacle is in the way of it.
+
+        From the end state, the path is traced back over the moves of this grid whose cost plus the distance of their
+        source state from the start state in the distance table is the distance of the state they move into.
+        Each move then costs the same as in the empty grid, so a path that reaches the start state costs its distance
+        in the empty grid, which no path around obstacles can beat.
+        The moves are tried in the order that search() expands their source states, backing out of the states that
+        an obstacle or its safe cost cuts off from the start state, so the path is the same path search() would find.
+
+        Returns:
+            Union[tuple[int, dict[int, tuple[int, Motion]]], None]: cost of the path and the parent state and motion of
+                each state along it (see trace_path()), None if there is no distance table or no path keeps to it
+        """
+        if start_state not in self._distances_from:
+            distances = self.get_distance_table()
+            if distances is None:
+                return None
+            self._distances_from[start_state] = distances[start_state].tolist()
+        from_start = self._distances_from[start_state]
+        if from_start[end_state] == UNREACHABLE:
+            return None
+
+        bits = self.state_bits
+
+        def get_moves(state):
+            # moves into the state that keep to its distance, in the order search() expands their source states
+            dist = from_start[state]
+            return iter(sorted(
+                (from_start[prev_state] << bits | prev_state, prev_state, motion)
+                for prev_state, move_cost, motion in self.predecessors[state]
+                if from_start[prev_state] + (move_cost << bits) + 1 == dist
+            ))
+
+        # states from the end state back to the current state, with the moves into each state left to try
+        path = [end_state]
+        moves = [get_moves(end_state)]
+        taken = []
+        # states that cannot be reached from the start state within their distance
+        blocked = set()
+        while path[-1] != start_state:
+            for _, prev_state, motion in moves[-1]:
+                if prev_state not in blocked:
+                    path.append(prev_state)
+                    moves.append(get_moves(prev_state))
+                    taken.append(motion)
+                    break
+            else:
+                blocked.add(path.pop())
+                moves.pop()
+                if not path:
+                    return None
+                taken.pop()
+
+        parent = {state: (prev_state, motion) for state, prev_state, motion in zip(path, path[1:], taken)}
+        return from_start[end_state] >> bits, parent
+
+    def search(
+            self, start_state: int, targets: set[int]
+    ) -> tuple[dict[int, int], dict[int, tuple[int, Motion]], dict[str, int]]:
+        """
+        Uniform-cost search to find the shortest paths from one state to many states at once.
+        Among paths of the same cost, the path with the fewest moves is chosen.
+        The search stops once all the target states have been reached.
+
+        Returns:
+            tuple[dict[int, int], dict[int, tuple[int, Motion]], dict[str, int]]: cost of each target state reached,
+            in the order they were reached, the parent state and motion taken from the parent state to reach each state,
+            and the no. of states expanded and heap pushes and pops of the search
+        """
+        expanded = 0
+        pushes = 1
+        remaining = len(targets)
+        costs = {}
+        bits = self.state_bits
+        state_mask = (1 << bits) - 1
+        search_moves = self._search_moves
+        heappush, heappop = heapq.heappush, heapq.heappop
+
+        # actual distance of each state as (cost, no. of moves), packed as cost << bits | no. of moves
+        g_dist = [None] * self.num_states
+        g_dist[start_state] = 0
+
+        visited = [False] * self.num_states
+        # parent state and motion taken from the parent state to reach each state
+        parent = {}
+
+        # (cost, no. of moves, state) packed as (cost << bits | no. of moves) << bits | state
+        heap = [start_state]
+
+        while heap and remaining:
+            key = heappop(heap)
+            state = key & state_mask
+
+            # check if the node has already been visited
+            if visited[state]:
+                continue
+            visited[state] = True
+            expanded += 1
+
+            dist = key >> bits
+            if state in targets:
+                costs[state] = dist >> bits
+                remaining -= 1
+
+            # traverse the neighboring states
+            for new_state, move_dist, motion in search_moves[state]:
+                if visited[new_state]:
+                    continue
+
+                new_dist = dist + move_dist
+                best_dist = g_dist[new_state]
+                if best_dist is None or best_dist > new_dist:
+                    g_dist[new_state] = new_dist
+                    heappush(heap, new_dist << bits | new_state)
+                    pushes += 1
+                    parent[new_state] = (state, motion)
+
+        return costs, parent, {"nodes_expanded": expanded, "heap_pushes": pushes, "heap_pops": pushes - len(heap)}
+
+    def trace_path(
+            self, parent: dict[int, tuple[int, Motion]], end_state: int
+    ) -> tuple[list[tuple[int, int, Direction]], np.ndarray]:
+        """
+        Follows the parent states back from the end state to the start state of a search.
+
+        Returns:
+            tuple[list[tuple[int, int, Direction]], np.ndarray]: (x, y, direction) of the states
+            from the end state back to the start state, and motions from the start state to the end state as int8 Motion values
+        """
+        path = []
+        motions = []
+        parent_pointer = end_state
+        while parent_pointer in parent:
+            path.append(self.get_state(parent_pointer))
+            parent_pointer, motion = parent[parent_pointer]
+            motions.append(motion)
+        path.append(self.get_state(parent_pointer))
+        return path, np.array(motions[::-1], dtype=np.int8)
+
+    def get_state(self, state: int) -> tuple[int, int, Direction]:
+        """
+        Returns the (x, y, direction) of the state with the given index
+        """
+        return self.xs[state], self.ys[state], self.directions[state]
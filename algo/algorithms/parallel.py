@@ -0,0 +1,196 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from typing import Iterator, Union
+import concurrent.futures
+import multiprocessing
+import threading
+import numpy as np
+from algo.algorithms.lattice import TransitionTable
+from algo.algorithms.tsp import solve_path_tsp
+from algo.entities.entity import Grid, Obstacle
+
+# max no. of obstacle layouts whose transition tables each worker process keeps
+WORKER_TABLE_CACHE_SIZE: int = 4
+
+# worker process pools shared by all the solvers of the process, keyed by their no. of workers. See get_pool()
+_pools: dict[int, tuple[ProcessPoolExecutor, object]] = {}
+_pools_lock = threading.Lock()
+
+# the combination searches of a pool share its incumbent, so they take turns, see combination_search()
+_combination_locks: dict[int, threading.Lock] = {}
+# chunks of the last combination search on each pool that may still be running after its deadline
+_combination_futures: dict[int, list[Future]] = {}
+
+# transition tables of the obstacle layouts searched by the worker process, least recently used first
+_worker_tables: OrderedDict[tuple, TransitionTable] = OrderedDict()
+# cost of the best tour found so far by any worker in the current combination search
+_worker_incumbent = None
+
+
+def get_pool(num_workers: int) -> tuple[ProcessPoolExecutor, object]:
+    """
+    Returns the pool of worker processes with the given no. of workers, starting it on first use.
+    The pool lives as long as the process, so that solves do not pay for starting the workers.
+
+    Returns:
+        tuple[ProcessPoolExecutor, object]: the pool, and the multiprocessing.Value of the cost of the best tour
+            that its workers share in a combination search
+    """
+    with _pools_lock:
+        if num_workers not in _pools:
+            incumbent = multiprocessing.Value("d", 1e9)
+            _pools[num_workers] = (
+                ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker, initargs=(incumbent,)),
+                incumbent,
+            )
+            _combination_locks[num_workers] = threading.Lock()
+            _combination_futures[num_workers] = []
+        return _pools[num_workers]
+
+
+def init_worker(incumbent) -> None:
+    """
+    Initializer of the worker processes. Keeps the incumbent shared by the workers in combination searches
+    """
+    global _worker_incumbent
+    _worker_incumbent = incumbent
+
+
+def get_layout(grid: Grid) -> tuple:
+    """
+    Returns everything the transition table of the grid depends on, to send to the workers instead of the table itself
+    """
+    obstacles = tuple((obstacle.x, obstacle.y, obstacle.direction, obstacle.obstacle_id) for obstacle in grid.obstacles)
+    return grid.size_x, grid.size_y, grid.cell_size, obstacles
+
+
+def _get_worker_table(layout: tuple) -> TransitionTable:
+    """
+    Returns the transition table of the obstacle layout (see get_layout()), building it on the first search of the layout
+    in the worker process
+    """
+    if layout in _worker_tables:
+        _worker_tables.move_to_end(layout)
+        return _worker_tables[layout]
+
+    size_x, size_y, cell_size, obstacles = layout
+    grid = Grid(size_x, size_y, cell_size)
+    for x, y, direction, obstacle_id in obstacles:
+        grid.add_obstacle(Obstacle(x, y, direction, obstacle_id))
+    _worker_tables[layout] = TransitionTable(grid)
+    while len(_worker_tables) > WORKER_TABLE_CACHE_SIZE:
+        _worker_tables.popitem(last=False)
+    return _worker_tables[layout]
+
+
+def search_paths(layout: tuple, start_state: int, targets: list[int]) -> tuple[list[tuple], dict[str, int]]:
+    """
+    Runs a uniform-cost search from the start state to the target states in a worker process.
+    The parent dict of the search stays in the worker, only the paths to the targets are sent back.
+
+    Args:
+        layout (tuple): obstacle layout to search, see get_layout()
+
+    Returns:
+        tuple[list[tuple], dict[str, int]]: (target state, cost, path, motions) of each target reached,
+            in the order they were reached, and the counters of the search. See TransitionTable.search() and trace_path()
+    """
+    table = _get_worker_table(layout)
+    costs, parent, counters = table.search(start_state, set(targets))
+    return [
+        (state, cost, *table.trace_path(parent, state))
+        for state, cost in costs.items()
+    ], counters
+
+
+@contextmanager
+def combination_search(num_workers: int) -> Iterator[tuple[ProcessPoolExecutor, object, list[Future]]]:
+    """
+    Runs a combination search on the pool with the given no. of workers (see get_pool()).
+
+    Only one combination search runs on a pool at a time, since its workers share one incumbent. The chunks that the
+    last search left running at its deadline are waited out before the incumbent is reset, so that they cannot lower
+    the incumbent of the new search. The chunks of the search that have not started when it ends are cancelled.
+
+    Yields:
+        tuple[ProcessPoolExecutor, object, list[Future]]: the pool, its incumbent reset to 1e9,
+            and the list to add the futures of the chunks submitted to
+    """
+    pool, incumbent = get_pool(num_workers)
+    with _combination_locks[num_workers]:
+        concurrent.futures.wait(_combination_futures[num_workers])
+        incumbent.value = 1e9
+        futures = []
+        try:
+            yield pool, incumbent, futures
+        finally:
+            for future in futures:
+                future.cancel()
+            _combination_futures[num_workers] = [future for future in futures if not future.done()]
+
+
+def search_combinations(
+        cost_matrix: np.ndarray, jobs: list[tuple[int, list[int], float, float]]
+) -> tuple[Union[tuple[float, int, list[int]], None], int]:
+    """
+    Evaluates view state combinations in a worker process, sharing the best tour found with the other workers.
+    See evaluate_combinations()
+    """
+    return evaluate_combinations(cost_matrix, jobs, _worker_incumbent)
+
+
+class LocalIncumbent:
+    """
+    Cost of the best tour found so far by a combination search run in a single process.
+    Has the .value and get_lock() of the multiprocessing.Value shared by the workers, without its shared memory and lock
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value: float = 1e9) -> None:
+        self.value = value
+
+    def get_lock(self) -> nullcontext:
+        return nullcontext()
+
+
+def evaluate_combinations(
+        cost_matrix: np.ndarray, jobs: list[tuple[int, list[int], float, float]], incumbent
+) -> tuple[Union[tuple[float, int, list[int]], None], int]:
+    """
+    Finds the tour of each view state combination with Lin-Kernighan, and returns the best one.
+
+    A combination is skipped if the lower bound of its tour already costs more than the best tour found so far by any worker.
+    Combinations that could tie with the best tour are never skipped, and ties are broken by the index of the combination,
+    so the best tour does not depend on the order the combinations are evaluated in or the no. of workers.
+
+    Args:
+        cost_matrix (np.ndarray): cost of travelling between every pair of visit states, 1e9 if there is no path
+        jobs (list[tuple[int, list[int], float, float]]): (index, indices of the visit states, penalty, lower bound of the path cost)
+            of each combination. The first visit state of each combination is the robot start state
+        incumbent: cost of the best tour found so far, as a multiprocessing.Value so that it can be shared between workers,
+            or a LocalIncumbent in a single process
+
+    Returns:
+        tuple[Union[tuple[float, int, list[int]], None], int]: (cost, index of the combination, indices of the visit states
+            in the order they are visited) of the best tour, None if every combination was skipped,
+            and the no. of TSPs solved
+    """
+    best = None
+    num_solved = 0
+    for index, visited, penalty, lower_bound in jobs:
+        if penalty + lower_bound > incumbent.value:
+            continue
+
+        combination_matrix = cost_matrix[np.ix_(visited, visited)]
+        # the path does not return to the robot start state
+        combination_matrix[:, 0] = 0
+
+        permutation, distance = solve_path_tsp(combination_matrix)
+        num_solved += 1
+        if best is None or (distance + penalty, index) < best[:2]:
+            best = (distance + penalty, index, [visited[idx] for idx in permutation])
+
+        with incumbent.get_lock():
+            incumbent.value = min(incumbent.value, distance + penalty)
+    return best, num_solved
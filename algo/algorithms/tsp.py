@@ -0,0 +1,119 @@
+from typing import Union
+import numpy as np
+from python_tsp.heuristics import solve_tsp_lin_kernighan
+
+
+def solve_generalized_tsp(
+        cost_matrix: np.ndarray, groups: list[int], penalties: list[float], num_groups: int
+) -> tuple[list[int], float]:
+    """
+    Exact Held-Karp (bitmask DP) solver for the generalized TSP path problem.
+    The path starts at node 0 and visits exactly one node from every group, in any order, without returning to node 0.
+    If no path can visit every group, the cheapest path that visits the most groups is returned instead,
+    since the DP has already solved every subset of groups.
+
+    dp[mask, v]: min cost of a path from node 0 that visits one node from each group in mask, ending at node v.
+    The cost of a path is the sum of the costs of its edges plus the penalties of the visited nodes.
+
+    Args:
+        cost_matrix (np.ndarray): (n, n) cost of travelling between every pair of nodes, np.inf if unreachable
+        groups (list[int]): group (0 to num_groups - 1) of each node from node 1 onwards
+        penalties (list[float]): penalty of visiting each node from node 1 onwards
+        num_groups (int): no. of groups to visit
+
+    Returns:
+        tuple[list[int], float]: nodes of the optimal path starting with node 0 and its cost.
+            ([0], 0) if no group can be visited.
+    """
+    if num_groups == 0:
+        return [0], 0.0
+
+    num_masks = 1 << num_groups
+
+    group_bit = 1 << np.asarray(groups, dtype=np.int64)
+    penalty = np.asarray(penalties, dtype=float)
+    # cost of moving from each node to each node (excluding node 0), including the penalty of the destination
+    travel = cost_matrix[1:, 1:] + penalty
+
+    dp = np.full((num_masks, len(groups)), np.inf)
+    # previous node of the optimal path ending at each (mask, node), -1 if it is node 0
+    parent = np.full((num_masks, len(groups)), -1, dtype=np.int64)
+    dp[group_bit, np.arange(len(groups))] = cost_matrix[0, 1:] + penalty
+
+    # supersets are always larger than their subsets, so every mask is final by the time it is expanded
+    for mask in range(1, num_masks):
+        cur = dp[mask]
+        if not np.isfinite(cur).any():
+            continue
+
+        # nodes whose group has not been visited
+        targets = np.flatnonzero((group_bit & mask) == 0)
+        if targets.size == 0:
+            continue
+
+        candidates = cur[:, None] + travel[:, targets]
+        best_prev = candidates.argmin(axis=0)
+        best_cost = candidates[best_prev, np.arange(targets.size)]
+
+        new_masks = mask | group_bit[targets]
+        improved = best_cost < dp[new_masks, targets]
+        dp[new_masks[improved], targets[improved]] = best_cost[improved]
+        parent[new_masks[improved], targets[improved]] = best_prev[improved]
+
+    # visit as many groups as possible, then minimise the cost
+    mask_cost = dp.min(axis=1, initial=np.inf)
+    feasible = [mask for mask in range(1, num_masks) if np.isfinite(mask_cost[mask])]
+    if not feasible:
+        return [0], 0.0
+    mask = min(feasible, key=lambda m: (-bin(m).count("1"), mask_cost[m]))
+
+    # walk back from the cheapest end node
+    node = int(dp[mask].argmin())
+    cost = float(dp[mask, node])
+    path = []
+    while node != -1:
+        path.append(node + 1)
+        prev = int(parent[mask, node])
+        mask ^= int(group_bit[node])
+        node = prev
+    path.append(0)
+
+    return path[::-1], cost
+
+
+def get_path_lower_bound(cost_matrix: np.ndarray) -> Union[float, np.ndarray]:
+    """
+    Lower bound of the cost of a path that starts at node 0 and visits every node.
+    Every node other than node 0 is entered exactly once, so the path costs at least the cheapest way into each of them.
+
+    Args:
+        cost_matrix (np.ndarray): (n, n) cost matrix, or (m, n, n) stack of m cost matrices to bound all at once
+
+    Returns:
+        Union[float, np.ndarray]: lower bound of the cost matrix, or (m,) lower bounds of the stack of cost matrices
+    """
+    incoming = cost_matrix[..., 1:].copy()
+    # a node cannot be entered from itself
+    nodes = np.arange(1, cost_matrix.shape[-1])
+    incoming[..., nodes, nodes - 1] = np.inf
+    bound = incoming.min(axis=-2, initial=np.inf).sum(axis=-1)
+    return float(bound) if cost_matrix.ndim == 2 else bound
+
+
+def solve_path_tsp(cost_matrix: np.ndarray) -> tuple[list[int], float]:
+    """
+    Finds a short path that starts at node 0 and visits every node with Lin-Kernighan.
+    The cost of returning to node 0 must be set to 0 in the cost matrix.
+    Lin-Kernighan is used instead of solve_tsp_dynamic_programming since it was the empirically fastest solver.
+
+    Lin-Kernighan starts from the nearest neighbour path instead of a random one, so the same cost matrix always gives the same path.
+
+    Returns:
+        tuple[list[int], float]: nodes of the path starting with node 0 and its cost
+    """
+    x0 = [0]
+    remaining = set(range(1, len(cost_matrix)))
+    while remaining:
+        x0.append(min(remaining, key=lambda node: (cost_matrix[x0[-1], node], node)))
+        remaining.remove(x0[-1])
+    return solve_tsp_lin_kernighan(cost_matrix, x0=x0)
@@ -0,0 +1,179 @@
+"""
+Benchmarks MazeSolver.get_optimal_path on the simulator test layouts (algo/simulator/src/tests/*.ts)
+and on seeded random layouts, and writes the results as JSON so that they can be diffed between commits.
+
+eg. python algo/benchmark.py --runs 5 --random 10 --output before.json
+"""
+import argparse
+import glob
+import json
+import random
+import re
+import time
+
+import os
+import sys
+# Allows Python to find packages
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from algo.algorithms.algo import MazeSolver, SearchMode  # nopep8
+from algo.tools.consts import ARENA_WIDTH, ARENA_HEIGHT, VIEW_STATE_CANDIDATES, EXTENDED_VIEW_STATE_CANDIDATES  # nopep8
+from algo.tools.movement import Direction  # nopep8
+
+TESTS_DIR = os.path.join(os.path.dirname(__file__), "simulator", "src", "tests")
+
+# robot start pose of the simulator
+ROBOT_X, ROBOT_Y, ROBOT_DIRECTION = 1, 1, Direction.NORTH
+
+
+def load_simulator_layouts(tests_dir: str = TESTS_DIR) -> dict[str, list[dict]]:
+    """
+    Reads the obstacles of every test layout exported by the simulator test files
+
+    Returns:
+        dict[str, list[dict]]: obstacles of each layout by name, with keys 'x', 'y', 'd' and 'id'
+    """
+    layouts = {}
+    for path in sorted(glob.glob(os.path.join(tests_dir, "*.ts"))):
+        with open(path) as file:
+            source = file.read()
+        for name, body in re.findall(r"export const (\w+): AlgoTestDataInterface = \{\s*obstacles: \[(.*?)\]", source, re.S):
+            layouts[name] = [
+                {"x": int(x), "y": int(y), "d": int(Direction[d]), "id": int(obstacle_id)}
+                for obstacle_id, x, y, d in re.findall(r"id: (\d+), x: (\d+), y: (\d+), d: Direction\.(\w+)", body)
+            ]
+    return layouts
+
+
+def generate_random_layouts(count: int, num_obstacles: int, seed: int) -> dict[str, list[dict]]:
+    """
+    Generates layouts of obstacles at distinct random positions facing random directions.
+    Obstacles are kept out of the robot's start area, so that the robot can always move off the start.
+
+    Returns:
+        dict[str, list[dict]]: obstacles of each layout by name, with keys 'x', 'y', 'd' and 'id'
+    """
+    rng = random.Random(seed)
+    directions = [Direction.NORTH, Direction.EAST, Direction.SOUTH, Direction.WEST]
+    cells = [
+        (x, y) for x in range(ARENA_WIDTH) for y in range(ARENA_HEIGHT)
+        if not (x <= ROBOT_X + 2 and y <= ROBOT_Y + 2)
+    ]
+    layouts = {}
+    for idx in range(count):
+        positions = rng.sample(cells, num_obstacles)
+        layouts[f"Random{num_obstacles}_{seed}_{idx}"] = [
+            {"x": x, "y": y, "d": int(rng.choice(directions)), "id": obstacle_id}
+            for obstacle_id, (x, y) in enumerate(positions, start=1)
+        ]
+    return layouts
+
+
+def get_percentile(values: list[float], percentile: float) -> float:
+    """
+    Returns the percentile of the values, interpolating between the closest ranks
+    """
+    values = sorted(values)
+    rank = (len(values) - 1) * percentile / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+def benchmark_layout(
+        obstacles: list[dict],
+        runs: int,
+        search_mode: SearchMode,
+        num_workers: int,
+        view_candidates: tuple[tuple[int, int, int], ...] = VIEW_STATE_CANDIDATES,
+) -> dict:
+    """
+    Solves the layout with a new MazeSolver in each run, so that no run reuses the paths of another
+
+    Returns:
+        dict: latency percentiles in ms, the cost and work done by the solver (the same in every run),
+            and the time spent in each phase of the solver in the last run
+    """
+    latencies = []
+    metrics = {}
+    for _ in range(runs):
+        maze_solver = MazeSolver(robot_x=ROBOT_X, robot_y=ROBOT_Y, robot_direction=ROBOT_DIRECTION,
+                                 search_mode=search_mode, num_workers=num_workers, view_candidates=view_candidates)
+        for ob in obstacles:
+            maze_solver.add_obstacle(ob['x'], ob['y'], ob['d'], ob['id'])
+
+        start = time.perf_counter()
+        optimal_path, cost = maze_solver.get_optimal_path()
+        latencies.append((time.perf_counter() - start) * 1000)
+        metrics = maze_solver.get_metrics()
+
+    return {
+        "obstacles": len(obstacles),
+        "p50_ms": round(get_percentile(latencies, 50), 3),
+        "p95_ms": round(get_percentile(latencies, 95), 3),
+        "nodes_expanded": maze_solver.stats["nodes_expanded"],
+        "searches": maze_solver.stats["searches"],
+        "tsp_calls": maze_solver.stats["tsp_calls"],
+        "cost": cost,
+        "path_length": len(optimal_path),
+        "phases_ms": metrics["phases_ms"],
+        "counters": metrics["counters"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--layouts", help="JSON file of {name: [{x, y, d, id}, ...]} to use instead of the simulator test layouts")
+    parser.add_argument("--random", type=int, default=0, help="no. of seeded random layouts to add. Default is 0")
+    parser.add_argument("--num-obstacles", type=int, default=8, help="no. of obstacles of each random layout. Default is 8")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random layouts. Default is 0")
+    parser.add_argument("--runs", type=int, default=5, help="no. of times to solve each layout. Default is 5")
+    parser.add_argument("--search-mode", default=SearchMode.SWEEP.value, choices=[mode.value for mode in SearchMode])
+    parser.add_argument("--num-workers", type=int, default=1, help="no. of worker processes of the solver. Default is 1")
+    parser.add_argument("--extended-view-states", action="store_true", help="use EXTENDED_VIEW_STATE_CANDIDATES as the view states")
+    parser.add_argument("--filter", help="only run the layouts whose name contains this string")
+    parser.add_argument("--output", help="file to write the JSON results to. Default is stdout")
+    args = parser.parse_args()
+
+    if args.layouts:
+        with open(args.layouts) as file:
+            layouts = json.load(file)
+    else:
+        layouts = load_simulator_layouts()
+    layouts.update(generate_random_layouts(args.random, args.num_obstacles, args.seed))
+    if args.filter:
+        layouts = {name: obstacles for name, obstacles in layouts.items() if args.filter in name}
+
+    view_candidates = EXTENDED_VIEW_STATE_CANDIDATES if args.extended_view_states else VIEW_STATE_CANDIDATES
+    results = {}
+    for name, obstacles in layouts.items():
+        results[name] = benchmark_layout(
+            obstacles, args.runs, SearchMode(args.search_mode), args.num_workers, view_candidates)
+        print(f"{name}: {results[name]['p50_ms']} ms, cost {results[name]['cost']}", file=sys.stderr)
+
+    report = {
+        "config": {
+            "runs": args.runs,
+            "random": args.random,
+            "num_obstacles": args.num_obstacles,
+            "seed": args.seed,
+            "search_mode": args.search_mode,
+            "num_workers": args.num_workers,
+            "extended_view_states": args.extended_view_states,
+        },
+        "summary": {
+            "layouts": len(results),
+            "total_p50_ms": round(sum(result["p50_ms"] for result in results.values()), 3),
+            "total_cost": sum(result["cost"] for result in results.values()),
+        },
+        "layouts": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Builds the distance table of the empty arena (see build_distance_table() in algorithms/lattice.py) and writes it to
+algo/tables, where MazeSolver memory-maps it to answer the paths that no obstacle is in the way of without a search,
+and as the A* heuristic. Rebuild the table after tuning the robot's turn displacement or the turn and reverse costs,
+otherwise the solver falls back to searching every path.
+
+eg. python algo/build_tables.py --cell-size 5 --size-x 40 --size-y 40
+"""
+import argparse
+import time
+import numpy as np
+
+import os
+import sys
+# Allows Python to find packages
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from algo.algorithms.lattice import DISTANCE_TABLE_DIR, build_distance_table, get_distance_table_path  # nopep8
+from algo.entities.entity import Grid  # nopep8
+from algo.tools.consts import ARENA_WIDTH, ARENA_HEIGHT, CELL_SIZE  # nopep8
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-x", type=int, default=ARENA_WIDTH, help=f"size of the grid in the x direction. Default is {ARENA_WIDTH}")
+    parser.add_argument("--size-y", type=int, default=ARENA_HEIGHT, help=f"size of the grid in the y direction. Default is {ARENA_HEIGHT}")
+    parser.add_argument("--cell-size", type=int, default=CELL_SIZE, help=f"size of a grid cell in cm. Default is {CELL_SIZE}")
+    parser.add_argument("--output-dir", default=DISTANCE_TABLE_DIR, help="directory to write the table to. Default is algo/tables")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    distances = build_distance_table(args.size_x, args.size_y, args.cell_size)
+
+    path = get_distance_table_path(Grid(args.size_x, args.size_y, args.cell_size), args.output_dir)
+    os.makedirs(args.output_dir, exist_ok=True)
+    # replace the table in one step, so that a running solver never maps a partly written table
+    # and the table it has already mapped is left intact
+    with open(f"{path}.tmp", "wb") as file:
+        np.save(file, distances)
+    os.replace(f"{path}.tmp", path)
+    print(f"Wrote {distances.shape[0]}x{distances.shape[1]} distances to {path} "
+          f"({os.path.getsize(path) / 2 ** 20:.1f} MiB) in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,68 @@
+from functools import lru_cache
 from typing import Union
-from algo.tools.consts import SCREENSHOT_COST, DISTANCE_COST, PADDING, TURN_PADDING, MID_TURN_PADDING, ARENA_HEIGHT, ARENA_WIDTH, OFFSET, MIN_CLEARANCE, OBSTACLE_SIZE
-from algo.tools.movement import Direction
-from math import sqrt
+import numpy as np
+from algo.tools.consts import SAFE_COST, SAFE_COST_FALLOFF, PADDING, TURN_PADDING, MID_TURN_PADDING, ARENA_HEIGHT, ARENA_WIDTH, OFFSET, TURN_DISPLACEMENT, UNIT_LENGTH, CELL_SIZE, VIEW_STATE_CANDIDATES
+from algo.tools.movement import Direction, MOVE_DIRECTION
+
+# no. of points sampled along the curve followed by the robot center during a turn, to find the cells swept by the turn
+TURN_SWEEP_SAMPLES: int = 32
+
+# unit vectors (dx, dy) pointing out of the image, and to the side of the view state candidates with a positive side distance,
+# by the direction the image faces (north, east, south, west)
+VIEW_FRAMES: np.ndarray = np.array([
+    [[0, 1], [-1, 0]],
+    [[1, 0], [0, 1]],
+    [[0, -1], [1, 0]],
+    [[-1, 0], [0, 1]],
+])
+
+
+def scale_length(length: int, cell_size: int = CELL_SIZE) -> int:
+    """
+    Converts a length in the 10 cm units of consts.py to the no. of grid cells of the given size
+
+    Args:
+        length (int): length in UNIT_LENGTH cm units
+        cell_size (int): size of a grid cell (in cm). Must divide UNIT_LENGTH so that the geometry stays on the grid
+    """
+    if cell_size <= 0 or UNIT_LENGTH % cell_size != 0:
+        raise ValueError(f"Invalid cell size {cell_size} cm, it must divide {UNIT_LENGTH} cm")
+    return length * (UNIT_LENGTH // cell_size)
 
 
 class CellState:
-    """Base class for all objects on the arena, such as cells, obstacles, etc"""
+    """
+    Base class for all objects on the arena, such as cells, obstacles, etc
+
+    Cell states are immutable and compared and hashed by value, so equal states share the same entries in the solver tables.
+    """
+    __slots__ = ("x", "y", "direction", "screenshot_id", "penalty")
 
     def __init__(self, x: int, y: int, direction: Direction = Direction.NORTH, screenshot_id: Union[int, None] = None, penalty: int = 0):
-        self.x: int = x
-        self.y: int = y
-        self.direction: Direction = direction
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "y", y)
+        object.__setattr__(self, "direction", direction)
         # If screenshot_id != None, the snapshot is taken at that position is for obstacle with obstacle_id = screenshot_id
-        self.screenshot_id: Union[int, None] = screenshot_id
-        self.penalty: int = penalty  # Penalty for the view point of taking picture
+        object.__setattr__(self, "screenshot_id", screenshot_id)
+        # Penalty for the view point of taking picture
+        object.__setattr__(self, "penalty", penalty)
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def _key(self) -> tuple:
+        """
+        Values that identify the cell state, for comparing and hashing
+        """
+        return (self.x, self.y, self.direction, self.screenshot_id, self.penalty)
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
 
     def is_eq(self, x: int, y: int, direction: Direction) -> bool:
         """
@@ -21,12 +70,21 @@ class CellState:
         """
         return self.x == x and self.y == y and self.direction == direction
 
+    def get_pose(self) -> tuple[int, int, Direction]:
+        """
+        Returns the (x, y, direction) of the cell state. Paths are the same for all cell states with the same pose.
+        """
+        return (self.x, self.y, self.direction)
+
     def __repr__(self) -> str:
         """String representation of cell state"""
         return "Cellstate(x: {}, y: {}, direction: {}, screenshot: {})".format(self.x, self.y, Direction(self.direction), self.screenshot_id)
 
-    def set_screenshot(self, screenshot_id: int) -> None:
-        self.screenshot_id = screenshot_id
+    def with_screenshot(self, screenshot_id: Union[str, int]) -> "CellState":
+        """
+        Returns a copy of the cell state that takes a screenshot for the given screenshot_id
+        """
+        return CellState(self.x, self.y, self.direction, screenshot_id, self.penalty)
 
     def get_dict(self) -> dict[str, Union[int, None]]:
         """
@@ -37,130 +95,137 @@ class CellState:
 
 class Obstacle(CellState):
     """Obstacle class, inherited from CellState"""
+    __slots__ = ("obstacle_id",)
 
     def __init__(self, x: int, y: int, direction: Direction, obstacle_id: int) -> None:
         super().__init__(x, y, direction)
-        self.obstacle_id: int = obstacle_id
+        object.__setattr__(self, "obstacle_id", obstacle_id)
 
-    def __eq__(self, other: object) -> bool:
+    def _key(self) -> tuple:
         """
-        Checks if this obstacle is the same as input obstacle in terms of x, y, and direction
+        Obstacles are the same if they have the same x, y, and direction, regardless of their id
         """
-        return self.x == other.x and self.y == other.y and self.direction == other.direction
-
-    def get_view_state(self) -> list[CellState]:
+        return (self.x, self.y, self.direction)
+
+    def get_view_state(
+            self,
+            size_x: int = ARENA_WIDTH,
+            size_y: int = ARENA_HEIGHT,
+            cell_size: int = CELL_SIZE,
+            candidates: tuple[tuple[int, int, int], ...] = VIEW_STATE_CANDIDATES,
+    ) -> list[CellState]:
         """
         Constructs the list of CellStates from which the robot can view the image on the obstacle properly.
-        Currently checks a T shape of grids in front of the image
-        TODO: Tune the possible view states based on testing. More view states means a longer algo runtime
+        The robot faces the image from each candidate position in front of it (a T shape of grids by default).
+        See get_view_candidates()
+
+        Args:
+            size_x (int): size of the grid in the x direction
+            size_y (int): size of the grid in the y direction
+            cell_size (int): size of a grid cell (in cm). The distances to the view states are scaled to it
+            candidates (tuple): (distance in front, distance to the side, penalty) of each candidate. Default is VIEW_STATE_CANDIDATES
 
         Returns:
             list[CellState]: Valid cell states where robot can be positioned to view the symbol on the obstacle
         """
-        cells = []
-
-        # If the obstacle is facing north, then robot's cell state must be facing south
-        if self.direction == Direction.NORTH:
-            positions = [
-                # robot camera is left of obstacle
-                (self.x - 1, self.y + MIN_CLEARANCE + OBSTACLE_SIZE + OFFSET),
-                # robot camera is right of obstacle
-                (self.x + 1, self.y + MIN_CLEARANCE + OBSTACLE_SIZE + OFFSET),
-                # robot camera is positioned just nice from obstacle
-                (self.x, self.y + MIN_CLEARANCE + 1 + OBSTACLE_SIZE + OFFSET),
-                # robot camera is close to obstacle
-                (self.x, self.y + MIN_CLEARANCE + OBSTACLE_SIZE + OFFSET),
-            ]
-            costs = [
-                SCREENSHOT_COST + DISTANCE_COST,        # robot camera is left of obstacle
-                SCREENSHOT_COST + DISTANCE_COST,        # robot camera is right of obstacle
-                0,                                      # robot camera is positioned just nice
-                DISTANCE_COST,                          # robot camera is close to obstacle
-            ]
-
-            for idx, pos in enumerate(positions):
-                if self.is_valid_position(*pos):
-                    cells.append(
-                        CellState(*pos, Direction.SOUTH,
-                                  self.obstacle_id, costs[idx])
-                    )
-
-        # If obstacle is facing south, then robot's cell state must be facing north
-        elif self.direction == Direction.SOUTH:
-            positions = [
-                (self.x + 1, self.y - MIN_CLEARANCE - OBSTACLE_SIZE - OFFSET),
-                (self.x - 1, self.y - MIN_CLEARANCE - OBSTACLE_SIZE - OFFSET),
-                (self.x, self.y - MIN_CLEARANCE - 1 - OBSTACLE_SIZE - OFFSET),
-                (self.x, self.y - MIN_CLEARANCE - OBSTACLE_SIZE - OFFSET),
-            ]
-            costs = [
-                SCREENSHOT_COST + DISTANCE_COST,
-                SCREENSHOT_COST + DISTANCE_COST,
-                0,
-                DISTANCE_COST,
-            ]
-
-            for idx, pos in enumerate(positions):
-                if self.is_valid_position(*pos):
-                    cells.append(
-                        CellState(*pos, Direction.NORTH,
-                                  self.obstacle_id, costs[idx])
-                    )
-
-        # If obstacle is facing east, then robot's cell state must be facing west
-        elif self.direction == Direction.EAST:
-            positions = [
-                (self.x + MIN_CLEARANCE + OBSTACLE_SIZE + OFFSET, self.y + 1),
-                (self.x + MIN_CLEARANCE + OBSTACLE_SIZE + OFFSET, self.y - 1),
-                (self.x + MIN_CLEARANCE + 1 + OBSTACLE_SIZE + OFFSET, self.y),
-                (self.x + MIN_CLEARANCE + OBSTACLE_SIZE + OFFSET, self.y),
-            ]
-            costs = [
-                SCREENSHOT_COST + DISTANCE_COST,
-                SCREENSHOT_COST + DISTANCE_COST,
-                0,
-                DISTANCE_COST,
-            ]
-
-            for idx, pos in enumerate(positions):
-                if self.is_valid_position(*pos):
-                    cells.append(
-                        CellState(*pos, Direction.WEST,
-                                  self.obstacle_id, costs[idx])
-                    )
-
-        # If obstacle is facing west, then robot's cell state must be facing east
-        elif self.direction == Direction.WEST:
-            positions = [
-                (self.x - MIN_CLEARANCE - OBSTACLE_SIZE - OFFSET, self.y + 1),
-                (self.x - MIN_CLEARANCE - OBSTACLE_SIZE - OFFSET, self.y - 1),
-                (self.x - MIN_CLEARANCE - 1 - OBSTACLE_SIZE - OFFSET, self.y),
-                (self.x - MIN_CLEARANCE - OBSTACLE_SIZE - OFFSET, self.y),
-            ]
-            costs = [
-                SCREENSHOT_COST + DISTANCE_COST,
-                SCREENSHOT_COST + DISTANCE_COST,
-                0,
-                DISTANCE_COST,
-            ]
-
-            for idx, pos in enumerate(positions):
-                if self.is_valid_position(*pos):
-                    cells.append(
-                        CellState(*pos, Direction.EAST,
-                                  self.obstacle_id, costs[idx])
-                    )
-        return cells
-
-    def is_valid_position(self, x: int, y: int) -> bool:
+        if self.direction == Direction.SKIP:
+            return []
+        xs, ys, penalties = get_view_candidates([self], candidates, cell_size)
+        # the robot faces the opposite direction of the image
+        direction = Direction((self.direction + 4) % 8)
+        return [
+            CellState(x, y, direction, self.obstacle_id, penalty)
+            for x, y, penalty in zip(xs[0].tolist(), ys[0].tolist(), penalties.tolist())
+            if self.is_valid_position(x, y, size_x, size_y, cell_size)
+        ]
+
+    def is_valid_position(
+            self, x: int, y: int, size_x: int = ARENA_WIDTH, size_y: int = ARENA_HEIGHT, cell_size: int = CELL_SIZE
+    ) -> bool:
         """
         Checks if given position of robot is within bounds
 
         Args:
             x (int): x-coordinate of robot (wrt center)
             y (int): y-coordinate of robot (wrt center)
+            size_x (int): size of the grid in the x direction
+            size_y (int): size of the grid in the y direction
+            cell_size (int): size of a grid cell (in cm)
         """
-        return 0 < x < ARENA_WIDTH - 1 and 0 < y < ARENA_HEIGHT - 1
+        margin = scale_length(OFFSET, cell_size)
+        return margin <= x < size_x - margin and margin <= y < size_y - margin
+
+
+@lru_cache(maxsize=None)
+def get_turn_footprint(
+        dx: int, dy: int, direction: Direction, turn_padding: int, mid_turn_padding: int
+) -> tuple[int, int, np.ndarray]:
+    """
+    Finds the cells swept by the robot during a turn by (dx, dy) cells from facing the given direction.
+
+    The robot center follows a quarter ellipse that leaves the start along the old heading and reaches the end along the new heading.
+    A cell is swept if an obstacle in it would be closer than turn_padding to the start or end of the turn,
+    or closer than mid_turn_padding to the curve between them, ie. within the robot body or its clearance.
+    The turn is clear if no obstacle is in a swept cell.
+
+    Args:
+        dx (int): x displacement of the turn
+        dy (int): y displacement of the turn
+        direction (Direction): direction the robot is facing before the turn
+        turn_padding (int): clearance from the start and end of the turn
+        mid_turn_padding (int): clearance from the curve during the turn
+
+    Returns:
+        tuple[int, int, np.ndarray]: x and y offset from the start of the turn of the first cell of the footprint,
+        and the boolean footprint of swept cells
+    """
+    heading_x, heading_y = next((mx, my) for mx, my, md in MOVE_DIRECTION if md == direction)
+    # displacement along the old heading, and along the new heading
+    along = dx * heading_x + dy * heading_y
+    along_x, along_y = along * heading_x, along * heading_y
+    across_x, across_y = dx - along_x, dy - along_y
+
+    angles = np.linspace(0, np.pi / 2, TURN_SWEEP_SAMPLES)
+    curve_x = across_x * (1 - np.cos(angles)) + along_x * np.sin(angles)
+    curve_y = across_y * (1 - np.cos(angles)) + along_y * np.sin(angles)
+    padding_sq = np.full(TURN_SWEEP_SAMPLES, mid_turn_padding ** 2)
+    padding_sq[[0, -1]] = turn_padding ** 2
+
+    radius = max(turn_padding, mid_turn_padding)
+    min_x, min_y = int(np.floor(curve_x.min())) - radius, int(np.floor(curve_y.min())) - radius
+    max_x, max_y = int(np.ceil(curve_x.max())) + radius, int(np.ceil(curve_y.max())) + radius
+    xs, ys = np.meshgrid(np.arange(min_x, max_x + 1), np.arange(min_y, max_y + 1), indexing="ij")
+    dist_sq = (xs[..., None] - curve_x) ** 2 + (ys[..., None] - curve_y) ** 2
+    footprint = (dist_sq < padding_sq).any(axis=-1)
+    footprint.setflags(write=False)
+    return min_x, min_y, footprint
+
+
+def get_view_candidates(
+        obstacles: list[Obstacle], candidates: tuple[tuple[int, int, int], ...], cell_size: int = CELL_SIZE
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Places the view state candidates in front of the images of all the obstacles at once.
+    The obstacles must face a direction (not Direction.SKIP)
+
+    Args:
+        obstacles (list[Obstacle]): obstacles to place the candidates of
+        candidates (tuple): (distance in front, distance to the side, penalty) of each candidate, with distances in 10 cm units
+        cell_size (int): size of a grid cell (in cm). The distances are scaled to it
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: x and y of each candidate of each obstacle as (len(obstacles), len(candidates)) arrays,
+        and the penalty of each candidate
+    """
+    template = np.array(candidates, dtype=np.int64).reshape(-1, 3)
+    front, side = scale_length(template[:, 0], cell_size), scale_length(template[:, 1], cell_size)
+    frames = VIEW_FRAMES[np.array([int(ob.direction) // 2 for ob in obstacles], dtype=np.int64)]
+    positions = np.array([(ob.x, ob.y) for ob in obstacles], dtype=np.int64).reshape(-1, 2)
+
+    # (obstacle, candidate, axis) positions
+    candidate_positions = (positions[:, None, :] + front[None, :, None] * frames[:, None, 0, :]
+                           + side[None, :, None] * frames[:, None, 1, :])
+    return candidate_positions[:, :, 0], candidate_positions[:, :, 1], template[:, 2]
 
 
 class Grid:
@@ -168,23 +233,57 @@ class Grid:
     Grid object that contains the size of the grid and a list of obstacles
     """
 
-    def __init__(self, size_x: int, size_y: int) -> None:
+    def __init__(
+            self,
+            size_x: int,
+            size_y: int,
+            cell_size: int = CELL_SIZE,
+            view_candidates: tuple[tuple[int, int, int], ...] = VIEW_STATE_CANDIDATES,
+    ) -> None:
         """
         Args:
             size_x (int): Size of the grid in the x direction
             size_y (int): Size of the grid in the y direction
+            cell_size (int): Size of a grid cell (in cm). Default is CELL_SIZE
+            view_candidates (tuple): candidate view states of each obstacle. Default is VIEW_STATE_CANDIDATES. See get_view_candidates()
         """
         self.size_x = size_x
         self.size_y = size_y
+        self.cell_size = cell_size
+        self.view_candidates = view_candidates
         self.obstacles: list[Obstacle] = []
 
+        # robot geometry of consts.py in cells of this grid
+        self.offset = scale_length(OFFSET, cell_size)
+        self.padding = scale_length(PADDING, cell_size)
+        self.turn_padding = scale_length(TURN_PADDING, cell_size)
+        self.mid_turn_padding = scale_length(MID_TURN_PADDING, cell_size)
+        self.safe_cost_falloff = scale_length(SAFE_COST_FALLOFF, cell_size)
+        self.turn_displacement: tuple[int, int] = (
+            scale_length(TURN_DISPLACEMENT[0], cell_size), scale_length(TURN_DISPLACEMENT[1], cell_size))
+
+        # clearance maps are built lazily and rebuilt only when the obstacles change
+        self._reachable_map: Union[np.ndarray, None] = None
+        self._safe_cost_map: Union[np.ndarray, None] = None
+        self._occupancy_map: Union[np.ndarray, None] = None
+        # margin of empty cells around the occupancy map, so that the footprint of any turn from the grid fits in it
+        self._occupancy_margin = sum(self.turn_displacement) + max(self.turn_padding, self.mid_turn_padding) + 1
+        # occupancy map packed into the bits of an int, bit x * stride + y for cell x, y of the map, and the footprint of each turn
+        # packed the same way, so that a turn check is a single AND of two ints
+        self._occupancy_stride = self.size_y + 2 * self._occupancy_margin
+        self._occupancy_bits: int = 0
+        self._turn_footprint_bits: dict[tuple[int, int, Direction], tuple[int, int, int]] = {}
+
+        # no. of moves checked for collisions, one per position in the vectorized checks
+        self.collision_checks: int = 0
+
     def add_obstacle(self, obstacle: Obstacle) -> None:
         """
         Add a new obstacle to the Grid object, ignores if duplicate obstacle. 
         Ensures that list of Obstacles is always sorted so that the same optimal path is returned for the same obstacles in different orders.
 
-        NOTE: Sorting is just a band-aid fix to to ensure consistency. 
-        There may be issues in the pathfinding algorithm or the A* heuristic may not be admissible which is causing different paths to be returned for same obstacles in different orders
+        NOTE: The path searches always find the cheapest path, but among paths of the same cost the one found depends on
+        the order that the view states are searched in, which follows the order of the obstacles.
 
         Args:
             obstacle (Obstacle): Obstacle to be added
@@ -192,6 +291,63 @@ class Grid:
         if obstacle not in self.obstacles:
             self.obstacles.append(obstacle)
             self.obstacles.sort(key=lambda ob: (ob.x, ob.y))
+            self._invalidate_clearance_maps()
+
+    def reset_obstacles(self) -> None:
+        """
+        Removes all obstacles from the grid
+        """
+        self.obstacles = []
+        self._invalidate_clearance_maps()
+
+    def _invalidate_clearance_maps(self) -> None:
+        """
+        Discards the clearance maps so that they are rebuilt for the new set of obstacles on the next lookup
+        """
+        self._reachable_map = None
+        self._safe_cost_map = None
+        self._occupancy_map = None
+
+    def _build_clearance_maps(self) -> None:
+        """
+        Precomputes the obstacle clearance of every position in the grid so that collision checks become array lookups.
+
+        1. reachable map: (size_x, size_y) boolean map of cells that are safe to reach from a straight movement
+        2. safe cost map: (size_x, size_y) cost of the chance that the robot touches an obstacle at each cell
+        3. occupancy map: boolean map of the obstacle cells, with an empty margin around the grid, to check turn footprints against
+        """
+        obstacle_x = np.array([ob.x for ob in self.obstacles],
+                              dtype=np.int64).reshape(-1, 1, 1)
+        obstacle_y = np.array([ob.y for ob in self.obstacles],
+                              dtype=np.int64).reshape(-1, 1, 1)
+
+        # straight movement: Manhattan distance must be more than padding and Chebyshev distance at least padding
+        xs, ys = np.meshgrid(np.arange(self.size_x), np.arange(self.size_y), indexing="ij")
+        dx, dy = np.abs(obstacle_x - xs), np.abs(obstacle_y - ys)
+        blocked = ((dx + dy <= self.padding) | (np.maximum(dx, dy) < self.padding)).any(axis=0)
+        self._reachable_map = self._valid_coord_map(xs, ys) & ~blocked
+
+        # safe cost: SAFE_COST within padding (Chebyshev distance) of an obstacle, falling off linearly over the next cells
+        nearest = np.maximum(dx, dy).min(axis=0, initial=self.size_x + self.size_y)
+        steps = self.safe_cost_falloff + 1
+        self._safe_cost_map = (
+            SAFE_COST * np.clip(self.padding + steps - nearest, 0, steps) // steps).astype(np.int32)
+
+        # turns: obstacle cells, see get_turn_footprint()
+        margin = self._occupancy_margin
+        self._occupancy_map = np.zeros((self.size_x + 2 * margin, self.size_y + 2 * margin), dtype=bool)
+        self._occupancy_map[obstacle_x.ravel() + margin, obstacle_y.ravel() + margin] = True
+        self._occupancy_bits = int.from_bytes(
+            np.packbits(self._occupancy_map.ravel(), bitorder="little").tobytes(), "little")
+
+    def safe_cost_map(self) -> np.ndarray:
+        """
+        Returns the (size_x, size_y) safe cost of moving to each position, considering obstacles that the robot might touch.
+        Positions within PADDING of an obstacle cost SAFE_COST, and the cost falls off over the next SAFE_COST_FALLOFF cells
+        """
+        if self._safe_cost_map is None:
+            self._build_clearance_maps()
+        return self._safe_cost_map
 
     def reachable(self, x: int, y: int) -> bool:
         """Checks whether the given x,y coordinate is reachable/safe for the robot from a straight movement.
@@ -199,18 +355,13 @@ class Grid:
             x (int): x coordinate
             y (int): y coordinate
         """
+        self.collision_checks += 1
         if not self.is_valid_coord(x, y):
             return False
+        if self._reachable_map is None:
+            self._build_clearance_maps()
 
-        for ob in self.obstacles:
-            # ensure Manhattan distance from robot to obstacle is not within padding
-            if abs(ob.x - x) + abs(ob.y - y) <= PADDING:
-                return False
-            # ensure Chebyshev distance from robot to obstacle is not within padding
-            if max(abs(ob.x - x), abs(ob.y - y)) < PADDING:
-                return False
-
-        return True
+        return bool(self._reachable_map[x, y])
 
     def turn_reachable(
         self, x: int, y: int, new_x: int, new_y: int, direction: Direction
@@ -218,67 +369,117 @@ class Grid:
         """
         Checks if the robot can turn from x, y to new_x, new_y
         Logic:
-            Checks 3 things for a turn: pre-turn, turn, post-turn
-            1. pre-turn: if the obstacle is within the padding distance from the starting point
-            2. post-turn: if the obstacle is within the padding distance from the end point
-            3. turn:
-                Finds 3 points near the curve followed by the robot during the turn
-                For each point, checks if the obstacle is within the padding distance
+            The cells swept by the robot during the turn are precomputed as a footprint for each turn (see get_turn_footprint()),
+            so the turn is clear if the footprint placed at x, y does not overlap any obstacle cell of the occupancy map
         """
-
-        points = self._get_turn_checking_points(x, y, new_x, new_y, direction)
-
+        self.collision_checks += 1
         if not self.is_valid_coord(x, y) or not self.is_valid_coord(new_x, new_y):
             return False
-        for obstacle in self.obstacles:
-            # pre turn
-            preturn_horizontal_distance = obstacle.x - x
-            preturn_vertical_distance = obstacle.y - y
-            preturn_dist = sqrt(
-                preturn_horizontal_distance**2 + preturn_vertical_distance**2
-            )
-            if preturn_dist < TURN_PADDING:
-                return False
-
-            # post-turn
-            turn_horizontal_distance = obstacle.x - new_x
-            turn_vertical_distance = obstacle.y - new_y
-            turn_dist = sqrt(
-                turn_horizontal_distance**2 + turn_vertical_distance**2
-            )
-            if turn_dist < TURN_PADDING:
-                return False
-
-            # turn
-            for point in points:
-                horizontal_distance = obstacle.x - point[0]
-                vertical_distance = obstacle.y - point[1]
-                if sqrt(horizontal_distance**2 + vertical_distance**2) < MID_TURN_PADDING:
-                    return False
-
-        return True
+        if self._occupancy_map is None:
+            self._build_clearance_maps()
+
+        key = (new_x - x, new_y - y, direction)
+        if key not in self._turn_footprint_bits:
+            min_x, min_y, footprint = get_turn_footprint(*key, self.turn_padding, self.mid_turn_padding)
+            swept_x, swept_y = np.nonzero(footprint)
+            self._turn_footprint_bits[key] = (
+                min_x, min_y, sum(1 << int(bit) for bit in swept_x * self._occupancy_stride + swept_y))
+
+        min_x, min_y, footprint_bits = self._turn_footprint_bits[key]
+        shift = (x + min_x + self._occupancy_margin) * self._occupancy_stride + y + min_y + self._occupancy_margin
+        return not (self._occupancy_bits >> shift) & footprint_bits
+
+    def reachable_map(self, dx: int = 0, dy: int = 0) -> np.ndarray:
+        """
+        Vectorized version of reachable() over every cell of the grid
+
+        Args:
+            dx (int): x displacement of the straight movement
+            dy (int): y displacement of the straight movement
+
+        Returns:
+            np.ndarray: (size_x, size_y) boolean map where entry [x, y] is whether x + dx, y + dy is reachable
+        """
+        if self._reachable_map is None:
+            self._build_clearance_maps()
+
+        xs, ys = np.meshgrid(np.arange(self.size_x), np.arange(self.size_y), indexing="ij")
+        new_x, new_y = xs + dx, ys + dy
+        valid = self._valid_coord_map(new_x, new_y)
+        self.collision_checks += int(valid.sum())
+
+        result = np.zeros((self.size_x, self.size_y), dtype=bool)
+        result[valid] = self._reachable_map[new_x[valid], new_y[valid]]
+        return result
+
+    def turn_reachable_map(self, dx: int, dy: int, direction: Direction) -> np.ndarray:
+        """
+        Vectorized version of turn_reachable() over every cell of the grid
+
+        Args:
+            dx (int): x displacement of the turn
+            dy (int): y displacement of the turn
+            direction (Direction): direction the robot is facing before the turn
+
+        Returns:
+            np.ndarray: (size_x, size_y) boolean map where entry [x, y] is whether the robot can turn from x, y to x + dx, y + dy
+        """
+        if self._occupancy_map is None:
+            self._build_clearance_maps()
+
+        xs, ys = np.meshgrid(np.arange(self.size_x), np.arange(self.size_y), indexing="ij")
+        valid = self._valid_coord_map(xs, ys) & self._valid_coord_map(xs + dx, ys + dy)
+        self.collision_checks += int(valid.sum())
+
+        # an obstacle blocks the turn from every start cell that places a swept cell of the footprint on it
+        min_x, min_y, footprint = get_turn_footprint(dx, dy, direction, self.turn_padding, self.mid_turn_padding)
+        swept_x, swept_y = np.nonzero(footprint)
+        obstacle_x, obstacle_y = np.nonzero(self._occupancy_map)
+        start_x = (obstacle_x - self._occupancy_margin)[:, None] - (swept_x + min_x)
+        start_y = (obstacle_y - self._occupancy_margin)[:, None] - (swept_y + min_y)
+        in_grid = (start_x >= 0) & (start_x < self.size_x) & (start_y >= 0) & (start_y < self.size_y)
+        valid[start_x[in_grid], start_y[in_grid]] = False
+        return valid
+
+    def _valid_coord_map(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """
+        Vectorized version of is_valid_coord()
+        """
+        return (xs >= self.offset) & (xs < self.size_x - self.offset) & (ys >= self.offset) & (ys < self.size_y - self.offset)
 
     def is_valid_coord(self, x: int, y: int) -> bool:
         """
-        Checks if given position is within bounds
+        Checks if given position is within bounds, with room for the robot around its center
         """
-        return 0 < x < self.size_x - 1 and 0 < y < self.size_y - 1
+        return self.offset <= x < self.size_x - self.offset and self.offset <= y < self.size_y - self.offset
 
     def get_view_obstacle_positions(self) -> list[list[CellState]]:
         """
         This function return a list of desired states for the robot to achieve based on the obstacle position and direction.
-        The state is the position that the robot can see the image of the obstacle and is safe to reach without collision
+        The state is the position that the robot can see the image of the obstacle and is safe to reach without collision.
+        The candidates of all the obstacles are placed and checked against the reachable map at once
         """
+        # skip obstacles with no direction
+        obstacles = [obstacle for obstacle in self.obstacles if obstacle.direction != Direction.SKIP]
+        if not obstacles:
+            return []
+        if self._reachable_map is None:
+            self._build_clearance_maps()
+
+        xs, ys, penalties = get_view_candidates(obstacles, self.view_candidates, self.cell_size)
+        valid = self._valid_coord_map(xs, ys)
+        self.collision_checks += int(valid.sum())
+        valid[valid] = self._reachable_map[xs[valid], ys[valid]]
 
         optimal_positions = []
-        for obstacle in self.obstacles:
-            # skip obstacles with no direction
-            if obstacle.direction == Direction.SKIP:
-                continue
-            else:
-                view_states = [view_state for view_state in obstacle.get_view_state() if
-                               self.reachable(view_state.x, view_state.y)]
-            optimal_positions.append(view_states)
+        penalties = penalties.tolist()
+        for obstacle, row_x, row_y, row_valid in zip(obstacles, xs.tolist(), ys.tolist(), valid.tolist()):
+            # the robot faces the opposite direction of the image
+            direction = Direction((obstacle.direction + 4) % 8)
+            optimal_positions.append([
+                CellState(x, y, direction, obstacle.obstacle_id, penalty)
+                for x, y, penalty, is_valid in zip(row_x, row_y, penalties, row_valid) if is_valid
+            ])
         return optimal_positions
 
     def find_obstacle_by_id(self, obstacle_id: int) -> Union[Obstacle, None]:
@@ -289,35 +490,3 @@ class Grid:
             if obstacle.obstacle_id == obstacle_id:
                 return obstacle
         return None
-
-    @staticmethod
-    def _get_turn_checking_points(
-        x: int, y: int, new_x: int, new_y: int, direction: Direction
-    ) -> list[tuple[int, int]]:
-        """
-        Finds 3 points near the curve followed by the robot during the turn. Near the curve since it is difficult to
-        approximate points on the curve since it is not a part of a circle, but rather an irregular ellipse.
-
-        Some intermediate points are used in the calculation. These are:
-            1. mid_x, mid_y: the mid-point between the starting point and end point of the turn
-            2. tr_x, tr_y: The point that completes the right-angled triangle with the starting point and end point of the turn.
-
-        The 3 points are calculated as follows:
-            1. p1x, p1y: A point between the starting point and (mid_x, mid_y)
-            2. p2x, p2y: the mid-point between (tr_x, tr_y) and (mid_x, mid_y)
-            3. p3x, p3y: A point between the ending point and (mid_x, mid_y)
-        """
-        mid_x, mid_y = (x + new_x) / 2, (y + new_y) / 2
-        if direction == Direction.NORTH or direction == Direction.SOUTH:
-            tr_x, tr_y = x, new_y
-            p1x, p1y = (x + mid_x) / 2, mid_y
-            p2x, p2y = (tr_x + mid_x) / 2, (tr_y + mid_y) / 2
-            p3x, p3y = mid_x, (new_y + mid_y) / 2
-            return [(p1x, p1y), (p2x, p2y), (p3x, p3y)]
-        elif direction == Direction.EAST or direction == Direction.WEST:
-            tr_x, tr_y = new_x, y
-            p1x, p1y = mid_x, (y + mid_y) / 2
-            p2x, p2y = (tr_x + mid_x) / 2, (tr_y + mid_y) / 2
-            p3x, p3y = (new_x + mid_x) / 2, mid_y
-            return [(p1x, p1y), (p2x, p2y), (p3x, p3y)]
-        raise ValueError("Invalid direction")
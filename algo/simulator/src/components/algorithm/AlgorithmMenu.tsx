@@ -2,7 +2,9 @@ import React, { useEffect, useState } from "react";
 import { NavigationGrid } from "./NavigationGrid";
 import { Direction, Position } from "../../schemas/entity";
 import {
+	API_IP,
 	GRID_ANIMATION_SPEED,
+	PORT,
 	GRID_TOTAL_WIDTH,
 	ROBOT_INITIAL_POSITION,
 } from "../../constants";
@@ -28,7 +30,7 @@ import toast from "react-hot-toast";
 import { TestSelector } from "./TestSelector";
 import { ServerStatus } from "./ServerStatus";
 import useFetch from "../../hooks/useFetch";
-import { AlgoInput, AlgoOutput } from "../../schemas/request";
+import { AlgoInput, AlgoOutput, AlgoProfile } from "../../schemas/request";
 
 // Intraface to store test results for each test case
 interface TestResult {
@@ -81,6 +83,10 @@ export const AlgorithmMenu = () => {
 	const [algoRuntime, setAlgoRuntime] = useState<number | null>();
 	const [algoCost, setAlgoCost] = useState<number | null>();
 
+	// Algorithm Profiling
+	const [isProfiling, setIsProfiling] = useState<boolean>(false);
+	const [algoProfile, setAlgoProfile] = useState<AlgoProfile | null>();
+
 	// Select Tests
 	const [selectedTestEnum, setSelectedTestEnum] = useState<AlgoTestEnum>(
 		AlgoTestEnum.Misc_Custom
@@ -244,6 +250,7 @@ export const AlgorithmMenu = () => {
 			robot_x: robotStartPosition.x,
 			robot_y: robotStartPosition.y,
 			num_runs: numberOfAlgoRuns,
+			profile: isProfiling,
 		};
 		try {
 			const algoOutput: AlgoOutput = await fetch.post("/simulator_path", algoInput);
@@ -254,6 +261,7 @@ export const AlgorithmMenu = () => {
 
 			setAlgoRuntime(algoOutput.data.runtime);
 			setAlgoCost(algoOutput.data.distance);
+			setAlgoProfile(algoOutput.data.profile);
 
 			// Check if all obstacles were scanned
 			const scanResult = checkAllObstaclesScanned(algoOutput.data.path, selectedTest.obstacles);
@@ -318,6 +326,7 @@ export const AlgorithmMenu = () => {
 
 		setAlgoRuntime(null);
 		setAlgoCost(null);
+		setAlgoProfile(null);
 	};
 
 	return (
@@ -415,6 +424,15 @@ export const AlgorithmMenu = () => {
 					/>
 					<label>times</label>
 				</div>
+				<div
+					className="flex gap-2 items-center justify-center cursor-pointer"
+					onClick={() => {
+						setIsProfiling(!isProfiling);
+					}}
+				>
+					{isProfiling ? <FaCheckSquare /> : <FaSquare />}
+					Profile
+				</div>
 				<Button
 					onClick={isTestingAll || isAlgorithmLoading ? undefined : handleTestAll}
 				>
@@ -485,6 +503,43 @@ export const AlgorithmMenu = () => {
 				</div>
 			) : null}
 
+			{/* Algo Profile */}
+			{algoProfile && (
+				<div className="mb-4 p-4 border rounded">
+					<h3 className="text-center font-bold text-lg mb-2">Hot Functions</h3>
+					<table className="w-full border-collapse">
+						<thead>
+							<tr className="bg-gray-100">
+								<th className="border p-2 text-left">Function</th>
+								<th className="border p-2 text-right">Self (ms)</th>
+								<th className="border p-2 text-right">Total (ms)</th>
+							</tr>
+						</thead>
+						<tbody>
+							{algoProfile.hot_functions.map((hotFunction, index) => (
+								<tr key={index} className={index % 2 === 0 ? 'bg-gray-50' : ''}>
+									<td className="border p-2">{hotFunction.function}</td>
+									<td className="border p-2 text-right">{hotFunction.self_ms.toFixed(2)}</td>
+									<td className="border p-2 text-right">{hotFunction.total_ms.toFixed(2)}</td>
+								</tr>
+							))}
+						</tbody>
+					</table>
+					<div className="text-center mt-2">
+						<a
+							className="underline"
+							href={`http://${API_IP}:${PORT}/profile/${algoProfile.request_id}`}
+						>
+							Download flame graph ({algoProfile.samples} samples)
+						</a>
+						&nbsp;and open it in&nbsp;
+						<a className="underline" href="https://www.speedscope.app" target="_blank" rel="noreferrer">
+							speedscope
+						</a>
+					</div>
+				</div>
+			)}
+
 			{/* Animation */}
 			{robotPositions && (
 				<div className="mt-2 mb-4 flex flex-col justify-center items-center gap-2">
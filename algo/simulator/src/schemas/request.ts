@@ -7,6 +7,20 @@ export interface AlgoInput {
 	robot_x: number;
 	robot_y: number;
 	num_runs: number;
+	profile?: boolean;
+}
+
+export interface HotFunction {
+	function: string;
+	self_ms: number;
+	total_ms: number;
+}
+
+export interface AlgoProfile {
+	request_id: string;
+	file: string;
+	samples: number;
+	hot_functions: HotFunction[];
 }
 
 export interface AlgoOutput {
@@ -16,6 +30,7 @@ export interface AlgoOutput {
 		runtime: number;
 		path: Position[];
 		motions: string[];
+		profile?: AlgoProfile | null;
 	};
 	error: string | null;
 }
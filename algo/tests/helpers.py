@@ -0,0 +1,56 @@
+"""
+Obstacle layouts shared by the tests of the solver
+"""
+import random
+from algo.entities.entity import Grid, Obstacle, scale_length
+from algo.tools.consts import ARENA_WIDTH, ARENA_HEIGHT, CELL_SIZE, UNIT_LENGTH
+from algo.tools.movement import Direction, MOVE_DIRECTION
+
+
+def generate_random_layouts(count: int, num_obstacles: int, seed: int) -> list[list[dict]]:
+    """
+    Generates layouts of obstacles at distinct random positions of the 10 cm grid facing random directions.
+    Obstacles are kept out of the robot's start area, so that the robot can always move off the start.
+
+    Returns:
+        list[list[dict]]: obstacles of each layout, with keys 'x', 'y', 'd' and 'id' as in a path request
+    """
+    rng = random.Random(seed)
+    directions = [Direction.NORTH, Direction.EAST, Direction.SOUTH, Direction.WEST]
+    cells = [(x, y) for x in range(ARENA_WIDTH) for y in range(ARENA_HEIGHT) if not (x <= 3 and y <= 3)]
+    return [
+        [
+            {"x": x, "y": y, "d": int(rng.choice(directions)), "id": obstacle_id}
+            for obstacle_id, (x, y) in enumerate(rng.sample(cells, num_obstacles), start=1)
+        ]
+        for _ in range(count)
+    ]
+
+
+def build_grid(obstacles: list[dict], cell_size: int = CELL_SIZE) -> Grid:
+    """
+    Returns the grid of the arena with the given obstacles, whose positions are in 10 cm units and scaled to the cell size
+    """
+    scale = UNIT_LENGTH // cell_size
+    grid = Grid(scale_length(ARENA_WIDTH, cell_size), scale_length(ARENA_HEIGHT, cell_size), cell_size)
+    for ob in obstacles:
+        grid.add_obstacle(Obstacle(ob['x'] * scale, ob['y'] * scale, Direction(ob['d']), ob['id']))
+    return grid
+
+
+def get_turns(turn_displacement: tuple[int, int]) -> list[tuple[int, int, Direction]]:
+    """
+    Returns the (dx, dy, direction before the turn) of every forward and reverse turn of the robot.
+    A forward turn moves turn_displacement[0] cells along the new heading and turn_displacement[1] cells along the old heading,
+    and a reverse turn retraces a forward turn into the new heading
+    """
+    big, small = turn_displacement[0], turn_displacement[1]
+    turns = []
+    for old_x, old_y, direction in MOVE_DIRECTION:
+        for new_x, new_y, _ in MOVE_DIRECTION:
+            # the new heading is to either side of the old heading
+            if old_x * new_x + old_y * new_y != 0:
+                continue
+            turns.append((big * new_x + small * old_x, big * new_y + small * old_y, direction))
+            turns.append((-big * old_x - small * new_x, -big * old_y - small * new_y, direction))
+    return turns
@@ -0,0 +1,52 @@
+"""
+Tests of planning under a deadline, and of the background search that improves on the path found by the deadline
+(see MazeSolver.get_optimal_path()).
+
+Run from the repository root: python -m pytest algo/tests
+"""
+from algo.algorithms.algo import MazeSolver
+from algo.algorithms.cache import PathStore
+from algo.tests.helpers import generate_random_layouts
+from algo.tools.consts import ARENA_WIDTH, ARENA_HEIGHT
+from algo.tools.movement import Direction
+
+
+def get_solver(obstacles: list[dict], path_store: PathStore = None) -> MazeSolver:
+    """
+    Returns a solver of the obstacles with the robot at the start position
+    """
+    maze_solver = MazeSolver(
+        ARENA_WIDTH, ARENA_HEIGHT, robot_x=1, robot_y=1, robot_direction=Direction.NORTH, path_store=path_store)
+    for ob in obstacles:
+        maze_solver.add_obstacle(ob['x'], ob['y'], ob['d'], ob['id'])
+    return maze_solver
+
+
+def test_background_search_returns_optimality_without_changing_solver():
+    obstacles = generate_random_layouts(1, 6, 0)[0]
+    maze_solver = get_solver(obstacles)
+    # the deadline is over before the paths between view states are searched for, so only the greedy path is found
+    path, cost = maze_solver.get_optimal_path(deadline_ms=1, keep_improving=True)
+    assert not maze_solver.is_optimal
+    metrics = maze_solver.get_metrics()
+
+    improved_path, improved_cost, is_optimal = maze_solver.improved_path.result(timeout=60)
+    assert is_optimal
+    assert improved_cost <= cost
+    assert (improved_path, improved_cost) == get_solver(obstacles).get_optimal_path()
+    # the path of the solve and its metrics stay as they were returned
+    assert not maze_solver.is_optimal
+    assert maze_solver.get_metrics()["phases_ms"] == metrics["phases_ms"]
+
+
+def test_no_background_search_when_only_costs_are_approximate():
+    obstacles = generate_random_layouts(1, 6, 0)[0]
+    store = PathStore()
+    get_solver(obstacles, store).get_optimal_path()
+
+    # the paths reused past the removed obstacle may not be the shortest, but searching again finds the same paths
+    maze_solver = get_solver(obstacles[1:], store)
+    maze_solver.get_optimal_path(deadline_ms=60000, keep_improving=True)
+    assert maze_solver.has_approximate_costs
+    assert not maze_solver.is_optimal
+    assert maze_solver.improved_path is None
@@ -0,0 +1,140 @@
+"""
+Tests of the clearance maps and turn footprints of Grid (see entities/entity.py) against the per-obstacle collision checks
+and safe cost that they replaced.
+
+Run from the repository root: python -m pytest algo/tests
+"""
+from math import sqrt
+import pytest
+
+from algo.entities.entity import Grid
+from algo.tests.helpers import build_grid, generate_random_layouts, get_turns
+from algo.tools.consts import SAFE_COST
+from algo.tools.movement import Direction
+
+# an empty arena and random layouts of 8 obstacles
+LAYOUTS = [[]] + generate_random_layouts(6, 8, 0)
+# cell sizes (in cm) to test, the obstacle positions of the layouts are scaled to the smaller cells
+CELL_SIZES = [10, 5]
+
+
+def get_grids(cell_size: int) -> list[Grid]:
+    """
+    Returns the grids of the layouts with the given cell size. Fewer layouts are tested with the larger grid of smaller cells
+    """
+    layouts = LAYOUTS if cell_size == 10 else LAYOUTS[:3]
+    return [build_grid(obstacles, cell_size) for obstacles in layouts]
+
+
+def is_valid_coord(grid: Grid, x: int, y: int) -> bool:
+    return grid.offset <= x < grid.size_x - grid.offset and grid.offset <= y < grid.size_y - grid.offset
+
+
+def baseline_reachable(grid: Grid, x: int, y: int) -> bool:
+    """
+    Straight movement check of each obstacle, before the clearance maps
+    """
+    if not is_valid_coord(grid, x, y):
+        return False
+    for ob in grid.obstacles:
+        if abs(ob.x - x) + abs(ob.y - y) <= grid.padding:
+            return False
+        if max(abs(ob.x - x), abs(ob.y - y)) < grid.padding:
+            return False
+    return True
+
+
+def baseline_safe_cost(grid: Grid, x: int, y: int) -> int:
+    """
+    Safe cost of moving to x, y, of each obstacle within padding, before the safe cost map
+    """
+    for ob in grid.obstacles:
+        if abs(ob.x - x) <= grid.padding and abs(ob.y - y) <= grid.padding:
+            return SAFE_COST
+    return 0
+
+
+def get_turn_checking_points(x: int, y: int, new_x: int, new_y: int, direction: Direction) -> list[tuple[float, float]]:
+    """
+    3 points near the curve followed by the robot during the turn, before the turn footprints
+    """
+    mid_x, mid_y = (x + new_x) / 2, (y + new_y) / 2
+    if direction == Direction.NORTH or direction == Direction.SOUTH:
+        tr_x, tr_y = x, new_y
+        return [((x + mid_x) / 2, mid_y), ((tr_x + mid_x) / 2, (tr_y + mid_y) / 2), (mid_x, (new_y + mid_y) / 2)]
+    tr_x, tr_y = new_x, y
+    return [(mid_x, (y + mid_y) / 2), ((tr_x + mid_x) / 2, (tr_y + mid_y) / 2), ((new_x + mid_x) / 2, mid_y)]
+
+
+def baseline_turn_reachable(grid: Grid, x: int, y: int, new_x: int, new_y: int, direction: Direction) -> bool:
+    """
+    Turn check of each obstacle against the start, end and 3 points of the turn, before the turn footprints
+    """
+    if not is_valid_coord(grid, x, y) or not is_valid_coord(grid, new_x, new_y):
+        return False
+    points = get_turn_checking_points(x, y, new_x, new_y, direction)
+    for ob in grid.obstacles:
+        if sqrt((ob.x - x) ** 2 + (ob.y - y) ** 2) < grid.turn_padding:
+            return False
+        if sqrt((ob.x - new_x) ** 2 + (ob.y - new_y) ** 2) < grid.turn_padding:
+            return False
+        for point_x, point_y in points:
+            if sqrt((ob.x - point_x) ** 2 + (ob.y - point_y) ** 2) < grid.mid_turn_padding:
+                return False
+    return True
+
+
+@pytest.mark.parametrize("cell_size", CELL_SIZES)
+def test_reachable_matches_baseline(cell_size):
+    for grid in get_grids(cell_size):
+        for x in range(-1, grid.size_x + 1):
+            for y in range(-1, grid.size_y + 1):
+                assert grid.reachable(x, y) == baseline_reachable(grid, x, y), (x, y)
+
+
+@pytest.mark.parametrize("cell_size", CELL_SIZES)
+def test_safe_cost_map_matches_baseline(cell_size):
+    for grid in get_grids(cell_size):
+        if grid.safe_cost_falloff:
+            pytest.skip("the baseline safe cost has no falloff")
+        safe_cost_map = grid.safe_cost_map()
+        for x in range(grid.size_x):
+            for y in range(grid.size_y):
+                assert safe_cost_map[x, y] == baseline_safe_cost(grid, x, y), (x, y)
+
+
+@pytest.mark.parametrize("cell_size", CELL_SIZES)
+def test_turn_reachable_never_allows_turn_blocked_by_baseline(cell_size):
+    checked = blocked_by_footprint_only = 0
+    for grid in get_grids(cell_size):
+        for dx, dy, direction in get_turns(grid.turn_displacement):
+            for x in range(grid.size_x):
+                for y in range(grid.size_y):
+                    reachable = grid.turn_reachable(x, y, x + dx, y + dy, direction)
+                    baseline = baseline_turn_reachable(grid, x, y, x + dx, y + dy, direction)
+                    assert baseline or not reachable, (x, y, dx, dy, direction)
+                    checked += 1
+                    blocked_by_footprint_only += baseline and not reachable
+    # the footprint also blocks the few turns whose curve passes an obstacle between the 3 points of the baseline
+    assert blocked_by_footprint_only <= 0.01 * checked
+
+
+@pytest.mark.parametrize("cell_size", CELL_SIZES)
+def test_reachable_map_matches_reachable(cell_size):
+    for grid in get_grids(cell_size):
+        for dx, dy in [(0, 0), (0, 1), (1, 0), (0, -1), (-1, 0)]:
+            reachable_map = grid.reachable_map(dx, dy)
+            for x in range(grid.size_x):
+                for y in range(grid.size_y):
+                    assert reachable_map[x, y] == grid.reachable(x + dx, y + dy), (x, y, dx, dy)
+
+
+@pytest.mark.parametrize("cell_size", CELL_SIZES)
+def test_turn_reachable_map_matches_turn_reachable(cell_size):
+    for grid in get_grids(cell_size):
+        for dx, dy, direction in get_turns(grid.turn_displacement):
+            turn_reachable_map = grid.turn_reachable_map(dx, dy, direction)
+            for x in range(grid.size_x):
+                for y in range(grid.size_y):
+                    assert turn_reachable_map[x, y] == grid.turn_reachable(x, y, x + dx, y + dy, direction), \
+                        (x, y, dx, dy, direction)
@@ -0,0 +1,39 @@
+"""
+Tests of loading the distance table of the empty arena built by build_tables.py (see algorithms/lattice.py).
+
+Run from the repository root: python -m pytest algo/tests
+"""
+import os
+import numpy as np
+
+from algo.algorithms.lattice import load_distance_table
+
+
+def write_table(path: str, table: np.ndarray, mtime_ns: int) -> None:
+    """
+    Replaces the table file the same way as build_tables.py, with the given modification time
+    """
+    with open(f"{path}.tmp", "wb") as file:
+        np.save(file, table)
+    os.utime(f"{path}.tmp", ns=(mtime_ns, mtime_ns))
+    os.replace(f"{path}.tmp", path)
+
+
+def test_table_built_after_a_missing_load_is_loaded(tmp_path):
+    path = str(tmp_path / "distances.npy")
+    assert load_distance_table(path) is None
+
+    write_table(path, np.arange(4, dtype=np.int32), 1)
+    assert load_distance_table(path).tolist() == [0, 1, 2, 3]
+
+
+def test_rebuilt_table_is_loaded_again(tmp_path):
+    path = str(tmp_path / "distances.npy")
+    write_table(path, np.zeros(4, dtype=np.int32), 1)
+    table = load_distance_table(path)
+    assert load_distance_table(path) is table
+
+    write_table(path, np.ones(4, dtype=np.int32), 2)
+    assert load_distance_table(path).tolist() == [1, 1, 1, 1]
+    # the table mapped before the rebuild is left intact
+    assert table.tolist() == [0, 0, 0, 0]
@@ -0,0 +1,41 @@
+"""
+Tests of the path sweeps and view state combinations run in worker processes (see algorithms/parallel.py),
+which find the same path as a single process.
+
+Run from the repository root: python -m pytest algo/tests
+"""
+import pytest
+
+from algo.algorithms.algo import MazeSolver
+from algo.tests.helpers import generate_random_layouts
+from algo.tools.consts import ARENA_WIDTH, ARENA_HEIGHT, MAX_EXACT_TSP_OBSTACLES
+from algo.tools.movement import Direction
+
+# (no. of obstacles, seed) of random layouts with more reachable obstacles than the exact solver takes
+LAYOUTS = [(12, 24), (13, 23)]
+
+
+def solve(obstacles: list[dict], num_workers: int) -> tuple[MazeSolver, list, float]:
+    """
+    Returns the solver, and the optimal path of the obstacles and its cost
+    """
+    maze_solver = MazeSolver(
+        ARENA_WIDTH, ARENA_HEIGHT, robot_x=1, robot_y=1, robot_direction=Direction.NORTH, num_workers=num_workers)
+    for ob in obstacles:
+        maze_solver.add_obstacle(ob['x'], ob['y'], ob['d'], ob['id'])
+    optimal_path, cost = maze_solver.get_optimal_path()
+    return maze_solver, optimal_path, cost
+
+
+@pytest.mark.parametrize("num_obstacles,seed", LAYOUTS)
+def test_workers_find_the_same_path_as_a_single_process(num_obstacles, seed):
+    obstacles = generate_random_layouts(1, num_obstacles, seed)[0]
+    serial, serial_path, serial_cost = solve(obstacles, 1)
+    parallel, parallel_path, parallel_cost = solve(obstacles, 2)
+
+    # the tour is found from the combinations of view states, not by the exact solver
+    assert sum(1 for view_pos in serial.grid.get_view_obstacle_positions() if view_pos) > MAX_EXACT_TSP_OBSTACLES
+    assert serial.stats["tsp_calls"] > 1
+    assert parallel.stats["tsp_calls"] > 1
+    assert (parallel_path, parallel_cost) == (serial_path, serial_cost)
+    assert parallel.cost_table == serial.cost_table
@@ -0,0 +1,174 @@
+"""
+Tests of the reuse of pairwise paths across obstacle layouts by PathStore (see algorithms/cache.py).
+
+Run from the repository root: python -m pytest algo/tests
+"""
+from algo.algorithms.algo import MazeSolver
+from algo.algorithms.cache import PathStore
+from algo.algorithms.lattice import TransitionTable, get_path_poses
+from algo.entities.entity import Grid
+from algo.tests.helpers import build_grid, generate_random_layouts
+from algo.tools.consts import ARENA_WIDTH
+from algo.tools.movement import Direction
+
+SIZE = ARENA_WIDTH
+OBSTACLES = [(5, 10, Direction.SOUTH), (10, 4, Direction.WEST), (14, 15, Direction.NORTH)]
+
+
+def build_position_grid(positions: list[tuple[int, int]]) -> Grid:
+    """
+    Returns a grid with an obstacle at each position
+    """
+    return build_grid([
+        {"x": x, "y": y, "d": Direction.NORTH, "id": obstacle_id}
+        for obstacle_id, (x, y) in enumerate(positions, start=1)
+    ])
+
+
+def get_radius(grid: Grid) -> int:
+    """
+    Dependency radius of the paths of the grid, the same as MazeSolver._store_path()
+    """
+    return max(grid.padding + grid.safe_cost_falloff, grid.turn_padding, grid.mid_turn_padding)
+
+
+def replay_safe_cost(grid: Grid, start: tuple[int, int, Direction], motions) -> int:
+    """
+    Returns the safe cost of following the motions from the start pose on the grid, None if a move collides.
+    Turn and reverse costs do not depend on the obstacles, so the safe cost is all of the path cost that can change
+    """
+    poses = get_path_poses(start, motions, grid.turn_displacement)
+    safe_cost = 0
+    for (x, y, direction), (new_x, new_y, new_direction) in zip(poses, poses[1:]):
+        if new_direction == direction:
+            clear = grid.reachable(new_x, new_y)
+        else:
+            clear = grid.turn_reachable(x, y, new_x, new_y, direction)
+        if not clear:
+            return None
+        safe_cost += int(grid.safe_cost_map()[new_x, new_y])
+    return safe_cost
+
+
+def search_path(grid: Grid, start: tuple[int, int, Direction], end: tuple[int, int, Direction]) -> tuple:
+    """
+    Returns the poses, motions and cost of the shortest path between two poses on the grid
+    """
+    table = TransitionTable(grid)
+    end_state = table.state_index(*end)
+    costs, parent, _ = table.search(table.state_index(*start), {end_state})
+    path, motions = table.trace_path(parent, end_state)
+    return path, motions, costs[end_state]
+
+
+def test_dependency_mask_is_padded_bounding_box_of_each_move():
+    path = [(3, 3, Direction.NORTH), (3, 4, Direction.NORTH), (5, 5, Direction.EAST), (4, 5, Direction.EAST)]
+    radius = 2
+    mask = PathStore.get_dependency_mask(path, SIZE, radius)
+
+    expected = set()
+    for (x, y, _), (new_x, new_y, _) in zip(path, path[1:]):
+        for cell_x in range(min(x, new_x) - radius, max(x, new_x) + radius + 1):
+            for cell_y in range(min(y, new_y) - radius, max(y, new_y) + radius + 1):
+                if 0 <= cell_x < SIZE and 0 <= cell_y < SIZE:
+                    expected.add((cell_x, cell_y))
+    masked = {(x, y) for x in range(SIZE) for y in range(SIZE) if mask >> (x * SIZE + y) & 1}
+    assert masked == expected
+
+
+def test_path_is_invalidated_exactly_when_obstacle_enters_its_cells():
+    positions = [(x, y) for x, y, _ in OBSTACLES]
+    grid = build_position_grid(positions)
+    start, end = (1, 1, Direction.NORTH), (17, 8, Direction.WEST)
+    path, motions, cost = search_path(grid, start, end)
+    mask = PathStore.get_dependency_mask(path, SIZE, get_radius(grid))
+    safe_cost = replay_safe_cost(grid, start, motions)
+
+    store = PathStore()
+    key = (SIZE, SIZE, grid.cell_size, start, end)
+    store.put(key, motions, cost, frozenset(positions), mask)
+
+    for x in range(SIZE):
+        for y in range(SIZE):
+            if (x, y) in positions:
+                continue
+            stored = store.get(key, frozenset(positions + [(x, y)]), SIZE)
+            assert (stored is None) == bool(mask >> (x * SIZE + y) & 1)
+            if stored is not None:
+                # the reused path is still collision-free with the same cost, and still the shortest path
+                assert replay_safe_cost(build_position_grid(positions + [(x, y)]), start, motions) == safe_cost
+                assert stored[1] == cost and stored[2]
+
+
+def test_removed_obstacle_reuses_path_but_not_as_shortest():
+    positions = [(x, y) for x, y, _ in OBSTACLES]
+    store = PathStore()
+    key = (SIZE, SIZE, 10, (1, 1, Direction.NORTH), (1, 5, Direction.NORTH))
+    path = [(1, 1, Direction.NORTH), (1, 5, Direction.NORTH)]
+    mask = PathStore.get_dependency_mask(path, SIZE, 2)
+    store.put(key, None, 40, frozenset(positions), mask)
+
+    # the removed obstacle is outside the cells of the path, but a shorter path may pass where it was
+    assert store.get(key, frozenset(positions[1:]), SIZE)[2] is False
+    # moving an obstacle into the cells of the path invalidates it, and so does moving one out of them
+    assert store.get(key, frozenset(positions[1:] + [(2, 4)]), SIZE) is None
+    store.put(key, None, 40, frozenset(positions[1:] + [(2, 4)]), mask)
+    assert store.get(key, frozenset(positions), SIZE) is None
+
+
+def test_store_evicts_least_recently_used_path():
+    store = PathStore(capacity=2)
+    for idx in range(3):
+        store.put(idx, None, idx, frozenset(), 0)
+    assert store.get(0, frozenset(), SIZE) is None
+    assert store.get(1, frozenset(), SIZE) is not None
+    assert store.get_stats()["size"] == 2
+
+
+def solve(obstacles: list[dict], path_store: PathStore = None) -> MazeSolver:
+    """
+    Returns the solver after finding the optimal path of the obstacles
+    """
+    maze_solver = MazeSolver(SIZE, SIZE, robot_x=1, robot_y=1, robot_direction=Direction.NORTH, path_store=path_store)
+    for ob in obstacles:
+        maze_solver.add_obstacle(ob['x'], ob['y'], ob['d'], ob['id'])
+    maze_solver.get_optimal_path()
+    return maze_solver
+
+
+def test_solver_reuses_exact_costs_when_obstacle_is_added():
+    obstacles = generate_random_layouts(1, 6, 0)[0]
+    added = generate_random_layouts(1, 1, 1)[0][0]
+    added["id"] = len(obstacles) + 1
+    store = PathStore()
+    solve(obstacles, store)
+
+    reused = solve(obstacles + [added], store)
+    fresh = solve(obstacles + [added])
+    assert reused.stats["path_store_hits"] > 0
+    assert reused.cost_table == fresh.cost_table
+    assert reused.is_optimal == fresh.is_optimal
+
+
+def test_solver_does_not_claim_optimality_when_obstacle_is_removed():
+    obstacles = generate_random_layouts(1, 6, 0)[0]
+    store = PathStore()
+    solve(obstacles, store)
+
+    reused = solve(obstacles[1:], store)
+    assert reused.stats["path_store_hits"] > 0
+    assert reused.has_approximate_costs
+    assert not reused.is_optimal
+
+
+def test_solver_clears_approximate_costs_that_a_later_solve_does_not_use():
+    obstacles = generate_random_layouts(1, 6, 0)[0]
+    store = PathStore()
+    solve(obstacles, store)
+
+    reused = solve(obstacles[1:], store)
+    assert reused.has_approximate_costs
+    # with every obstacle scanned, the replan uses none of the reused costs
+    reused.replan_path(1, 1, Direction.NORTH, [ob["id"] for ob in obstacles[1:]])
+    assert not reused.has_approximate_costs
+    assert reused.is_optimal
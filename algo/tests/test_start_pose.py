@@ -0,0 +1,48 @@
+"""
+Tests of the robot start pose at each cell size, eg. the default start pose of the API.
+
+Run from the repository root: python -m pytest algo/tests
+"""
+import pytest
+
+from algo.algorithms.algo import MazeSolver
+from algo.entities.entity import scale_length
+from algo.tests.helpers import generate_random_layouts
+from algo.tools.consts import ARENA_WIDTH, ARENA_HEIGHT, UNIT_LENGTH
+from algo.tools.movement import Direction
+
+CELL_SIZES = [10, 5]
+
+
+def get_solver(obstacles: list[dict], cell_size: int, robot_x: int, robot_y: int) -> MazeSolver:
+    """
+    Returns a solver of the obstacles on the grid of the cell size, with their 10 cm positions scaled to the cell size
+    """
+    scale = UNIT_LENGTH // cell_size
+    maze_solver = MazeSolver(
+        scale_length(ARENA_WIDTH, cell_size), scale_length(ARENA_HEIGHT, cell_size),
+        robot_x=robot_x, robot_y=robot_y, robot_direction=Direction.NORTH, cell_size=cell_size)
+    for ob in obstacles:
+        maze_solver.add_obstacle(ob['x'] * scale, ob['y'] * scale, ob['d'], ob['id'])
+    return maze_solver
+
+
+@pytest.mark.parametrize("cell_size", CELL_SIZES)
+def test_default_start_pose_is_valid_at_every_cell_size(cell_size):
+    obstacles = generate_random_layouts(1, 5, 0)[0]
+    # the API starts the robot 10 cm from the corner by default
+    start = scale_length(1, cell_size)
+    maze_solver = get_solver(obstacles, cell_size, start, start)
+    assert maze_solver.grid.reachable(start, start)
+
+    optimal_path, cost = maze_solver.get_optimal_path()
+    assert len(optimal_path) > 1 and 0 < cost < 1e9
+    assert any(state.screenshot_id is not None for state in optimal_path)
+
+
+def test_start_pose_of_one_cell_is_invalid_for_small_cells():
+    # 1 cell from the corner is within the robot's own margin from the arena edge on the 5 cm grid
+    maze_solver = get_solver(generate_random_layouts(1, 5, 0)[0], 5, 1, 1)
+    assert not maze_solver.grid.reachable(1, 1)
+    optimal_path, _ = maze_solver.get_optimal_path()
+    assert len(optimal_path) <= 1
@@ -1,6 +1,6 @@
 from algo.tools.movement import Motion
 from algo.entities.entity import Obstacle
-from algo.tools.consts import OFFSET, OBSTACLE_SIZE, W_COMMAND_FLAG
+from algo.tools.consts import OFFSET, OBSTACLE_SIZE, W_COMMAND_FLAG, CELL_SIZE, UNIT_LENGTH
 
 """
 Generate commands in format requested by STM (refer to commands_FLAGS.h in STM repo): 
@@ -45,17 +45,17 @@ class CommandGenerator:
     # BACKWARD_IR_DIST_L = "l"        # go backward until left IR sensor is greater than value provided.
     # BACKWARD_IR_DIST_R = "r"        # go backward until right IR sensor is greater than value provided.
 
-    # unit distance
-    UNIT_DIST: float = 10
-
-    def __init__(self, straight_speed: int = 50, turn_speed: int = 30) -> None:
+    def __init__(self, straight_speed: int = 50, turn_speed: int = 30, cell_size: int = CELL_SIZE) -> None:
         """
         A class to generate commands for the robot to follow
 
         range of speed: 0-100
+        cell_size: size of a grid cell of the path (in cm), which is the distance of each straight motion
         """
         self.straight_speed: int = straight_speed
         self.turn_speed: int = turn_speed
+        # unit distance
+        self.unit_dist: int = cell_size
 
     def _generate_command(self, motion: Motion, num_motions: int = 1) -> list[str]:
         """Generates movement commands based on motion type. 
@@ -72,9 +72,9 @@ class CommandGenerator:
         """
         if num_motions > 1:
             # straight-line motions can be combined into 1 command
-            dist = num_motions * self.UNIT_DIST
+            dist = num_motions * self.unit_dist
         else:
-            dist = self.UNIT_DIST
+            dist = self.unit_dist
 
         if motion == Motion.FORWARD:
             return [f"T{self.straight_speed}|{0}|{dist}"]
@@ -151,11 +151,12 @@ class CommandGenerator:
         # dist btw obstacle & view state position - offset since sensor is at front of car - obstacle size + extra clearance if needed
         CLEARANCE = 0.3
 
+        # distances are in UNIT_LENGTH units, as OFFSET and OBSTACLE_SIZE are
         unit_dist_from_obstacle = max(
             abs(view_state.x - obstacle.x),
             abs(view_state.y - obstacle.y)
-        ) - OFFSET - OBSTACLE_SIZE + CLEARANCE
-        dist_away = int(unit_dist_from_obstacle * self.UNIT_DIST)
+        ) * self.unit_dist / UNIT_LENGTH - OFFSET - OBSTACLE_SIZE + CLEARANCE
+        dist_away = int(unit_dist_from_obstacle * UNIT_LENGTH)
         return [f"{self.FORWARD_DIST_AWAY}{self.straight_speed}{self.SEP}{0}{self.SEP}{dist_away}",
                 f"{self.BACKWARD_DIST_AWAY}{self.straight_speed}{self.SEP}{0}{self.SEP}{dist_away}"]
 
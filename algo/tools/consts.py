@@ -2,18 +2,45 @@
 # a higher value will allow robot to have more space to move around obstacles at the cost of it being harder to find a shortest path
 EXPANDED_CELL: int = 1
 
+# lengths in this file are in 10 cm units, and are scaled to the cell size of the grid (see scale_length() in entities/entity.py).
+UNIT_LENGTH: int = 10
+# size of a grid cell (in cm). Must divide UNIT_LENGTH, eg. 5 cm cells make a 40x40 grid of the same arena
+CELL_SIZE: int = 10
+
 # dimensions of arena (in 10 cm units)
 ARENA_WIDTH: int = 20
 ARENA_HEIGHT: int = 20
 # no. of cells taken up by obstacle (in 10 cm units)
 OBSTACLE_SIZE: int = 1
 
-# no. of iterations to run algorithm for to find the most accurate shortest path
+# max no. of view state combinations to evaluate to find the most accurate shortest path
 ITERATIONS: int = 5000
 
+# max no. of obstacles to find the exact optimal path for.
+# The exact solver's runtime grows exponentially with the no. of obstacles, so the view state combinations are approximated for more obstacles than this.
+MAX_EXACT_TSP_OBSTACLES: int = 10
+# no. of view state combinations evaluated at a time. Smaller chunks stop sooner once no combination left can beat the best tour
+COMBINATION_CHUNK_SIZE: int = 32
+# min no. of path sweeps to run in the worker processes. Fewer sweeps are faster to run serially than to build the transition table in each worker
+MIN_PARALLEL_SWEEPS: int = 24
+
+# max no. of solved plans the API keeps to answer repeated path requests with the same obstacles, robot start pose and deadline
+PLAN_CACHE_SIZE: int = 128
+# max no. of pairwise paths the API keeps to reuse in path requests with different obstacles
+PATH_STORE_SIZE: int = 50000
+# max no. of solvers the API keeps to replan mid-run with the paths they have already found
+SOLVER_CACHE_SIZE: int = 8
+
+# time between the call stacks sampled when profiling a solve (in ms), and no. of hot functions reported
+PROFILE_INTERVAL_MS: float = 1
+PROFILE_TOP_N: int = 10
+
 # Cost for the chance that the robot touches an obstacle.
 # The higher the value, the less likely the robot moves too close to an obstacle.
 SAFE_COST: int = 1000
+# no. of cells (in 10 cm units) beyond PADDING over which the safe cost falls off linearly to 0.
+# 0 charges the full SAFE_COST within PADDING of an obstacle and nothing further away
+SAFE_COST_FALLOFF: int = 0
 
 # Cost of taking an image off center.
 # The higher the value, the less likely the robot takes pictures from a position that is not directly in front of image.
@@ -56,5 +83,27 @@ PADDING: int = (OFFSET + 1) * EXPANDED_CELL
 # minimum number of cells away front of robot should be from obstacle in view state generation
 MIN_CLEARANCE: int = 1  # front of robot at least 10cm away
 
+# candidate view states of an obstacle, as (distance of the robot center in front of the image, distance to the side, penalty).
+# Distances are in 10 cm units. Candidates that are out of bounds or not safe to reach are dropped
+# TODO: Tune the possible view states based on testing. More view states means a longer algo runtime
+VIEW_STATE_CANDIDATES: tuple[tuple[int, int, int], ...] = (
+    # robot camera is to either side of obstacle
+    (MIN_CLEARANCE + OBSTACLE_SIZE + OFFSET, 1, SCREENSHOT_COST + DISTANCE_COST),
+    (MIN_CLEARANCE + OBSTACLE_SIZE + OFFSET, -1, SCREENSHOT_COST + DISTANCE_COST),
+    # robot camera is positioned just nice from obstacle
+    (MIN_CLEARANCE + 1 + OBSTACLE_SIZE + OFFSET, 0, 0),
+    # robot camera is close to obstacle
+    (MIN_CLEARANCE + OBSTACLE_SIZE + OFFSET, 0, DISTANCE_COST),
+)
+# larger set of candidates to use when the robot cannot reach enough view states of VIEW_STATE_CANDIDATES,
+# which adds view states to either side at the just nice distance, and further from the obstacle
+EXTENDED_VIEW_STATE_CANDIDATES: tuple[tuple[int, int, int], ...] = VIEW_STATE_CANDIDATES + (
+    (MIN_CLEARANCE + 1 + OBSTACLE_SIZE + OFFSET, 1, SCREENSHOT_COST),
+    (MIN_CLEARANCE + 1 + OBSTACLE_SIZE + OFFSET, -1, SCREENSHOT_COST),
+    (MIN_CLEARANCE + 2 + OBSTACLE_SIZE + OFFSET, 0, DISTANCE_COST),
+    (MIN_CLEARANCE + 2 + OBSTACLE_SIZE + OFFSET, 1, SCREENSHOT_COST + DISTANCE_COST),
+    (MIN_CLEARANCE + 2 + OBSTACLE_SIZE + OFFSET, -1, SCREENSHOT_COST + DISTANCE_COST),
+)
+
 # Use ultrasonic sensor for straight-line motions, to reset movement error build-up
 W_COMMAND_FLAG = 0  # 0: disable w/W commands, 1: enable w/W commands
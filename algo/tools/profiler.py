@@ -0,0 +1,108 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Union
+from algo.tools.consts import PROFILE_INTERVAL_MS, PROFILE_TOP_N
+
+
+class SamplingProfiler:
+    """
+    Sampling profiler used to find out where the time of a slow solve goes.
+
+    While it runs, a background thread records the call stack of the thread that started it every interval.
+    Each sample is weighted by the time since the previous sample, so the weights add up to the time profiled
+    even when the sampling thread is held up (eg. waiting for the GIL).
+    Only the thread that started the profiler is sampled, so the time spent in worker processes shows up as
+    time spent waiting on their results.
+
+    The samples are written as collapsed stacks, which speedscope (https://www.speedscope.app) and flamegraph.pl
+    open as a flame graph.
+    """
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS) -> None:
+        """
+        Args:
+            interval_ms (float): time between samples in ms. Default is PROFILE_INTERVAL_MS
+        """
+        self.interval = interval_ms / 1000
+        # time in µs spent in each call stack, with the frames of the stack from the outermost
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self.samples = 0
+        self._thread_id: Union[int, None] = None
+        self._stopped = threading.Event()
+        self._sampler: Union[threading.Thread, None] = None
+
+    def __enter__(self) -> "SamplingProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """
+        Starts sampling the calling thread
+        """
+        self._thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        """
+        Stops sampling. The samples are kept, and sampling can be started again to add to them
+        """
+        self._stopped.set()
+        self._sampler.join()
+
+    def _sample(self) -> None:
+        last = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                stack.append(SamplingProfiler._get_frame_name(frame))
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += (now - last) * 1e6
+            self.samples += 1
+            last = now
+
+    @staticmethod
+    def _get_frame_name(frame) -> str:
+        """
+        Returns the name of the function of the frame and where it is defined, eg. 'search (lattice.py:276)'
+        """
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def get_hot_functions(self, top_n: int = PROFILE_TOP_N) -> list[dict]:
+        """
+        Returns the functions that the most time was spent in, excluding the functions they call (self time).
+
+        Returns:
+            list[dict]: 'function', 'self_ms' and 'total_ms' (including the functions it calls) of the top_n functions
+        """
+        self_time, total_time = Counter(), Counter()
+        for stack, weight in self.stacks.items():
+            self_time[stack[-1]] += weight
+            # a recursive function is only counted once per stack
+            for name in set(stack):
+                total_time[name] += weight
+        return [
+            {"function": name, "self_ms": round(self_time[name] / 1000, 3), "total_ms": round(total_time[name] / 1000, 3)}
+            for name, _ in self_time.most_common(top_n)
+        ]
+
+    def write_collapsed_stacks(self, file_path: str) -> None:
+        """
+        Writes each call stack sampled and the time spent in it, as 'outer;...;inner time_in_µs' lines
+        """
+        with open(file_path, "w") as file:
+            for stack, weight in self.stacks.items():
+                file.write(f"{';'.join(stack)} {round(weight)}\n")
@@ -3,10 +3,13 @@ from werkzeug.datastructures import FileStorage
 import time
 from flask_restx import Resource, Api, marshal
 from flask_cors import CORS
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_from_directory
 from pathlib import Path
+from contextlib import nullcontext
 import json
+import re
 import threading
+import uuid
 
 from models.models import get_models
 from tools.logger import setup_logger
@@ -17,7 +20,11 @@ import os
 # Allows Python to find package from sibling directory
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from algo.algorithms.algo import MazeSolver  # nopep8
+from algo.algorithms.cache import PlanCache, PathStore  # nopep8
 from algo.tools.commands import CommandGenerator  # nopep8
+from algo.tools.profiler import SamplingProfiler  # nopep8
+from algo.entities.entity import scale_length  # nopep8
+from algo.tools.consts import SOLVER_CACHE_SIZE, CELL_SIZE, ARENA_WIDTH, ARENA_HEIGHT  # nopep8
 from image_rec.model import load_model, predict_image, predict_image_t2, stitch_image  # nopep8
 
 app = Flask(__name__)
@@ -32,6 +39,17 @@ CORS(app)
 # load model for image recognition
 model = load_model()  # Default model
 
+# solved plans of previous /path requests, so that repeated requests (eg. retries from the RPI) are not solved again
+path_cache = PlanCache()
+# pairwise paths of previous /path requests, reused when the obstacles they pass near have not changed (eg. an obstacle is moved)
+path_store = PathStore()
+# solvers of previous /path requests by obstacle layout, so that /path/replan reuses the paths they have found.
+# Each solver is cached with a lock, as replanning changes the state of the solver
+solver_cache = PlanCache(SOLVER_CACHE_SIZE)
+
+# collapsed stack files of profiled /simulator_path requests, by request id
+profile_dir = Path("profiles")
+
 # poll wi-fi SSID to check that RPI can connect to API server
 # TODO remove if this causes any performance issues or bugs
 # threading.Thread(target=network_monitor, args=(logger,), daemon=True).start()
@@ -39,16 +57,18 @@ model = load_model()  # Default model
 
 @api.route('/status')
 class Status(Resource):
-    @api.response(model=restx_models["Ok"], code=200, description="Success")
+    @api.response(model=restx_models["Status"], code=200, description="Success")
     def get(self):
         """
         To check if the server is running
         """
         return marshal(
             {
-                "result": "ok"
+                "result": "ok",
+                "path_cache": path_cache.get_stats(),
+                "path_store": path_store.get_stats()
             },
-            restx_models["Ok"]
+            restx_models["Status"]
         ), 200
 
 
@@ -65,10 +85,95 @@ def log_response_info(response):
     return response
 
 
+def get_arena_size(cell_size: int) -> tuple[int, int]:
+    """
+    Returns the size of the arena in cells of the given size (in cm), eg. 40x40 for 5 cm cells.
+    Raises an InvalidRequestError if the cell size does not divide the 10 cm units of the solver
+    """
+    try:
+        return scale_length(ARENA_WIDTH, cell_size), scale_length(ARENA_HEIGHT, cell_size)
+    except ValueError as error:
+        raise InvalidRequestError(str(error)) from error
+
+
+class InvalidRequestError(ValueError):
+    """
+    Raised when the positions of a request cannot be planned for, eg. a position outside the arena. Answered with a 400
+    """
+
+
+def check_in_arena(obstacles: list[dict], robot_x: int, robot_y: int, size_x: int, size_y: int) -> None:
+    """
+    Raises an InvalidRequestError if the robot or an obstacle is outside the arena.
+    The request models do not bound the positions, as the size of the arena depends on the cell size
+    """
+    for x, y in [(ob['x'], ob['y']) for ob in obstacles] + [(robot_x, robot_y)]:
+        if not (0 <= x < size_x and 0 <= y < size_y):
+            raise InvalidRequestError(f"Position ({x}, {y}) is outside the {size_x}x{size_y} arena")
+
+
+def check_start_pose(maze_solver: MazeSolver, robot_x: int, robot_y: int) -> None:
+    """
+    Raises an InvalidRequestError if the robot cannot start at the given position, eg. it is too close to the arena
+    edge or an obstacle. Otherwise the solver finds no path, which would be returned as an empty plan
+    """
+    if not maze_solver.grid.reachable(robot_x, robot_y):
+        raise InvalidRequestError(
+            f"Robot cannot start at ({robot_x}, {robot_y}), it is too close to the arena edge or an obstacle")
+
+
+def get_error_response(error: Exception) -> tuple:
+    """
+    Returns the error response to a request that raised the error: a 400 for an invalid request, otherwise a 500
+    """
+    logger.debug("", exc_info=True)
+    return marshal(
+        {
+            "error": repr(error)
+        },
+        restx_models["Error"]
+    ), 400 if isinstance(error, InvalidRequestError) else 500
+
+
+def get_request_id() -> str:
+    """
+    Returns the id of the request from its X-Request-ID header, or a new id if it has none.
+    Only letters, digits, '-' and '_' are kept, so that the id can be used as a file name
+    """
+    request_id = re.sub(r"[^\w-]", "", request.headers.get("X-Request-ID", ""))[:64]
+    return request_id or uuid.uuid4().hex
+
+
+def build_plan(maze_solver: MazeSolver, optimal_path: list, is_optimal: bool) -> dict:
+    """
+    Generates the robot commands of the optimal path, and returns the path data sent back to the RPI
+    """
+    # Based on the shortest path, generate commands for the robot
+    motions, obstacle_id_with_signals, scanned_obstacles = maze_solver.optimal_path_to_motion_path(
+        optimal_path)
+    command_generator = CommandGenerator(cell_size=maze_solver.grid.cell_size)
+    commands = command_generator.generate_commands(
+        motions, obstacle_id_with_signals, scanned_obstacles, optimal_path)
+    logger.debug(
+        f"Number of obstacles scanned: {len(scanned_obstacles)} / {len(maze_solver.grid.obstacles)}")
+
+    # Get the starting location and add it to path_results
+    path_results = []
+    for pos in optimal_path:
+        path_results.append(pos.get_dict())
+
+    return {
+        'path': path_results,
+        'commands': commands,
+        'optimal': is_optimal,
+    }
+
+
 @api.route('/path')
 class PathFinding(Resource):
     @api.expect(restx_models["PathFindingRequest"])
     @api.response(model=restx_models["PathFindingResponse"], code=200, description="Success")
+    @api.response(model=restx_models["Error"], code=400, description="Bad Request")
     @api.response(model=restx_models["Error"], code=500, description="Internal Server Error")
     def post(self):
         """
@@ -84,59 +189,137 @@ class PathFinding(Resource):
             obstacles = content['obstacles']
             # TODO: use alternative algo for retrying?
             retrying = content.get('retrying', False)
+            # positions are in cells of this size (in cm)
+            cell_size = content.get('cell_size', CELL_SIZE)
+            # the robot starts 10 cm from the corner by default, whatever the cell size
             robot_x, robot_y = content.get(
-                'robot_x', 1), content.get('robot_y', 1)
+                'robot_x', scale_length(1, cell_size)), content.get('robot_y', scale_length(1, cell_size))
             robot_direction = content.get('robot_dir', 0)
-
-            optimal_path, commands = None, None
+            # time budget of path planning, the best path found by then is returned
+            deadline_ms = content.get('deadline_ms', None)
+            size_x, size_y = get_arena_size(cell_size)
+            check_in_arena(obstacles, robot_x, robot_y, size_x, size_y)
+
+            # reuse the plan of a previous request with the same obstacles, robot start pose and deadline
+            cache_key = PlanCache.make_key(
+                obstacles, robot_x, robot_y, robot_direction, size_x, size_y, cell_size, deadline_ms)
+            plan = path_cache.get(cache_key)
+            if plan is not None:
+                logger.debug("Returning cached path")
+                return marshal({"data": plan}, restx_models["PathFindingResponse"]), 200
 
             # Initialize MazeSolver object with robot size of 20x20, bottom left corner of robot at (1,1), facing north.
-            maze_solver = MazeSolver(size_x=20, size_y=20, robot_x=robot_x,
-                                     robot_y=robot_y, robot_direction=robot_direction)
+            maze_solver = MazeSolver(size_x=size_x, size_y=size_y, robot_x=robot_x,
+                                     robot_y=robot_y, robot_direction=robot_direction, path_store=path_store,
+                                     cell_size=cell_size)
 
             # Add each obstacle into the MazeSolver. Each obstacle is defined by its x,y positions, its direction, and its id
             for ob in obstacles:
                 maze_solver.add_obstacle(ob['x'], ob['y'], ob['d'], ob['id'])
+            check_start_pose(maze_solver, robot_x, robot_y)
 
             start = time.time()
-            # Get shortest path
-            optimal_path, cost = maze_solver.get_optimal_path()
+            # Get shortest path. If the deadline cuts the search short, it carries on in the background for later requests
+            optimal_path, cost = maze_solver.get_optimal_path(
+                deadline_ms, keep_improving=deadline_ms is not None)
             runtime = time.time() - start
             logger.debug(
                 f"Time taken to find shortest path using A* search: {runtime}s")
             logger.debug(f"cost to travel: {cost} units")
+            logger.debug(f"path is proven optimal: {maze_solver.is_optimal}")
 
-            # Based on the shortest path, generate commands for the robot
-            motions, obstacle_id_with_signals, scanned_obstacles = maze_solver.optimal_path_to_motion_path(
-                optimal_path)
-            command_generator = CommandGenerator()
-            commands = command_generator.generate_commands(
-                motions, obstacle_id_with_signals, scanned_obstacles, optimal_path)
-            logger.debug(
-                f"Number of obstacles scanned: {len(scanned_obstacles)} / {len(obstacles)}")
-
-            # Get the starting location and add it to path_results
-            path_results = []
-            for pos in optimal_path:
-                path_results.append(pos.get_dict())
+            plan = build_plan(maze_solver, optimal_path, maze_solver.is_optimal)
+            if optimal_path:
+                path_cache.put(cache_key, plan)
+            solver_lock = threading.Lock()
+            solver_cache.put(PlanCache.make_layout_key(obstacles, size_x, size_y, cell_size), (maze_solver, solver_lock))
+            if maze_solver.improved_path is not None:
+                maze_solver.improved_path.add_done_callback(
+                    lambda future: cache_improved_plan(maze_solver, solver_lock, cache_key, future))
 
             return marshal(
                 {
-                    "data": {
-                        'path': path_results,
-                        'commands': commands,
-                    }
+                    "data": plan
                 },
                 restx_models["PathFindingResponse"]
             ), 200
         except Exception as error:
-            logger.debug("", exc_info=True)
+            return get_error_response(error)
+
+
+@api.route('/path/replan')
+class PathReplanning(Resource):
+    @api.expect(restx_models["PathReplanRequest"])
+    @api.response(model=restx_models["PathFindingResponse"], code=200, description="Success")
+    @api.response(model=restx_models["Error"], code=400, description="Bad Request")
+    @api.response(model=restx_models["Error"], code=500, description="Internal Server Error")
+    def post(self):
+        """
+        For RPI to request the remaining path mid-run, from the robot's current position to the obstacles not scanned yet
+        """
+        try:
+            # Get the json data from the request
+            content = request.json
+            logger.debug("Request received from client:")
+            logger.debug(f"{content}")
+
+            obstacles = content['obstacles']
+            scanned_ids = content.get('scanned_ids', [])
+            robot_x, robot_y = content['robot_x'], content['robot_y']
+            robot_direction = content['robot_dir']
+            deadline_ms = content.get('deadline_ms', None)
+            cell_size = content.get('cell_size', CELL_SIZE)
+            size_x, size_y = get_arena_size(cell_size)
+            check_in_arena(obstacles, robot_x, robot_y, size_x, size_y)
+
+            # reuse the solver of the /path request with the same obstacles, unless it is still improving its path
+            layout_key = PlanCache.make_layout_key(obstacles, size_x, size_y, cell_size)
+            cached = solver_cache.get(layout_key)
+            if cached is None or (cached[0].improved_path is not None and not cached[0].improved_path.done()):
+                logger.debug("No solver to reuse, replanning from scratch")
+                maze_solver = MazeSolver(size_x=size_x, size_y=size_y, robot_x=robot_x,
+                                         robot_y=robot_y, robot_direction=robot_direction, path_store=path_store,
+                                         cell_size=cell_size)
+                for ob in obstacles:
+                    maze_solver.add_obstacle(ob['x'], ob['y'], ob['d'], ob['id'])
+                cached = (maze_solver, threading.Lock())
+                solver_cache.put(layout_key, cached)
+
+            # replans of the same layout take turns on its solver
+            maze_solver, solver_lock = cached
+            with solver_lock:
+                start = time.time()
+                optimal_path, cost = maze_solver.replan_path(
+                    robot_x, robot_y, robot_direction, scanned_ids, deadline_ms)
+                runtime = time.time() - start
+                logger.debug(f"Time taken to replan path: {runtime}s")
+                logger.debug(f"cost to travel: {cost} units")
+                plan = build_plan(maze_solver, optimal_path, maze_solver.is_optimal)
+
             return marshal(
                 {
-                    "error": repr(error)
+                    "data": plan
                 },
-                restx_models["Error"]
-            ), 500
+                restx_models["PathFindingResponse"]
+            ), 200
+        except Exception as error:
+            return get_error_response(error)
+
+
+def cache_improved_plan(maze_solver: MazeSolver, solver_lock: threading.Lock, cache_key: tuple, future) -> None:
+    """
+    Replaces the cached plan with the path found by the background search once it finishes.
+    The plan is built under the lock of the cached solver, as /path/replan may be using the solver by then
+    """
+    if future.exception() is not None:
+        logger.debug("Background path search failed", exc_info=future.exception())
+        return
+    optimal_path, cost, is_optimal = future.result()
+    if optimal_path:
+        with solver_lock:
+            plan = build_plan(maze_solver, optimal_path, is_optimal)
+        path_cache.put(cache_key, plan)
+        logger.debug(f"Cached improved path, cost to travel: {cost} units")
 
 
 # FOR SIMULATOR TESTING ONLY
@@ -144,6 +327,7 @@ class PathFinding(Resource):
 class SimulatorPathFinding(Resource):
     @api.expect(restx_models["SimulatorPathFindingRequest"])
     @api.response(model=restx_models["SimulatorPathFindingResponse"], code=200, description="Success")
+    @api.response(model=restx_models["Error"], code=400, description="Bad Request")
     @api.response(model=restx_models["Error"], code=500, description="Internal Server Error")
     def post(self):
         """
@@ -159,39 +343,69 @@ class SimulatorPathFinding(Resource):
             obstacles = content['obstacles']
             # TODO: use alternative algo for retrying?
             retrying = content.get('retrying', False)
+            cell_size = content.get('cell_size', CELL_SIZE)
+            # the robot starts 10 cm from the corner by default, whatever the cell size
             robot_x, robot_y = content.get(
-                'robot_x', 1), content.get('robot_y', 1)
+                'robot_x', scale_length(1, cell_size)), content.get('robot_y', scale_length(1, cell_size))
             robot_direction = content.get('robot_dir', 0)
             num_runs = content.get('num_runs', 1)  # for testing
+            # sample the call stacks of all the runs to find out where the time goes
+            profiler = SamplingProfiler() if content.get('profile', False) else None
+            size_x, size_y = get_arena_size(cell_size)
+            check_in_arena(obstacles, robot_x, robot_y, size_x, size_y)
 
             optimal_path, commands, total_cost, total_runtime, = None, None, 0, 0
-            for _ in range(num_runs):
-                # Initialize MazeSolver object with robot size of 20x20, bottom left corner of robot at (1,1), facing north.
-                maze_solver = MazeSolver(size_x=20, size_y=20, robot_x=robot_x,
-                                         robot_y=robot_y, robot_direction=robot_direction)
-                # Add each obstacle into the MazeSolver. Each obstacle is defined by its x,y positions, its direction, and its id
-                for ob in obstacles:
-                    maze_solver.add_obstacle(
-                        ob['x'], ob['y'], ob['d'], ob['id'])
-
-                start = time.time()
-                # Get shortest path
-                optimal_path, cost = maze_solver.get_optimal_path()
-                runtime = time.time() - start
-                total_runtime += runtime
-                total_cost += cost
-                logger.debug(
-                    f"Time taken to find shortest path using A* search: {runtime}s")
-                logger.debug(f"cost to travel: {cost} units")
-
-                # Based on the shortest path, generate commands for the robot
-                motions, obstacle_id_with_signals, scanned_obstacles = maze_solver.optimal_path_to_motion_path(
-                    optimal_path)
-                command_generator = CommandGenerator()
-                commands = command_generator.generate_commands(
-                    motions, obstacle_id_with_signals, scanned_obstacles, optimal_path)
-                logger.debug(
-                    f"Number of obstacles scanned: {len(scanned_obstacles)} / {len(obstacles)}")
+            # time spent in each phase of the solver, and the work done by it (the same in every run)
+            total_phases_ms, counters = {}, {}
+            with profiler if profiler is not None else nullcontext():
+                for _ in range(num_runs):
+                    # Initialize MazeSolver object with robot size of 20x20, bottom left corner of robot at (1,1), facing north.
+                    maze_solver = MazeSolver(size_x=size_x, size_y=size_y, robot_x=robot_x,
+                                             robot_y=robot_y, robot_direction=robot_direction, cell_size=cell_size)
+                    # Add each obstacle into the MazeSolver. Each obstacle is defined by its x,y positions, its direction, and its id
+                    for ob in obstacles:
+                        maze_solver.add_obstacle(
+                            ob['x'], ob['y'], ob['d'], ob['id'])
+                    check_start_pose(maze_solver, robot_x, robot_y)
+
+                    start = time.time()
+                    # Get shortest path
+                    optimal_path, cost = maze_solver.get_optimal_path()
+                    runtime = time.time() - start
+                    total_runtime += runtime
+                    total_cost += cost
+                    logger.debug(
+                        f"Time taken to find shortest path using A* search: {runtime}s")
+                    logger.debug(f"cost to travel: {cost} units")
+
+                    # Based on the shortest path, generate commands for the robot
+                    motions, obstacle_id_with_signals, scanned_obstacles = maze_solver.optimal_path_to_motion_path(
+                        optimal_path)
+                    command_generator = CommandGenerator(cell_size=cell_size)
+                    commands = command_generator.generate_commands(
+                        motions, obstacle_id_with_signals, scanned_obstacles, optimal_path)
+                    logger.debug(
+                        f"Number of obstacles scanned: {len(scanned_obstacles)} / {len(obstacles)}")
+
+                    metrics = maze_solver.get_metrics()
+                    for phase, ms in metrics["phases_ms"].items():
+                        total_phases_ms[phase] = total_phases_ms.get(phase, 0) + ms
+                    counters = metrics["counters"]
+
+            # keep the call stacks to open as a flame graph, and return the hot functions
+            profile = None
+            if profiler is not None:
+                request_id = get_request_id()
+                profile_dir.mkdir(parents=True, exist_ok=True)
+                profile_path = profile_dir / f"{request_id}.collapsed"
+                profiler.write_collapsed_stacks(profile_path)
+                logger.debug(f"Wrote profile of {profiler.samples} samples to {profile_path}")
+                profile = {
+                    'request_id': request_id,
+                    'file': str(profile_path),
+                    'samples': profiler.samples,
+                    'hot_functions': profiler.get_hot_functions(),
+                }
 
             # Get the starting location and add it to path_results
             path_results = []
@@ -205,19 +419,37 @@ class SimulatorPathFinding(Resource):
                         'runtime': total_runtime / num_runs,
                         'path': path_results,
                         'commands': commands,
-                        'motions': motions
+                        'motions': motions,
+                        'metrics': {
+                            'phases_ms': {phase: ms / num_runs for phase, ms in total_phases_ms.items()},
+                            'counters': counters,
+                        },
+                        'profile': profile,
                     }
                 },
                 restx_models["SimulatorPathFindingResponse"]
             ), 200
         except Exception as error:
-            logger.debug("", exc_info=True)
+            return get_error_response(error)
+
+
+# FOR SIMULATOR TESTING ONLY
+@api.route('/profile/<string:request_id>')
+class Profile(Resource):
+    @api.response(code=200, description="Collapsed stack file")
+    @api.response(model=restx_models["Error"], code=404, description="Not Found")
+    def get(self, request_id):
+        """
+        Downloads the profile of a profiled /simulator_path request, to open as a flame graph in speedscope
+        """
+        if not (profile_dir / f"{request_id}.collapsed").is_file():
             return marshal(
                 {
-                    "error": repr(error)
+                    "error": f"No profile with request id {request_id}"
                 },
                 restx_models["Error"]
-            ), 500
+            ), 404
+        return send_from_directory(profile_dir.resolve(), f"{request_id}.collapsed", as_attachment=True)
 
 
 # for API validation to allow only file upload in POST request
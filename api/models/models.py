@@ -3,8 +3,8 @@ from flask_restx import fields
 
 def get_models(api):
     obstacle = api.model('Obstacle', {
-        'x': fields.Integer(required=True, min=0, max=19, default=10),
-        'y': fields.Integer(required=True, min=0, max=19, default=10),
+        'x': fields.Integer(required=True, min=0, default=10, description="In cells of cell_size, inside the arena"),
+        'y': fields.Integer(required=True, min=0, default=10, description="In cells of cell_size, inside the arena"),
         'd': fields.Integer(required=True, min=0, max=8, multiple=2, default=4),
         'id': fields.Integer(required=True)
     })
@@ -20,13 +20,26 @@ def get_models(api):
         'obstacles': fields.List(fields.Nested(obstacle), required=True),
         'retrying': fields.Boolean(required=False, default=False),
         'robot_dir': fields.Integer(required=False, min=0, max=6, multiple=2, default=0),
-        'robot_x': fields.Integer(required=False, min=0, max=19, default=1),
-        'robot_y': fields.Integer(required=False, min=0, max=19, default=1),
+        'robot_x': fields.Integer(required=False, min=0, description="In cells of cell_size. Default is 10 cm from the corner"),
+        'robot_y': fields.Integer(required=False, min=0, description="In cells of cell_size. Default is 10 cm from the corner"),
+        'deadline_ms': fields.Integer(required=False, min=1, description="Time budget of path planning after the initial greedy path. The best path found by then is returned"),
+        'cell_size': fields.Integer(required=False, min=5, max=10, multiple=5, default=10, description="Size of a grid cell in cm, 5 or 10. The arena is 200 cm wide"),
+    })
+
+    path_replan_request = api.model('PathReplanRequest', {
+        'obstacles': fields.List(fields.Nested(obstacle), required=True),
+        'scanned_ids': fields.List(fields.Integer(), required=False, description="Ids of the obstacles that have been scanned"),
+        'robot_dir': fields.Integer(required=True, min=0, max=6, multiple=2),
+        'robot_x': fields.Integer(required=True, min=0, description="In cells of cell_size"),
+        'robot_y': fields.Integer(required=True, min=0, description="In cells of cell_size"),
+        'deadline_ms': fields.Integer(required=False, min=1, description="Time budget of path planning after the initial greedy path. The best path found by then is returned"),
+        'cell_size': fields.Integer(required=False, min=5, max=10, multiple=5, default=10, description="Size of a grid cell in cm, 5 or 10. The arena is 200 cm wide"),
     })
 
     path_finding_data = api.model('PathFindingData', {
         'commands': fields.List(fields.String()),
         'path': fields.List(fields.Nested(position)),
+        'optimal': fields.Boolean(description="Whether the path is proven optimal"),
     })
 
     path_finding_response = api.model('PathFindingResponse', {
@@ -37,9 +50,51 @@ def get_models(api):
         'obstacles': fields.List(fields.Nested(obstacle), required=True),
         'retrying': fields.Boolean(required=False, default=False),
         'robot_dir': fields.Integer(required=False, min=0, max=6, multiple=2, default=0),
-        'robot_x': fields.Integer(required=False, min=0, max=19, default=1),
-        'robot_y': fields.Integer(required=False, min=0, max=19, default=1),
-        'num_runs': fields.Integer(required=False, min=1)
+        'robot_x': fields.Integer(required=False, min=0, description="In cells of cell_size. Default is 10 cm from the corner"),
+        'robot_y': fields.Integer(required=False, min=0, description="In cells of cell_size. Default is 10 cm from the corner"),
+        'num_runs': fields.Integer(required=False, min=1),
+        'cell_size': fields.Integer(required=False, min=5, max=10, multiple=5, default=10, description="Size of a grid cell in cm, 5 or 10. The arena is 200 cm wide"),
+        'profile': fields.Boolean(required=False, default=False, description="Profile the runs and return the hot functions"),
+    })
+
+    solver_phases = api.model('SolverPhases', {
+        'view_states': fields.Float(description="Generating the view states of the obstacles, in ms"),
+        'transition_table': fields.Float(description="Building the state lattice of the obstacle layout, in ms"),
+        'path_search': fields.Float(description="Searching for the paths between the start and view states, in ms"),
+        'combinations': fields.Float(description="Enumerating the combinations of view states, in ms"),
+        'tsp': fields.Float(description="Solving the tour over the view states, in ms"),
+        'path_reconstruction': fields.Float(description="Joining the paths of the tour into the path, in ms"),
+        'motion_decoding': fields.Float(description="Converting the path into motions, in ms"),
+    })
+
+    solver_counters = api.model('SolverCounters', {
+        'searches': fields.Integer(description="No. of path searches"),
+        'nodes_expanded': fields.Integer(description="No. of states expanded by the searches"),
+        'heap_pushes': fields.Integer(),
+        'heap_pops': fields.Integer(),
+        'path_table_hits': fields.Integer(description="No. of paths already found that were not searched again"),
+        'path_store_hits': fields.Integer(description="No. of paths reused from previous obstacle layouts"),
+        'distance_table_hits': fields.Integer(description="No. of paths followed from the distance table of the empty arena"),
+        'collision_checks': fields.Integer(description="No. of moves checked for collisions"),
+        'tsp_calls': fields.Integer(description="No. of TSPs solved"),
+    })
+
+    solver_metrics = api.model('SolverMetrics', {
+        'phases_ms': fields.Nested(solver_phases, description="Time spent in each phase of the solver, averaged over the runs"),
+        'counters': fields.Nested(solver_counters, description="Work done by the solver"),
+    })
+
+    hot_function = api.model('HotFunction', {
+        'function': fields.String(description="Function name, file and line"),
+        'self_ms': fields.Float(description="Time spent in the function itself"),
+        'total_ms': fields.Float(description="Time spent in the function and the functions it calls"),
+    })
+
+    solver_profile = api.model('SolverProfile', {
+        'request_id': fields.String(description="X-Request-ID header of the request, or a generated id"),
+        'file': fields.String(description="Collapsed stack file on the server, which opens as a flame graph in speedscope"),
+        'samples': fields.Integer(description="No. of call stacks sampled"),
+        'hot_functions': fields.List(fields.Nested(hot_function), description="Functions with the most self time"),
     })
 
     simulator_path_finding_data = api.model('SimulatorPathFindingData', {
@@ -48,6 +103,8 @@ def get_models(api):
         'path': fields.List(fields.Nested(position)),
         'runtime': fields.Float(),
         'motions': fields.List(fields.String()),
+        'metrics': fields.Nested(solver_metrics),
+        'profile': fields.Nested(solver_profile, allow_null=True, description="Profile of the runs, if requested"),
     })
 
     simulator_path_finding_response = api.model('SimulatorPathFindingResponse', {
@@ -67,13 +124,28 @@ def get_models(api):
         'result': fields.String()
     })
 
+    plan_cache_stats = api.model('PlanCacheStats', {
+        'hits': fields.Integer(),
+        'misses': fields.Integer(),
+        'size': fields.Integer(description="No. of cached entries"),
+        'capacity': fields.Integer(),
+    })
+
+    status = api.model('Status', {
+        'result': fields.String(),
+        'path_cache': fields.Nested(plan_cache_stats),
+        'path_store': fields.Nested(plan_cache_stats),
+    })
+
     return {
         "Obstacle": obstacle,
         "PathFindingRequest": path_finding_request,
         "PathFindingResponse": path_finding_response,
+        "PathReplanRequest": path_replan_request,
         "SimulatorPathFindingRequest": simulator_path_finding_request,
         "SimulatorPathFindingResponse": simulator_path_finding_response,
         "ImagePredictResponse": image_predict_response,
         "Error": error,
         "Ok": ok,
+        "Status": status,
     }
@@ -7,6 +7,8 @@ API_IP = "192.168.21.25"  # IP address of laptop
 API_PORT = 5000
 URL = f"http://{API_IP}:{API_PORT}"
 API_TIMEOUT = 90
+# time budget for the algo API to plan a path, so that the robot can start moving within a fixed latency
+PATH_DEADLINE_MS = 5000
 
 # ROBOT SETTINGS
 OUTDOOR_BIG_TURN = False
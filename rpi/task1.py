@@ -12,7 +12,7 @@ from .communication.android import AndroidMessage
 from .communication.camera import snap_using_picamera2
 from .communication.pi_action import PiAction
 from .constant.consts import Category, stm32_prefixes
-from .constant.settings import API_TIMEOUT, URL
+from .constant.settings import API_TIMEOUT, PATH_DEADLINE_MS, URL
 
 
 logger = logging.getLogger(__name__)
@@ -290,6 +290,7 @@ class TaskOne(RaspberryPi):
             "robot_y": data["robot_y"],
             "robot_dir": data["robot_dir"],
             "retrying": retrying,
+            "deadline_ms": PATH_DEADLINE_MS,
         }
         logger.debug(f"{body}")
         response = requests.post(url=f"{URL}/path", json=body, timeout=API_TIMEOUT)